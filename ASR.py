@@ -1,5 +1,5 @@
 import os
-import requests
+import http_pool
 import json
 
 # 尝试加载 .env
@@ -9,8 +9,8 @@ try:
 except ImportError:
     pass
 
-API_KEY = os.getenv("BAIDU_API_KEY", "")
-SECRET_KEY = os.getenv("BAIDU_SECRET_KEY", "")
+# Access Token 由 baidu_auth 统一管理（带缓存和自动刷新）
+from baidu_auth import get_access_token
 
 def main():
         
@@ -28,20 +28,11 @@ def main():
         'Accept': 'application/json'
     }
     
-    response = requests.request("POST", url, headers=headers, data=payload.encode("utf-8"))
+    response = http_pool.post(url, headers=headers, data=payload.encode("utf-8"))
     
     response.encoding = "utf-8"
     print(response.text)
     
 
-def get_access_token():
-    """
-    使用 AK，SK 生成鉴权签名（Access Token）
-    :return: access_token，或是None(如果错误)
-    """
-    url = os.getenv("BAIDU_TOKEN_URL", "https://aip.baidubce.com/oauth/2.0/token")
-    params = {"grant_type": "client_credentials", "client_id": API_KEY, "client_secret": SECRET_KEY}
-    return str(requests.post(url, params=params).json().get("access_token"))
-
 if __name__ == '__main__':
     main()
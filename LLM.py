@@ -6,7 +6,10 @@
 
 import os
 import json
-from openai import OpenAI
+from llm_client import get_client, warm_up as warm_up_client
+from intent_matcher import match_intent
+from query_cache import get_cache
+from command_registry import get_registry, normalize_command, StructuredCommand
 
 # 尝试加载 .env
 try:
@@ -20,33 +23,34 @@ API_KEY = os.getenv("ALI_API_KEY", "")
 BASE_URL = os.getenv("ALI_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
 MODEL = os.getenv("ALI_MODEL", "qwen-flash")
 
-# 读取标准指令文件
+# 意图输出格式："text" 大模型输出标准指令文本，执行时再由指令表解析；
+# "json" 大模型直接输出 {intent, slots}（按指令表生成的 Schema 校验），执行时不再解析文本
+INTENT_OUTPUT = os.getenv("INTENT_OUTPUT", "text")
+
+# 读取标准指令文件（按修改时间缓存，文件变化时自动重新加载）
+INSTRUCTION_FILE = os.path.join(os.path.dirname(__file__), "Instruction.txt")
+_instruction_cache = {"mtime": None, "content": "", "system_prompt": None, "structured_prompt": None}
+
+
 def load_instruction_file():
     """加载标准指令示范文本"""
-    file_path = os.path.join(os.path.dirname(__file__), "Instruction.txt")
     try:
-        with open(file_path, mode='r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
-        print(f"警告：找不到指令文件 {file_path}")
+        mtime = os.path.getmtime(INSTRUCTION_FILE)
+    except OSError:
+        if _instruction_cache["mtime"] != -1:
+            print(f"警告：找不到指令文件 {INSTRUCTION_FILE}")
+            _instruction_cache.update(mtime=-1, content="", system_prompt=None, structured_prompt=None)
         return ""
+    
+    if mtime != _instruction_cache["mtime"]:
+        with open(INSTRUCTION_FILE, mode='r', encoding='utf-8') as f:
+            _instruction_cache.update(mtime=mtime, content=f.read(), system_prompt=None, structured_prompt=None)
+    return _instruction_cache["content"]
 
 
-def process_query(query):
-    """
-    处理用户输入，识别意图并转换指令
-    :param query: 用户输入的口语化内容
-    :return: (is_instruction, result)
-             - is_instruction: True表示是指令类，False表示是闲谈类
-             - result: 标准指令 或 聊天回复
-    """
-    if not query or not query.strip():
-        return False, "请说出您的指令或问题"
-    
-    standard_instruction = load_instruction_file()
-    
-    prompt = f"""
-    你是一名指令标准化转化与意图识别助手，核心任务是：首先识别用户输入内容的类型（指令类或闲谈类），若为指令类，需根据用户提供的「口语化指令」和「标准指令示范文本」，提取口语化指令的核心意图、操作对象、关键参数（如文件路径、字段名、处理规则、输出要求等），参考示范文本的语法结构、术语规范和逻辑格式，剔除口语化词汇（如"帮我""大概""一下""哦"等），转化为无歧义、结构化、可被程序直接识别或映射为代码逻辑的标准指令；若为闲谈类，则生成符合智能助手身份的自然语言回应。
+# 意图识别提示词的固定部分：规则、示例和标准指令文本都放在系统消息里，
+# 每次请求只有末尾的用户消息不同，便于服务端前缀缓存（prompt caching）命中
+INTENT_RULES = """你是一名指令标准化转化与意图识别助手，核心任务是：首先识别用户输入内容的类型（指令类或闲谈类），若为指令类，需根据用户提供的「口语化指令」和「标准指令示范文本」，提取口语化指令的核心意图、操作对象、关键参数（如文件路径、字段名、处理规则、输出要求等），参考示范文本的语法结构、术语规范和逻辑格式，剔除口语化词汇（如"帮我""大概""一下""哦"等），转化为无歧义、结构化、可被程序直接识别或映射为代码逻辑的标准指令；若为闲谈类，则生成符合智能助手身份的自然语言回应。
 
 ### 处理规则
 1. 意图识别规则：
@@ -68,116 +72,459 @@ def process_query(query):
 - 输入内容："帮我打开一下记事本软件"
 
 #### 示例输出1
-{{"standard_instruction": "打开记事本", "talk_text": ""}}
+{"standard_instruction": "打开记事本", "talk_text": ""}
 
 #### 示例输入2（指令类-带参数）
 - 输入内容："帮我在B站上找个猫咪视频看看"
 
 #### 示例输出2
-{{"standard_instruction": "打开B站播放猫咪视频", "talk_text": ""}}
+{"standard_instruction": "打开B站播放猫咪视频", "talk_text": ""}
 
 #### 示例输入3（指令类-微信消息）
 - 输入内容："用微信告诉老妈我今晚回家吃饭"
 
 #### 示例输出3
-{{"standard_instruction": "打开微信发我今晚回家吃饭信息给老妈", "talk_text": ""}}
+{"standard_instruction": "打开微信发我今晚回家吃饭信息给老妈", "talk_text": ""}
 
 #### 示例输入4（闲谈类）
 - 输入内容："你好，今天天气怎么样？"
 
 #### 示例输出4
-{{"standard_instruction": "", "talk_text": "你好！我是你的智能语音助手，不过我暂时无法查询天气信息。我可以帮你控制电脑程序、手机应用、播放视频、搜索商品等，有什么需要帮忙的吗？"}}
+{"standard_instruction": "", "talk_text": "你好！我是你的智能语音助手，不过我暂时无法查询天气信息。我可以帮你控制电脑程序、手机应用、播放视频、搜索商品等，有什么需要帮忙的吗？"}
+"""
 
-### 需要处理的内容
-<query>
-{query}
-</query>
+
+def build_system_prompt():
+    """构建意图识别的系统提示词（固定前缀，指令文件不变时复用同一字符串）"""
+    standard_instruction = load_instruction_file()
+    if _instruction_cache["system_prompt"] is None:
+        _instruction_cache["system_prompt"] = f"""严格按照下面的输出要求，仅输出JSON格式结果，无需任何额外解释或修饰。
+
+{INTENT_RULES}
 
 ### 标准指令示范文本参考
 <standard_instruction>
 {standard_instruction}
 </standard_instruction>
 """
+    return _instruction_cache["system_prompt"]
+
+
+# 结构化意图模式的规则：意图列表由指令表（command_registry）生成，替换 {intents}
+STRUCTURED_RULES = """你是一名意图识别助手，核心任务是：首先识别用户输入内容的类型（指令类或闲谈类），若为指令类，从下面的意图列表中选出对应的意图，并从用户原话中提取参数（如视频关键词、商品名称、联系人、消息内容等），参数值直接取自原话，剔除口语化词汇（如"帮我""大概""一下""哦"等）；若为闲谈类，则生成符合智能助手身份的自然语言回应。
+
+### 意图列表
+{intents}
+
+### 输出要求
+仅输出JSON格式结果，无需额外解释，JSON包含2个key：「commands」和「talk_text」。其中：
+- 若为指令类内容，「commands」为意图列表，每项为 {"intent": 意图名, "slots": {参数名: 参数值}}，一句话包含多个操作时按顺序列出多项，「talk_text」值为空字符串；
+- 若为闲谈类内容，「commands」为空列表，「talk_text」值为生成的回应内容；
+- 只能使用意图列表中的意图名和参数名，参数值均为字符串，用户没有提到的参数不要输出。
+
+### 示例
+#### 示例输入1（指令类）
+- 输入内容："帮我打开一下记事本软件"
+
+#### 示例输出1
+{"commands": [{"intent": "open_notepad", "slots": {}}], "talk_text": ""}
+
+#### 示例输入2（指令类-带参数）
+- 输入内容："帮我在B站上找个猫咪视频看看"
 
+#### 示例输出2
+{"commands": [{"intent": "bilibili", "slots": {"keyword": "猫咪"}}], "talk_text": ""}
+
+#### 示例输入3（指令类-微信消息）
+- 输入内容："用微信告诉老妈我今晚回家吃饭"
+
+#### 示例输出3
+{"commands": [{"intent": "wechat_send", "slots": {"friend": "老妈", "content": "我今晚回家吃饭"}}], "talk_text": ""}
+
+#### 示例输入4（指令类-多个操作）
+- 输入内容："打开记事本然后告诉我现在几点"
+
+#### 示例输出4
+{"commands": [{"intent": "open_notepad", "slots": {}}, {"intent": "query_time", "slots": {}}], "talk_text": ""}
+
+#### 示例输入5（闲谈类）
+- 输入内容："你好，今天天气怎么样？"
+
+#### 示例输出5
+{"commands": [], "talk_text": "你好！我是你的智能语音助手，不过我暂时无法查询天气信息。我可以帮你控制电脑程序、手机应用、播放视频、搜索商品等，有什么需要帮忙的吗？"}
+"""
+
+
+def build_structured_system_prompt():
+    """构建结构化意图模式的系统提示词（固定前缀，指令文件不变时复用同一字符串）"""
+    standard_instruction = load_instruction_file()
+    if _instruction_cache["structured_prompt"] is None:
+        rules = STRUCTURED_RULES.replace("{intents}", get_registry().describe_intents())
+        _instruction_cache["structured_prompt"] = f"""严格按照下面的输出要求，仅输出JSON格式结果，无需任何额外解释或修饰。
+
+{rules}
+
+### 口语化表达参考
+<standard_instruction>
+{standard_instruction}
+</standard_instruction>
+"""
+    return _instruction_cache["structured_prompt"]
+
+
+def build_user_prompt(query):
+    """构建每次请求变化的部分（只包含用户输入）"""
+    return f"""### 需要处理的内容
+<query>
+{query}
+</query>"""
+
+
+def estimate_tokens(text):
+    """
+    估算token数（安装了tiktoken时精确计算，否则按中文每字1个、其他字符每4个1个估算）
+    """
     try:
-        client = OpenAI(
-            api_key=API_KEY,
-            base_url=BASE_URL
-        )
-        
+        import tiktoken
+        return len(tiktoken.get_encoding("cl100k_base").encode(text))
+    except ImportError:
+        cjk = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
+        return cjk + (len(text) - cjk + 3) // 4
+
+
+def report_prompt_tokens(query="帮我打开一下记事本"):
+    """
+    打印提示词的token构成，对比旧结构（查询位于提示词中间）每次请求需要重新计算的输入token
+    :return: 统计字典
+    """
+    system_tokens = estimate_tokens(build_system_prompt())
+    user_tokens = estimate_tokens(build_user_prompt(query))
+    instruction_tokens = estimate_tokens(load_instruction_file())
+    # 旧结构中查询之后还跟着整份标准指令文本，这部分每次都无法命中前缀缓存
+    legacy_uncached = user_tokens + instruction_tokens
+    report = {
+        "total": system_tokens + user_tokens,
+        "cacheable_prefix": system_tokens,
+        "per_request": user_tokens,
+        "legacy_per_request": legacy_uncached,
+    }
+    print(f"[LLM] 输入共约{report['total']}个token，其中固定前缀{report['cacheable_prefix']}个，"
+          f"每次请求变化部分{report['per_request']}个（旧结构约{legacy_uncached}个，"
+          f"减少{legacy_uncached - user_tokens}个）")
+    return report
+
+
+def _log_cache_usage(completion):
+    """打印本次请求输入token中命中服务端前缀缓存的数量（接口返回了该字段时）"""
+    usage = getattr(completion, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None) if usage else None
+    cached_tokens = getattr(details, "cached_tokens", None) if details else None
+    if cached_tokens is not None:
+        print(f"[LLM] 输入{usage.prompt_tokens}个token，缓存命中{cached_tokens}个")
+
+
+class JsonFieldStream:
+    """
+    从流式输出的JSON文本中增量提取某个字符串字段的值
+    例如逐段喂入 '{"standard_instruction": "", "talk_text": "你好！我是...' 时，逐步返回 "你好！我是..."
+    """
+
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, field):
+        self.key = f'"{field}"'
+        self.text = ""
+        self.pos = None      # 字段值在 text 中的当前解析位置，None表示还没找到字段
+        self.done = False
+
+    def feed(self, chunk):
+        """
+        喂入新收到的文本
+        :return: 本次新解析出的字段内容
+        """
+        self.text += chunk or ""
+        if self.done:
+            return ""
+        if self.pos is None:
+            start = self.text.find(self.key)
+            if start < 0:
+                return ""
+            # 跳过冒号和空白，找到值的起始引号
+            index = start + len(self.key)
+            while index < len(self.text) and self.text[index] in ' \t\r\n:':
+                index += 1
+            if index >= len(self.text):
+                return ""
+            if self.text[index] != '"':
+                self.done = True  # 值不是字符串
+                return ""
+            self.pos = index + 1
+
+        out = []
+        text, index = self.text, self.pos
+        while index < len(text):
+            char = text[index]
+            if char == '"':
+                self.done = True
+                index += 1
+                break
+            if char == '\\':
+                if index + 1 >= len(text):
+                    break  # 转义符不完整，等待后续内容
+                code = text[index + 1]
+                if code == 'u':
+                    if index + 6 > len(text):
+                        break
+                    try:
+                        out.append(chr(int(text[index + 2:index + 6], 16)))
+                    except ValueError:
+                        pass
+                    index += 6
+                    continue
+                out.append(self._ESCAPES.get(code, code))
+                index += 2
+                continue
+            out.append(char)
+            index += 1
+        self.pos = index
+        return "".join(out)
+
+
+def _load_json(result_text):
+    """解析返回的JSON（处理可能的markdown代码块）"""
+    if "```json" in result_text:
+        result_text = result_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in result_text:
+        result_text = result_text.split("```")[1].split("```")[0].strip()
+    return json.loads(result_text)
+
+
+def _parse_result(query, result_text):
+    """解析意图识别返回的JSON，返回 (is_instruction, result)"""
+    result_json = _load_json(result_text)
+    
+    standard_inst = result_json.get("standard_instruction", "").strip()
+    talk_text = result_json.get("talk_text", "").strip()
+    
+    if standard_inst:
+        get_cache().put(query, True, standard_inst)
+        return True, standard_inst
+    elif talk_text:
+        get_cache().put(query, False, talk_text)
+        return False, talk_text
+    else:
+        return False, "我不太理解你的意思，请再说一遍"
+
+
+def _parse_structured(query, result_text):
+    """
+    解析结构化意图模式返回的JSON，返回 (is_instruction, result)
+    :raises ValueError: 意图不符合指令表生成的 Schema
+    """
+    result_json = _load_json(result_text)
+    talk_text = (result_json.get("talk_text") or "").strip()
+    
+    if result_json.get("commands"):
+        structured = StructuredCommand.from_dict(result_json, query=query)
+        get_cache().put(query, True, structured.to_dict())
+        return True, structured
+    elif talk_text:
+        get_cache().put(query, False, talk_text)
+        return False, talk_text
+    else:
+        return False, "我不太理解你的意思，请再说一遍"
+
+
+def _to_structured(query, instruction):
+    """标准指令文本转为结构化意图（本地快速匹配的结果），指令表无法识别时原样返回文本"""
+    spec, _, slots = get_registry().match(normalize_command(instruction), instruction)
+    if spec is None:
+        return instruction
+    return StructuredCommand([(spec, slots)], query)
+
+
+def _from_cache(query, cached):
+    """缓存中的结构化意图（JSON）还原为 StructuredCommand"""
+    is_instruction, result = cached
+    if is_instruction and isinstance(result, dict):
+        try:
+            return True, StructuredCommand.from_dict(result, query=query)
+        except ValueError as e:
+            print(f"[缓存] 结构化意图已失效: {e}")
+            return True, query
+    return cached
+
+
+def _complete(messages, on_talk_text=None):
+    """
+    请求大模型，返回完整输出文本
+    :param on_talk_text: 可选，流式回调，边接收边提取 talk_text 字段
+    """
+    client = get_client(API_KEY, BASE_URL)
+    extra_body = {
+        "enable_search": False,
+        "enable_thinking": False
+    }
+    
+    if on_talk_text is None:
         completion = client.chat.completions.create(
             model=MODEL,
-            messages=[
-                {"role": "system", "content": "严格按照用户提供的输出要求，仅输出JSON格式结果，无需任何额外解释或修饰"},
-                {"role": "user", "content": prompt}
-            ],
+            messages=messages,
             stream=False,
-            extra_body={
-                "enable_search": False,
-                "enable_thinking": False
-            },
+            extra_body=extra_body,
             temperature=0.1
         )
+        _log_cache_usage(completion)
+        return completion.choices[0].message.content.strip()
+    
+    # 流式：边接收边提取 talk_text 字段，闲谈回复的第一句生成完就能开始播报
+    result_text = ""
+    talk_stream = JsonFieldStream("talk_text")
+    for chunk in client.chat.completions.create(
+        model=MODEL,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        extra_body=extra_body,
+        temperature=0.1
+    ):
+        _log_cache_usage(chunk)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content or ""
+        result_text += delta
+        talk_delta = talk_stream.feed(delta)
+        if talk_delta:
+            on_talk_text(talk_delta)
+    return result_text.strip()
+
+
+def _fallback(query, streamed):
+    """
+    意图识别失败时的返回值：原话按指令处理；
+    已经流式播报了部分闲谈回复时按闲谈处理，返回已播报的文字（避免说了一半闲谈又执行指令）
+    """
+    if streamed:
+        return False, "".join(streamed)
+    return True, query
+
+
+def process_query(query, on_talk_text=None, output=None):
+    """
+    处理用户输入，识别意图并转换指令
+    :param query: 用户输入的口语化内容
+    :param on_talk_text: 可选，流式回调；闲谈类回复生成过程中每收到一段新文字就调用一次 on_talk_text(文字)，
+                         可直接接到流式播报上。本地匹配/缓存命中/指令类不会回调
+    :param output: 意图输出格式 "text" / "json"，默认为 INTENT_OUTPUT
+    :return: (is_instruction, result)
+             - is_instruction: True表示是指令类，False表示是闲谈类
+             - result: 标准指令（json 格式下为 StructuredCommand） 或 聊天回复
+    """
+    structured = (output or INTENT_OUTPUT) == "json"
+    if not query or not query.strip():
+        return False, "请说出您的指令或问题"
+    
+    # 本地快速匹配：高置信度的常用指令不再请求大模型
+    local = match_intent(query)
+    if local:
+        print(f"[快速匹配] {query} -> {local.instruction}（{local.method}，置信度{local.confidence:.2f}）")
+        if structured:
+            return True, _to_structured(query, local.instruction)
+        return True, local.instruction
+    
+    # 缓存命中：相同（归一化后）的输入直接返回上次的识别结果
+    cached = get_cache().get(query)
+    if cached:
+        print(f"[缓存] 命中: {query} -> {cached[1]}")
+        return _from_cache(query, cached)
+    
+    result_text = ""
+    # 已经流式播报出去的闲谈文字：之后解析失败也不能再按指令执行原话
+    streamed = []
+    on_talk = None
+    if on_talk_text is not None:
+        def on_talk(text):
+            streamed.append(text)
+            on_talk_text(text)
+    try:
+        system_prompt = build_structured_system_prompt() if structured else build_system_prompt()
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": build_user_prompt(query)}
+        ]
+        result_text = _complete(messages, on_talk)
         
         # 解析返回结果
-        result_text = completion.choices[0].message.content.strip()
-        
-        # 尝试提取JSON（处理可能的markdown代码块）
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-        
-        result_json = json.loads(result_text)
-        
-        standard_inst = result_json.get("standard_instruction", "").strip()
-        talk_text = result_json.get("talk_text", "").strip()
-        
-        if standard_inst:
-            return True, standard_inst
-        else:
-            return False, talk_text if talk_text else "我不太理解你的意思，请再说一遍"
+        if structured:
+            return _parse_structured(query, result_text)
+        return _parse_result(query, result_text)
     
     except json.JSONDecodeError as e:
         print(f"JSON解析错误: {e}, 原始内容: {result_text}")
         # 如果JSON解析失败，直接返回原始查询作为指令
-        return True, query
+        return _fallback(query, streamed)
+    
+    except ValueError as e:
+        print(f"[LLM] 结构化意图校验失败: {e}, 原始内容: {result_text}")
+        # 按原话走指令表文本解析
+        return _fallback(query, streamed)
     
     except Exception as e:
         print(f"LLM处理错误: {e}")
         # 出错时直接返回原始查询
-        return True, query
+        return _fallback(query, streamed)
+
+
+def warm_up():
+    """预热大模型连接（后台执行）"""
+    warm_up_client(API_KEY, BASE_URL)
 
 
-def chat(query):
+def chat(query, on_text=None):
     """
     纯聊天对话（不进行指令转换）
     :param query: 用户输入
+    :param on_text: 可选，流式回调，每收到一段新文字调用一次 on_text(文字)
     :return: 回复内容
     """
     try:
-        client = OpenAI(
-            api_key=API_KEY,
-            base_url=BASE_URL
-        )
+        client = get_client(API_KEY, BASE_URL)
+        messages = [
+            {"role": "system", "content": "你是一个友好的智能语音助手，请用简洁的中文回答用户问题。回答要简短，适合语音播报。"},
+            {"role": "user", "content": query}
+        ]
         
-        completion = client.chat.completions.create(
+        if on_text is None:
+            completion = client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                stream=False,
+                temperature=0.7
+            )
+            return completion.choices[0].message.content.strip()
+        
+        reply = ""
+        for chunk in client.chat.completions.create(
             model=MODEL,
-            messages=[
-                {"role": "system", "content": "你是一个友好的智能语音助手，请用简洁的中文回答用户问题。回答要简短，适合语音播报。"},
-                {"role": "user", "content": query}
-            ],
-            stream=False,
+            messages=messages,
+            stream=True,
             temperature=0.7
-        )
-        
-        return completion.choices[0].message.content.strip()
+        ):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if delta:
+                reply += delta
+                on_text(delta)
+        return reply.strip()
     
     except Exception as e:
         return f"抱歉，我遇到了一些问题：{str(e)}"
 
 
 if __name__ == "__main__":
+    report_prompt_tokens()
+    
     # 测试
     test_queries = [
         "帮我打开一下记事本",
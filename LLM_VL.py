@@ -8,7 +8,7 @@
 import os
 import base64
 import pyautogui
-from openai import OpenAI
+from llm_client import get_client, warm_up as warm_up_client
 
 # 尝试加载 .env
 try:
@@ -54,10 +54,7 @@ def analyze_image(image_path, prompt):
     :return: (success, result)
     """
     try:
-        client = OpenAI(
-            api_key=API_KEY,
-            base_url=BASE_URL,
-        )
+        client = get_client(API_KEY, BASE_URL)
         
         # 将图片转为base64
         image_base64 = image_to_base64(image_path)
@@ -87,6 +84,11 @@ def analyze_image(image_path, prompt):
         return False, f"分析失败：{str(e)}"
 
 
+def warm_up():
+    """预热视觉模型连接（后台执行）"""
+    warm_up_client(API_KEY, BASE_URL)
+
+
 def summarize_screen():
     """
     总结当前屏幕内容
@@ -0,0 +1,357 @@
+# coding=utf-8
+"""
+ADB客户端模块
+功能：直接通过本机 adb server 的 TCP 协议（默认端口5037）控制手机，不再为每个操作启动一个 adb 进程
+支持：设备列表、每个设备一个常驻 shell 会话（shell v2 协议，命令写入已打开的流，按结束标记读取输出和退出码）、
+      设备不支持 shell v2 时退回单次 shell 连接、exec 读取二进制输出（截图）、重启
+说明：adb server 未启动时需要先执行一次 adb start-server（ADBController 会自动处理）
+用法：python adb_client.py [--rounds 20] 对比每个操作在子进程方式和本模块下的耗时（需要连接手机）
+"""
+
+import os
+import sys
+import time
+import socket
+import struct
+import argparse
+import threading
+import subprocess
+
+ADB_HOST = os.getenv("ADB_SERVER_HOST", "127.0.0.1")
+ADB_PORT = int(os.getenv("ADB_SERVER_PORT", "5037"))
+ADB_TIMEOUT = 10  # 单次请求超时（秒）
+
+# shell v2 协议的数据包类型
+_SHELL_STDIN = 0
+_SHELL_STDOUT = 1
+_SHELL_STDERR = 2
+_SHELL_EXIT = 3
+_SHELL_HEADER = struct.Struct("<BI")
+
+
+class ADBError(Exception):
+    """adb server 返回失败或连接出错"""
+
+
+class ADBConnectionError(ADBError):
+    """连接不上 adb server（未启动或端口不对）"""
+
+
+class SessionClosedError(ADBError):
+    """shell会话在命令发出前已断开（命令没有执行，可以换新会话重试）"""
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ADBError("adb连接已断开")
+        data += chunk
+    return bytes(data)
+
+
+def _recv_all(sock):
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def _send_request(sock, service):
+    """发送请求（4位十六进制长度 + 内容）并读取状态"""
+    payload = service.encode("utf-8")
+    sock.sendall(b"%04x" % len(payload) + payload)
+    status = _recv_exact(sock, 4)
+    if status == b"OKAY":
+        return
+    if status == b"FAIL":
+        raise ADBError(_read_hex_payload(sock).decode("utf-8", "replace"))
+    raise ADBError(f"adb server 返回未知状态: {status!r}")
+
+
+def _read_hex_payload(sock):
+    length = int(_recv_exact(sock, 4), 16)
+    return _recv_exact(sock, length)
+
+
+def _decode(data):
+    return data.decode("utf-8", "replace").replace("\r\n", "\n")
+
+
+def _parse_devices(text):
+    devices = []
+    for line in text.splitlines():
+        parts = line.split("\t")
+        if len(parts) >= 2:
+            devices.append((parts[0], parts[1]))
+    return devices
+
+
+def read_devices(sock):
+    """读取 track-devices 连接推送的一次完整设备列表（阻塞到设备有变化）"""
+    return _parse_devices(_read_hex_payload(sock).decode("utf-8", "replace"))
+
+
+class ShellSession:
+    """
+    常驻 shell 会话（shell v2，不分配终端）
+    每条命令后追加 echo 结束标记和退出码，读到标记即为该命令的完整输出
+    """
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._lock = threading.Lock()
+        self._count = 0
+        self.closed = False
+
+    def run(self, command, timeout=ADB_TIMEOUT):
+        """
+        :return: (退出码, 标准输出, 标准错误)
+        :raises SessionClosedError: 命令发出前会话已断开（命令没有执行）
+        :raises ADBError: 命令发出后会话中断或超时（命令可能已执行，不能重试）
+        """
+        with self._lock:
+            if self.closed:
+                raise SessionClosedError("shell会话已关闭")
+            self._count += 1
+            marker = f"__ADB_DONE_{self._count}__"
+            # 标准输入接 /dev/null：读取标准输入的命令不会吞掉后面的结束标记
+            script = f"{{ {command}\n}} </dev/null\necho {marker}$?\n".encode("utf-8")
+            try:
+                self._sock.settimeout(timeout)
+                self._sock.sendall(_SHELL_HEADER.pack(_SHELL_STDIN, len(script)) + script)
+            except OSError as e:
+                self.close()
+                raise SessionClosedError(f"shell会话已断开: {str(e)}")
+            try:
+                return self._read_until(marker.encode("ascii"))
+            except (OSError, ADBError) as e:
+                self.close()
+                raise ADBError(f"shell会话中断: {str(e)}")
+
+    def _read_until(self, marker):
+        stdout, stderr = bytearray(), bytearray()
+        while True:
+            kind, length = _SHELL_HEADER.unpack(_recv_exact(self._sock, _SHELL_HEADER.size))
+            data = _recv_exact(self._sock, length) if length else b""
+            if kind == _SHELL_STDERR:
+                stderr += data
+            elif kind == _SHELL_EXIT:
+                raise ADBError("shell已退出")
+            elif kind == _SHELL_STDOUT:
+                stdout += data
+                index = stdout.find(marker)
+                if index >= 0:
+                    end = stdout.find(b"\n", index)
+                    if end >= 0:
+                        code = int(stdout[index + len(marker):end] or b"-1")
+                        return code, _decode(bytes(stdout[:index])), _decode(bytes(stderr))
+
+    def close(self):
+        self.closed = True
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+
+class ADBClient:
+    """adb server 客户端（线程安全，每个设备复用一个常驻 shell 会话）"""
+
+    def __init__(self, host=ADB_HOST, port=ADB_PORT, timeout=ADB_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._sessions = {}   # 设备序列号 -> ShellSession
+        self._features = {}   # 设备序列号 -> 特性集合
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as e:
+            raise ADBConnectionError(f"无法连接adb server {self.host}:{self.port}: {str(e)}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def host_command(self, service):
+        """执行 host: 请求，返回结果文本（如 host:version、host:devices）"""
+        with self._connect() as sock:
+            _send_request(sock, service)
+            return _read_hex_payload(sock).decode("utf-8", "replace")
+
+    def version(self):
+        return int(self.host_command("host:version"), 16)
+
+    def devices(self):
+        """
+        :return: [(序列号, 状态)]，状态为 device / offline / unauthorized 等
+        """
+        return _parse_devices(self.host_command("host:devices"))
+
+    def track_devices(self):
+        """
+        打开 host:track-devices 长连接：连上后立即推送一次设备列表，之后每次变化推送一次
+        :return: 已打开的socket，用 read_devices(sock) 读取
+        """
+        sock = self._connect()
+        try:
+            _send_request(sock, "host:track-devices")
+        except (OSError, ADBError):
+            sock.close()
+            raise
+        sock.settimeout(None)
+        return sock
+
+    def _transport(self, serial, service):
+        """连接到设备并打开服务，返回已打开的socket"""
+        sock = self._connect()
+        try:
+            _send_request(sock, f"host:transport:{serial}" if serial else "host:transport-any")
+            _send_request(sock, service)
+        except (OSError, ADBError):
+            sock.close()
+            raise
+        return sock
+
+    def features(self, serial):
+        """设备支持的特性（如 shell_v2）"""
+        key = serial or ""
+        if key not in self._features:
+            service = f"host-serial:{serial}:features" if serial else "host:features"
+            self._features[key] = set(self.host_command(service).split(","))
+        return self._features[key]
+
+    def exec_out(self, serial, command):
+        """执行命令并返回原始二进制输出（不经过终端转换，如 screencap -p）"""
+        with self._transport(serial, f"exec:{command}") as sock:
+            sock.settimeout(self.timeout)
+            return _recv_all(sock)
+
+    def _session(self, serial):
+        with self._lock:
+            session = self._sessions.get(serial)
+            if session is None or session.closed:
+                session = ShellSession(self._transport(serial, "shell,v2,raw:"))
+                self._sessions[serial] = session
+            return session
+
+    def shell(self, serial, command, timeout=None):
+        """
+        在设备上执行shell命令
+        :param serial: 设备序列号，None表示唯一连接的设备
+        :return: (退出码, 标准输出, 标准错误)
+        """
+        timeout = timeout or self.timeout
+        if "shell_v2" not in self.features(serial):
+            return self._shell_once(serial, command, timeout)
+        try:
+            return self._session(serial).run(command, timeout)
+        except SessionClosedError:
+            # 命令发出前会话已断开（设备重连、adb server 重启等）：重建一次
+            # 发出后才出错的不重试，否则按电源键、打开应用等操作会执行两次
+            return self._session(serial).run(command, timeout)
+
+    def _shell_once(self, serial, command, timeout):
+        """旧设备（不支持 shell v2）：每条命令一个连接，退出码通过 echo 取得"""
+        marker = "__ADB_EXIT__"
+        with self._transport(serial, f"shell:{command}; echo {marker}$?") as sock:
+            sock.settimeout(timeout)
+            output = _decode(_recv_all(sock))
+        body, _, code = output.rpartition(marker)
+        try:
+            return int(code.strip()), body, ""
+        except ValueError:
+            return -1, output, ""
+
+    def reboot(self, serial):
+        with self._transport(serial, "reboot:") as sock:
+            sock.settimeout(self.timeout)
+            _recv_all(sock)
+
+    def close(self, serial=None):
+        """关闭常驻会话（serial 为 None 时关闭全部）"""
+        with self._lock:
+            keys = list(self._sessions) if serial is None else [serial]
+            for key in keys:
+                session = self._sessions.pop(key, None)
+                if session:
+                    session.close()
+            if serial is None:
+                self._features.clear()
+            else:
+                self._features.pop(serial, None)
+
+
+def start_server():
+    """启动 adb server（首次连接失败时调用）"""
+    try:
+        result = subprocess.run(["adb", "start-server"], capture_output=True, text=True, timeout=ADB_TIMEOUT)
+        return result.returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+# ==================== 基准测试 ====================
+
+# 无副作用的常用操作
+BENCHMARK_ACTIONS = [
+    ("设备列表", "devices", None),
+    ("读取型号", "shell", "getprop ro.product.model"),
+    ("电池信息", "shell", "dumpsys battery"),
+    ("屏幕状态", "shell", "dumpsys power"),
+]
+
+
+def _subprocess_action(kind, command):
+    args = ["adb", "devices"] if kind == "devices" else ["adb", "shell", command]
+    subprocess.run(args, capture_output=True, timeout=ADB_TIMEOUT)
+
+
+def benchmark(client, serial, rounds=20):
+    """
+    :return: [(操作名, 子进程平均ms, 单次连接平均ms, 常驻会话平均ms)]
+    """
+    results = []
+    for name, kind, command in BENCHMARK_ACTIONS:
+        timings = []
+        runners = [
+            lambda: _subprocess_action(kind, command),
+            lambda: client.devices() if kind == "devices" else client._shell_once(serial, command, ADB_TIMEOUT),
+            lambda: client.devices() if kind == "devices" else client.shell(serial, command),
+        ]
+        for run in runners:
+            run()  # 预热（常驻会话在这里建立）
+            start = time.perf_counter()
+            for _ in range(rounds):
+                run()
+            timings.append((time.perf_counter() - start) / rounds * 1000)
+        results.append((name, *timings))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="adb 子进程方式与 adb server 协议直连的耗时对比")
+    parser.add_argument("--rounds", type=int, default=20, help="每个操作执行次数")
+    args = parser.parse_args()
+
+    client = ADBClient()
+    try:
+        print(f"adb server 版本: {client.version()}")
+    except ADBConnectionError:
+        if not start_server():
+            print("无法启动 adb server，请确认已安装adb")
+            sys.exit(1)
+    devices = [serial for serial, state in client.devices() if state == "device"]
+    if not devices:
+        print("未检测到手机连接")
+        sys.exit(1)
+    serial = devices[0]
+    print(f"设备: {serial}，shell v2: {'是' if 'shell_v2' in client.features(serial) else '否'}，每个操作 {args.rounds} 次")
+    print(f"{'操作':<8}{'子进程':>10}{'单次连接':>10}{'常驻会话':>10}")
+    for name, spawn_ms, once_ms, session_ms in benchmark(client, serial, args.rounds):
+        print(f"{name:<8}{spawn_ms:>9.1f}ms{once_ms:>9.1f}ms{session_ms:>9.1f}ms")
+    client.close()
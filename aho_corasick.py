@@ -0,0 +1,81 @@
+# coding=utf-8
+"""
+Aho-Corasick 多模式匹配
+功能：一次扫描文本即可找出所有关键词的出现位置，耗时与关键词数量无关
+"""
+
+from collections import deque
+
+
+class AhoCorasick:
+    """Aho-Corasick 自动机"""
+
+    def __init__(self):
+        self._goto = [{}]      # 状态转移表
+        self._fail = [0]       # 失败指针
+        self._own = [[]]       # 每个状态自身对应的 (关键词, 值)
+        self._output = [[]]    # 每个状态命中的 (关键词, 值)，含失败链上的后缀关键词
+        self._count = 0
+        self._built = False
+
+    def add(self, pattern, value=None):
+        """
+        添加关键词
+        :param pattern: 关键词
+        :param value: 命中时返回的附加值，默认为关键词本身
+        """
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append([])
+            state = nxt
+        self._own[state].append((pattern, pattern if value is None else value))
+        self._count += 1
+        self._built = False
+
+    def build(self):
+        """构建失败指针（添加完所有关键词后调用）"""
+        self._output = [list(own) for own in self._own]
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            current = queue.popleft()
+            for char, nxt in self._goto[current].items():
+                queue.append(nxt)
+                fail = self._fail[current]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+        self._built = True
+
+    def iter_matches(self, text):
+        """
+        扫描文本
+        :return: 生成器，产出 (起始位置, 关键词, 值)
+        """
+        if not self._built:
+            self.build()
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern, value in self._output[state]:
+                yield index - len(pattern) + 1, pattern, value
+
+    def find_all(self, text):
+        """返回所有匹配 [(起始位置, 关键词, 值), ...]"""
+        return list(self.iter_matches(text))
+
+    def __len__(self):
+        return self._count
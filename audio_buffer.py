@@ -0,0 +1,69 @@
+# coding=utf-8
+"""
+内存音频缓冲模块
+功能：录音结果以PCM字节 + 采样参数的形式在内存中传递，无需写临时WAV文件
+"""
+
+import io
+import wave
+
+
+class AudioBuffer:
+    """内存中的PCM音频（16bit小端）"""
+
+    def __init__(self, pcm, sample_rate=16000, channels=1, sample_width=2):
+        """
+        :param pcm: PCM字节（bytes / bytearray / memoryview）
+        :param sample_rate: 采样率
+        :param channels: 声道数
+        :param sample_width: 采样位宽（字节）
+        """
+        self.data = bytes(pcm)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+
+    def __len__(self):
+        return len(self.data)
+
+    def __bool__(self):
+        return len(self.data) > 0
+
+    @property
+    def duration(self):
+        """音频时长（秒）"""
+        return len(self.data) / (self.sample_rate * self.channels * self.sample_width)
+
+    def view(self):
+        """返回只读内存视图，避免拷贝"""
+        return memoryview(self.data)
+
+    def to_wav_bytes(self):
+        """封装为WAV格式字节"""
+        output = io.BytesIO()
+        self._write_wav(output)
+        return output.getvalue()
+
+    def save_wav(self, path):
+        """保存为WAV文件（调试用）"""
+        self._write_wav(path)
+        return path
+
+    def _write_wav(self, target):
+        wf = wave.open(target, 'wb')
+        wf.setnchannels(self.channels)
+        wf.setsampwidth(self.sample_width)
+        wf.setframerate(self.sample_rate)
+        wf.writeframes(self.data)
+        wf.close()
+
+    @classmethod
+    def from_wav(cls, source):
+        """从WAV文件路径或文件对象读取"""
+        with wave.open(source, 'rb') as wf:
+            return cls(
+                wf.readframes(wf.getnframes()),
+                sample_rate=wf.getframerate(),
+                channels=wf.getnchannels(),
+                sample_width=wf.getsampwidth()
+            )
@@ -0,0 +1,250 @@
+# coding=utf-8
+"""
+音频采集服务模块
+功能：全程只打开一次麦克风，唤醒词检测和指令录音共享同一个输入流
+支持：环形缓冲保存最近的音频帧，录音可以从唤醒词结束的那一帧接着开始；PCM帧零拷贝转换为采样序列；
+      用音频文件代替麦克风（离线测试、基准测试）
+"""
+
+import sys
+import time
+import queue
+import struct
+import threading
+from collections import deque
+
+try:
+    import pyaudio
+except ImportError:
+    pyaudio = None
+
+
+class PCMFrameView:
+    """
+    把一帧16bit小端PCM字节转换为采样序列（供Porcupine等按采样处理的模块使用）
+    小端主机上直接 memoryview.cast('h')，不复制数据、不创建Python整数元组；
+    大端主机或帧长不符时退回到预编译的 struct.Struct 解包
+    """
+
+    def __init__(self, frame_length):
+        self.frame_length = frame_length
+        self._struct = struct.Struct("<%dh" % frame_length)
+        self._zero_copy = sys.byteorder == "little"
+
+    def __call__(self, pcm):
+        if self._zero_copy and len(pcm) == self._struct.size:
+            return memoryview(pcm).cast('h')
+        if len(pcm) < self._struct.size:
+            pcm = bytes(pcm) + b'\x00' * (self._struct.size - len(pcm))
+        return self._struct.unpack_from(pcm)
+
+
+class AudioSubscription:
+    """音频帧订阅者，每个订阅者有独立的帧队列"""
+
+    def __init__(self, service):
+        self.service = service
+        self.frames = queue.Queue()
+        self.last_seq = None  # 最近读取到的帧序号
+        self.last_time = None  # 最近读取到的帧的采集完成时间（time.monotonic）
+        self.closed = False
+
+    def read(self, timeout=None):
+        """
+        读取下一帧音频
+        :param timeout: 超时时间（秒），None表示一直等待
+        :return: PCM字节，采集已停止或超时返回None
+        """
+        if self.closed:
+            return None
+        try:
+            seq, frame, captured_at = self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if frame is None:
+            return None
+        self.last_seq = seq
+        self.last_time = captured_at
+        return frame
+
+    def close(self):
+        """取消订阅"""
+        if not self.closed:
+            self.closed = True
+            self.service._unsubscribe(self)
+
+
+class AudioCaptureService:
+    """常驻音频采集服务：一个PyAudio实例 + 一个输入流 + 环形缓冲"""
+
+    def __init__(self, rate=16000, frame_length=512, channels=1, history_seconds=3.0):
+        """
+        :param rate: 采样率
+        :param frame_length: 每帧采样数（与Porcupine的frame_length保持一致）
+        :param channels: 声道数
+        :param history_seconds: 环形缓冲保留的历史时长（秒）
+        """
+        self.rate = rate
+        self.frame_length = frame_length
+        self.channels = channels
+        self.history = deque(maxlen=max(1, int(rate / frame_length * history_seconds)))
+        self.seq = 0  # 最新帧序号
+
+        self._pa = None
+        self._stream = None
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """打开麦克风并启动后台采集线程"""
+        if self._running:
+            return True
+        if pyaudio is None:
+            print("[采集] pyaudio未安装，无法打开麦克风")
+            return False
+
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            rate=self.rate,
+            channels=self.channels,
+            format=pyaudio.paInt16,
+            input=True,
+            frames_per_buffer=self.frame_length
+        )
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+        print(f"[采集] 麦克风已打开（{self.rate}Hz，每帧{self.frame_length}采样）")
+        return True
+
+    def _capture_loop(self):
+        """后台线程：持续读取音频并分发给所有订阅者"""
+        try:
+            while self._running:
+                frame = self._stream.read(self.frame_length, exception_on_overflow=False)
+                self._publish(frame)
+        except Exception as e:
+            if self._running:
+                print(f"[采集] 读取音频出错: {str(e)}")
+        finally:
+            self._running = False
+            self._publish(None)
+
+    def _publish(self, frame):
+        """写入环形缓冲并分发给订阅者，frame为None表示采集结束"""
+        captured_at = time.monotonic()
+        with self._lock:
+            if frame is not None:
+                self.seq += 1
+                self.history.append((self.seq, frame, captured_at))
+            for sub in self._subscribers:
+                sub.frames.put((self.seq, frame, captured_at))
+
+    def subscribe(self, from_seq=None):
+        """
+        订阅音频帧
+        :param from_seq: 从该序号之后的帧开始（会先回放环形缓冲中的历史帧），None表示只接收新帧
+        :return: AudioSubscription
+        """
+        sub = AudioSubscription(self)
+        with self._lock:
+            if from_seq is not None:
+                for item in self.history:
+                    if item[0] > from_seq:
+                        sub.frames.put(item)
+            self._subscribers.append(sub)
+        return sub
+
+    def _unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def stop(self):
+        """停止采集并释放麦克风"""
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+        try:
+            if self._stream:
+                self._stream.stop_stream()
+                self._stream.close()
+            if self._pa:
+                self._pa.terminate()
+        except Exception:
+            pass
+        self._stream = None
+        self._pa = None
+
+
+class FileCaptureService(AudioCaptureService):
+    """用音频文件代替麦克风：按（可加速的）实时速率逐帧分发，全部文件播完后采集结束"""
+
+    def __init__(self, paths, rate=16000, frame_length=512, channels=1, history_seconds=3.0,
+                 speed=1.0, gap_seconds=1.0):
+        """
+        :param paths: 音频文件路径列表（wav/mp3等，按顺序读取）
+        :param speed: 播放速度倍数，1.0为实时
+        :param gap_seconds: 文件之间插入的静音时长（秒）
+        """
+        super().__init__(rate, frame_length, channels, history_seconds)
+        self.paths = list(paths)
+        self.speed = speed
+        self.gap_seconds = gap_seconds
+        self.finished = False  # 文件已全部读完
+        self.position = 0.0    # 最新一帧在输入音频中的结束时间（秒）
+
+    def start(self):
+        if self._running:
+            return True
+        from vad import load_pcm_file
+
+        self._pcm = []
+        for path in self.paths:
+            try:
+                self._pcm.append(load_pcm_file(path, self.rate))
+            except Exception as e:
+                print(f"[采集] 读取音频文件失败: {path}（{str(e)}）")
+        if not self._pcm:
+            return False
+        self.finished = False
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+        print(f"[采集] 从{len(self._pcm)}个音频文件读取（{self.speed:g}倍速）")
+        return True
+
+    def _capture_loop(self):
+        frame_bytes = self.frame_length * 2 * self.channels
+        interval = self.frame_length / self.rate
+        gap = b'\x00' * (int(self.gap_seconds * self.rate) * 2 * self.channels)
+        data = gap.join(self._pcm) + gap
+        start = time.monotonic()
+        count = 0
+        try:
+            for offset in range(0, len(data) - frame_bytes + 1, frame_bytes):
+                if not self._running:
+                    return
+                count += 1
+                delay = start + count * interval / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self.position = count * interval
+                self._publish(data[offset:offset + frame_bytes])
+            self.finished = True
+        finally:
+            self._running = False
+            self._publish(None)
+
+    def stop(self):
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
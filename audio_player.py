@@ -0,0 +1,270 @@
+# coding=utf-8
+"""
+音频播放模块
+功能：在内存中解码音频后排队播放，前一段结束时下一段已在声道队列里，段与段之间无缝衔接
+支持：播放完成事件/回调（不轮询播放状态）、随时打断（stop）、播放统计
+说明：基于 pygame.mixer 的 Sound/Channel；每段的结束时间由音频时长算出，播放线程按时间等待而不是反复查询
+"""
+
+import io
+import sys
+import math
+import time
+import wave
+import threading
+from array import array
+from collections import deque
+
+import pygame
+
+# 播放结束时间的容差（秒）：到点后声道仍在播放同一段时，再等待的时间
+END_TOLERANCE = 0.01
+
+
+class PlaybackHandle:
+    """单段音频的播放句柄"""
+
+    def __init__(self, sound, on_done=None):
+        self.sound = sound
+        self.duration = sound.get_length() if sound else 0.0
+        self.on_done = on_done
+        self.started_at = None
+        self.ended_at = None
+        self.interrupted = False
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        等待播放结束
+        :return: 是否完整播放（被打断或解码失败返回False）
+        """
+        self._done.wait(timeout)
+        return self._done.is_set() and not self.interrupted
+
+    def _finish(self, interrupted=False):
+        if self._done.is_set():
+            return
+        self.interrupted = interrupted
+        self.ended_at = time.time()
+        self._done.set()
+        if self.on_done:
+            try:
+                self.on_done(self)
+            except Exception as e:
+                print(f"[播放] 回调错误: {str(e)}")
+
+
+class AudioPlayer:
+    """排队播放器：独占一个声道，播放线程负责把下一段放入声道队列并在每段结束时发出完成事件"""
+
+    def __init__(self):
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        self.channel = pygame.mixer.Channel(0)
+        pygame.mixer.set_reserved(1)  # 声道0只给本播放器使用
+
+        self._pending = deque()   # 等待播放的句柄
+        self._current = None      # 正在播放的句柄
+        self._queued = None       # 已放入声道队列的句柄
+        self._cond = threading.Condition()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._running = True
+        self.stats = {"played": 0, "interrupted": 0, "failed": 0}
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def decode(audio):
+        """
+        解码音频（mp3/wav 数据）
+        :return: pygame.mixer.Sound，失败返回None
+        """
+        try:
+            return pygame.mixer.Sound(file=io.BytesIO(audio))
+        except Exception as e:
+            print(f"[播放] 解码失败: {str(e)}")
+            return None
+
+    def play(self, audio, on_done=None):
+        """
+        加入播放队列（不阻塞）
+        :param audio: 音频数据(bytes) 或 已解码的 Sound
+        :param on_done: 播放结束回调 on_done(handle)，在播放线程中调用
+        :return: PlaybackHandle
+        """
+        sound = audio if isinstance(audio, pygame.mixer.Sound) else self.decode(audio)
+        handle = PlaybackHandle(sound, on_done)
+        if sound is None:
+            self.stats["failed"] += 1
+            handle._finish(interrupted=True)
+            return handle
+        with self._cond:
+            self._pending.append(handle)
+            self._idle.clear()
+            self._cond.notify_all()
+        return handle
+
+    def play_and_wait(self, audio):
+        """
+        播放并等待结束
+        :return: 是否完整播放
+        """
+        return self.play(audio).wait()
+
+    def _pending_count(self):
+        return len(self._pending) + (self._current is not None) + (self._queued is not None)
+
+    def pending_count(self):
+        """还未播完的段数（含正在播放的）"""
+        with self._cond:
+            return self._pending_count()
+
+    def wait_pending(self, max_pending=1):
+        """等待未播完的段数不超过 max_pending（用于流水线背压：下一段能及时入队，又不会积压）"""
+        with self._cond:
+            while self._running and self._pending_count() > max_pending:
+                self._cond.wait()
+
+    def wait_idle(self, timeout=None):
+        """
+        等待队列全部播完
+        :return: 是否在超时前播完
+        """
+        return self._idle.wait(timeout)
+
+    @property
+    def busy(self):
+        return not self._idle.is_set()
+
+    def stop(self):
+        """打断：停止当前播放并清空队列"""
+        with self._cond:
+            handles = [h for h in (self._current, self._queued) if h] + list(self._pending)
+            self._pending.clear()
+            self._current = self._queued = None
+            self.channel.stop()
+            self._idle.set()
+            self._cond.notify_all()
+        for handle in handles:
+            self.stats["interrupted"] += 1
+            handle._finish(interrupted=True)
+        return len(handles)
+
+    def set_volume(self, volume):
+        """设置音量（0.0~1.0），用于播报时临时压低音量"""
+        self.channel.set_volume(volume)
+
+    def close(self):
+        self.stop()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            finished = []
+            with self._cond:
+                if not self._running:
+                    return
+
+                # 当前段到达预计结束时间：声道已切到队列中的下一段，或已空闲，则判定结束
+                current = self._current
+                if current and time.time() >= current.started_at + current.duration:
+                    if self._queued and self.channel.get_sound() is self._queued.sound:
+                        finished.append(current)
+                        self._queued.started_at = current.started_at + current.duration
+                        self._current, self._queued = self._queued, None
+                    elif not self.channel.get_busy():
+                        finished.extend(h for h in (current, self._queued) if h)
+                        self._current = self._queued = None
+
+                # 声道空闲：直接播放下一段
+                if self._current is None and self._pending:
+                    self._current = self._pending.popleft()
+                    self.channel.play(self._current.sound)
+                    self._current.started_at = time.time()
+
+                # 正在播放：把下一段放进声道队列，前一段结束时由混音器无缝切换
+                if self._current and self._queued is None and self._pending:
+                    self._queued = self._pending.popleft()
+                    self.channel.queue(self._queued.sound)
+
+                if self._current is None:
+                    self._idle.set()
+
+                if finished:
+                    self._cond.notify_all()
+                else:
+                    # 等到当前段预计结束，或有新的段/打断
+                    timeout = None
+                    if self._current:
+                        timeout = max(END_TOLERANCE,
+                                      self._current.started_at + self._current.duration - time.time())
+                    self._cond.wait(timeout)
+
+            for handle in finished:
+                self.stats["played"] += 1
+                handle._finish()
+
+
+def make_earcon(freqs=(880, 1320), tone_seconds=0.08, rate=22050, volume=0.3):
+    """
+    生成提示音（依次播放的几个短音，带淡入淡出），不依赖网络和音频文件
+    :return: wav 音频数据(bytes)
+    """
+    samples = array('h')
+    fade = int(rate * 0.01)
+    count = int(rate * tone_seconds)
+    for freq in freqs:
+        for i in range(count):
+            envelope = min(1.0, i / fade, (count - i) / fade)
+            samples.append(int(32767 * volume * envelope * math.sin(2 * math.pi * freq * i / rate)))
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+_player = None
+_player_lock = threading.Lock()
+
+
+def get_player():
+    """获取全局播放器"""
+    global _player
+    with _player_lock:
+        if _player is None:
+            _player = AudioPlayer()
+        return _player
+
+
+if __name__ == "__main__":
+    files = sys.argv[1:]
+    clips = [open(f, "rb").read() for f in files] if files else [make_earcon((f,), 0.4) for f in (440, 550, 660, 880)]
+
+    player = get_player()
+    start = time.time()
+    handles = [player.play(clip, on_done=lambda h, i=i: print(
+        f"  第{i + 1}段结束 {(time.time() - start) * 1000:.0f}ms（时长{h.duration * 1000:.0f}ms）"))
+        for i, clip in enumerate(clips)]
+    player.wait_idle()
+    total = sum(h.duration for h in handles)
+    print(f"总时长 {total * 1000:.0f}ms，实际 {(time.time() - start) * 1000:.0f}ms")
+
+    # 打断测试
+    player.play(clips[0])
+    player.play(clips[1])
+    time.sleep(0.1)
+    print(f"打断 {player.stop()} 段")
+    print(player.stats)
@@ -0,0 +1,210 @@
+# coding=utf-8
+"""
+百度API鉴权模块
+功能：统一管理 Access Token，ASR/TTS 等所有百度接口共用
+支持：按 expires_in 缓存、本地文件持久化（重启免请求）、到期前后台自动刷新、鉴权失败后强制刷新
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+import http_pool
+
+# 尝试加载 .env
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+API_KEY = os.getenv("BAIDU_API_KEY", "")
+SECRET_KEY = os.getenv("BAIDU_SECRET_KEY", "")
+TOKEN_URL = os.getenv("BAIDU_TOKEN_URL", "https://aip.baidubce.com/oauth/2.0/token")
+
+# Token缓存文件
+TOKEN_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".baidu_token.json")
+
+# 提前多久刷新（秒），Token有效期约30天
+REFRESH_MARGIN = 24 * 3600
+
+# 表示Token无效/过期的错误码
+# 3302: 语音识别鉴权失败；502: 语音合成Token无效；110/111: 通用接口Token无效/过期
+AUTH_ERROR_CODES = {3302, 502, 110, 111}
+
+
+def is_auth_error(result):
+    """判断接口返回结果是否为鉴权错误"""
+    if not isinstance(result, dict):
+        return False
+    code = result.get("err_no", result.get("error_code"))
+    try:
+        return int(code) in AUTH_ERROR_CODES
+    except (TypeError, ValueError):
+        return False
+
+
+class TokenManager:
+    """Access Token 管理器"""
+
+    def __init__(self, api_key=API_KEY, secret_key=SECRET_KEY,
+                 token_url=TOKEN_URL, cache_file=TOKEN_CACHE_FILE):
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.token_url = token_url
+        self.cache_file = cache_file
+
+        self.token = None
+        self.expires_at = 0
+        self._lock = threading.Lock()
+        self._timer = None
+
+        self._load_cache()
+
+    @property
+    def _key_id(self):
+        """用于区分不同API Key的缓存标识（不保存明文Key）"""
+        return hashlib.sha1(self.api_key.encode("utf-8")).hexdigest()[:16]
+
+    def _load_cache(self):
+        """从本地文件读取缓存的Token"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get("key_id") == self._key_id and cache.get("expires_at", 0) > time.time():
+                self.token = cache["access_token"]
+                self.expires_at = cache["expires_at"]
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+    def _save_cache(self):
+        """保存Token到本地文件"""
+        try:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "key_id": self._key_id,
+                    "access_token": self.token,
+                    "expires_at": self.expires_at
+                }, f)
+        except OSError as e:
+            print(f"[鉴权] 保存Token缓存失败: {str(e)}")
+
+    def _is_valid(self):
+        return self.token is not None and time.time() < self.expires_at - 60
+
+    def get_token(self):
+        """
+        获取有效的Access Token，缓存有效时不发起网络请求
+        :return: access_token，失败返回None
+        """
+        if self._is_valid():
+            return self.token
+        return self.refresh()
+
+    def refresh(self, force=False):
+        """
+        向鉴权服务请求新的Token
+        :param force: 是否忽略缓存强制刷新（用于接口返回鉴权错误时）
+        :return: access_token，失败返回None
+        """
+        with self._lock:
+            # 其他线程可能已经刷新过
+            if not force and self._is_valid():
+                return self.token
+
+            params = {
+                "grant_type": "client_credentials",
+                "client_id": self.api_key,
+                "client_secret": self.secret_key
+            }
+            try:
+                response = http_pool.post(self.token_url, params=params, timeout=10)
+                result = response.json()
+            except Exception as e:
+                print(f"[鉴权] 获取Token失败: {str(e)}")
+                return self.token if self._is_valid() else None
+
+            token = result.get("access_token")
+            if not token:
+                print(f"[鉴权] 获取Token失败: {result.get('error_description', result)}")
+                return None
+
+            self.token = str(token)
+            self.expires_at = time.time() + int(result.get("expires_in", 2592000))
+            self._save_cache()
+            self._schedule_refresh()
+            return self.token
+
+    def invalidate(self):
+        """标记当前Token失效"""
+        with self._lock:
+            self.token = None
+            self.expires_at = 0
+
+    def start_auto_refresh(self):
+        """启动后台自动刷新，在到期前 REFRESH_MARGIN 秒刷新"""
+        with self._lock:
+            self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        if self._timer:
+            self._timer.cancel()
+        if not self.token:
+            return
+        delay = max(60, self.expires_at - time.time() - REFRESH_MARGIN)
+        self._timer = threading.Timer(delay, self._auto_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _auto_refresh(self):
+        print("[鉴权] Token即将过期，正在后台刷新...")
+        expires_at = self.expires_at
+        self.refresh(force=True)
+        if self.expires_at <= expires_at:
+            # 刷新失败（旧Token仍有效时 refresh 会返回旧Token，不能据此判断），稍后重试
+            with self._lock:
+                if self._timer:
+                    self._timer.cancel()
+                self._timer = threading.Timer(300, self._auto_refresh)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def stop(self):
+        """停止后台刷新"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+
+# 全局Token管理器
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_token_manager():
+    """获取全局Token管理器"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = TokenManager()
+        return _manager
+
+
+def get_access_token():
+    """
+    使用 AK，SK 生成鉴权签名（Access Token），优先使用缓存
+    :return: access_token，或是None(如果错误)
+    """
+    return get_token_manager().get_token()
+
+
+if __name__ == "__main__":
+    manager = get_token_manager()
+    start = time.time()
+    token = manager.get_token()
+    print(f"Token: {token[:12] + '...' if token else None}")
+    print(f"耗时: {(time.time() - start) * 1000:.0f}ms")
+    if token:
+        print(f"剩余有效期: {(manager.expires_at - time.time()) / 86400:.1f}天")
@@ -0,0 +1,128 @@
+# coding=utf-8
+"""
+播报打断模块（barge-in）
+功能：播报期间继续检测唤醒词，用户说唤醒词时立即停止播报，直接开始录下一条指令（停止词只停止播报）
+支持：回声抑制（只有在麦克风能量明显高于播报回声时才接受检测结果，避免播报内容本身触发）、
+      检测到有人说话时压低播报音量（ducking），便于唤醒词识别
+"""
+
+import time
+import threading
+
+from vad import frame_energy
+from audio_capture import PCMFrameView
+
+# 压低后的播报音量（0.0~1.0）
+DUCK_VOLUME = 0.3
+# 压低音量后保持的时间（秒）
+DUCK_HOLD = 0.8
+# 麦克风能量超过回声基线的倍数时，认为有人在说话
+NEAR_END_RATIO = 2.0
+# 回声基线的最小值（16bit PCM 的 RMS），避免安静环境下基线过低
+MIN_ECHO_LEVEL = 200
+# 判定有人说话后，在该时间（秒）内的唤醒词检测结果有效
+NEAR_END_WINDOW = 1.5
+# 开始监听后用于估计回声基线的帧数
+CALIBRATION_FRAMES = 10
+
+
+class BargeInMonitor:
+    """播报期间的唤醒词监听线程"""
+
+    def __init__(self, capture, wake_engine, on_barge_in, player=None):
+        """
+        :param capture: 音频采集服务（AudioCaptureService）
+        :param wake_engine: 唤醒词引擎（WakeEngine，监听期间不能在其他线程使用）
+        :param on_barge_in: 检测到打断时的回调 on_barge_in(WakeKeyword)，在监听线程中调用
+        :param player: 播放器（AudioPlayer），用于压低音量
+        """
+        self.capture = capture
+        self.wake_engine = wake_engine
+        self.on_barge_in = on_barge_in
+        self.player = player
+
+        self.triggered = threading.Event()
+        self.keyword = None  # 触发打断的唤醒词
+        self.seq = None  # 唤醒词结束时的帧序号，录音从这里接着开始
+        self.stats = {"frames": 0, "rejected": 0}
+        self._stop = threading.Event()
+        self._thread = None
+        self._subscription = None
+
+    def start(self):
+        self._subscription = self.capture.subscribe()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止监听（恢复播报音量）"""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _set_volume(self, volume):
+        if self.player:
+            self.player.set_volume(volume)
+
+    def _run(self):
+        to_samples = PCMFrameView(self.wake_engine.frame_length)
+        frame_bytes = self.wake_engine.frame_length * 2
+        echo_level = None
+        calibration = []
+        last_near_end = 0.0
+        ducked_until = 0.0
+        try:
+            while not self._stop.is_set():
+                pcm = self._subscription.read(timeout=0.1)
+                if pcm is None:
+                    if not self.capture.running:
+                        break
+                    continue
+                if len(pcm) < frame_bytes:
+                    continue
+                samples = to_samples(pcm)
+                self.stats["frames"] += 1
+                now = time.time()
+
+                # 回声基线：播报声音经扬声器传回麦克风的能量，只用“安静”的帧缓慢更新
+                energy = frame_energy(samples)
+                if echo_level is None:
+                    calibration.append(energy)
+                    if len(calibration) >= CALIBRATION_FRAMES:
+                        echo_level = max(MIN_ECHO_LEVEL, sorted(calibration)[len(calibration) // 2])
+                elif energy > echo_level * NEAR_END_RATIO:
+                    last_near_end = now
+                    if not ducked_until:
+                        self._set_volume(DUCK_VOLUME)
+                    ducked_until = now + DUCK_HOLD
+                else:
+                    echo_level = max(MIN_ECHO_LEVEL, echo_level * 0.95 + energy * 0.05)
+
+                if ducked_until and now > ducked_until:
+                    ducked_until = 0.0
+                    self._set_volume(1.0)
+
+                keyword = self.wake_engine.process(samples, self._subscription.last_time)
+                if keyword is not None:
+                    if now - last_near_end > NEAR_END_WINDOW:
+                        # 没有检测到近端说话，多半是播报内容本身触发
+                        self.stats["rejected"] += 1
+                        continue
+                    print(f"\n[打断] 检测到“{keyword.name}”，停止播报")
+                    self.keyword = keyword
+                    self.seq = self._subscription.last_seq
+                    self.triggered.set()
+                    self.on_barge_in(keyword)
+                    break
+        except Exception as e:
+            print(f"[打断] 监听错误: {str(e)}")
+        finally:
+            self._subscription.close()
+            self._set_volume(1.0)
@@ -0,0 +1,663 @@
+# coding=utf-8
+"""
+指令注册表模块
+功能：声明式登记所有标准指令（触发关键词、附加条件、参数提取、处理方法、优先级、是否需要手机），
+      所有关键词编译进一个 Aho-Corasick 自动机，扫描一遍指令文本即可确定处理方法
+支持：按优先级和命中关键词长度消解多条指令同时命中的情况、缺少参数时的提示语、
+      需要手机的指令统一检查连接、解析统计
+说明：处理方法由执行指令的对象（VoiceInteractionSystem）提供，方法名为 cmd_<指令名>(ctx, **参数)
+"""
+
+import re
+import time
+import threading
+
+from aho_corasick import AhoCorasick
+
+# 复合指令连接词
+COMPOUND_CONNECTORS = ["并", "然后", "再", "接着", "之后"]
+
+# 子指令占用的资源
+SCREEN = "screen"   # 前台窗口、键盘鼠标、截屏
+PHONE = "phone"
+MUSIC = "music"
+ALL_RESOURCES = (SCREEN, PHONE, MUSIC)
+
+NO_DEVICE_TEXT = "未检测到手机连接"
+CANCELLED_TEXT = "本轮已取消，指令未执行"
+UNKNOWN_TEXT = "抱歉，我不理解指令：{command}，请说帮助查看可用功能"
+
+# 结构化意图中各参数的说明（用于生成提示词和 JSON Schema）
+SLOT_DESCRIPTIONS = {
+    "keyword": "搜索或播放的关键词",
+    "friend": "微信联系人",
+    "content": "消息内容",
+    "app_name": "手机应用名称",
+    "direction": "调节方向，up 增加 / down 减少",
+    "topic": "文档主题",
+    "article_type": "文档类型（文章、作文、报告、论文、总结、计划、方案、心得、感想、日记、故事）",
+}
+# 取值固定的参数
+SLOT_VALUES = {"direction": ("up", "down")}
+
+
+def normalize_command(text):
+    """指令归一化：去掉标点空格、转小写"""
+    return text.replace("，", "").replace("。", "").replace(" ", "").lower()
+
+
+def _strip(text, words):
+    for word in words:
+        text = text.replace(word, "")
+    return text.strip()
+
+
+class Command:
+    """一条指令的声明"""
+
+    def __init__(self, name, triggers, priority=0, also=(), excludes=(), extract=None,
+                 slots=(), required=(), prompt=None, needs_device=False, resources=(), ready=None,
+                 weak_triggers=(), weak_priority=0, description=""):
+        """
+        :param name: 指令名，处理方法为 cmd_<name>
+        :param triggers: 触发关键词，命中任意一个即为候选
+        :param priority: 优先级，多条指令同时命中时取最高的（相同时取命中关键词最长的，再相同取先登记的）
+        :param also: 附加条件，每组关键词至少命中一个，如 (("发", "消息", "信息"),)
+        :param excludes: 命中任意一个则不匹配
+        :param extract: 参数提取函数 extract(归一化指令, 原始指令) -> dict
+        :param slots: 参数名
+        :param required: 必填参数，缺少时返回 prompt
+        :param prompt: 缺少必填参数时的提示语
+        :param needs_device: 是否需要连接手机
+        :param resources: 占用的资源（"screen" 前台窗口/键鼠、"phone"、"music"），
+                          复合指令中占用相同资源的子指令按顺序执行，其余并发执行
+        :param ready: 就绪条件 (类型, 名称列表)，类型为 "process" 新进程出现 / "window" 标题含名称的新窗口出现，
+                      名称可引用参数如 "{keyword}"；复合指令中后面的子指令依赖它时，等就绪后再执行
+        :param weak_triggers: 含义较泛的触发词（也是触发词），只按 weak_priority 参与比较，
+                              同时命中其他指令的关键词时让给它们，如“打开记事本写日记”是打开记事本
+        :param weak_priority: 弱触发词的优先级
+        :param description: 说明
+        """
+        self.name = name
+        self.triggers = tuple(triggers) + tuple(w for w in weak_triggers if w not in triggers)
+        self.priority = priority
+        self.weak_triggers = frozenset(weak_triggers)
+        self.weak_priority = weak_priority
+        self.also = tuple(tuple(group) for group in also)
+        self.excludes = tuple(excludes)
+        self.extract = extract
+        self.slots = tuple(slots)
+        self.required = tuple(required)
+        self.prompt = prompt
+        self.needs_device = needs_device
+        self.resources = frozenset(resources)
+        self.ready = ready
+        self.description = description
+        self.order = 0  # 登记顺序
+
+    @property
+    def handler_name(self):
+        return f"cmd_{self.name}"
+
+    def accepts(self, found):
+        """根据命中的关键词集合判断附加条件"""
+        if any(word in found for word in self.excludes):
+            return False
+        return all(any(word in found for word in group) for group in self.also)
+
+    def __repr__(self):
+        return f"Command({self.name!r}, priority={self.priority})"
+
+
+def format_call(spec, slots):
+    """指令名+参数的显示文本，如 bilibili(keyword=猫咪)"""
+    return f"{spec.name}(" + ", ".join(f"{k}={v}" for k, v in slots.items()) + ")"
+
+
+class StructuredCommand:
+    """
+    结构化意图：大模型（或本地匹配）直接给出的指令名和参数，执行时不再解析指令文本
+    """
+
+    def __init__(self, items, query=""):
+        """
+        :param items: [(Command, 参数dict)]，多条表示复合指令
+        :param query: 用户原话
+        """
+        self.items = list(items)
+        self.query = query
+
+    def to_dict(self):
+        return {"commands": [{"intent": spec.name, "slots": dict(slots)} for spec, slots in self.items]}
+
+    @classmethod
+    def from_dict(cls, data, registry=None, query=""):
+        """
+        :raises ValueError: 不符合指令表生成的 Schema
+        """
+        registry = registry or get_registry()
+        if not isinstance(data, dict):
+            raise ValueError("结构化意图必须是JSON对象")
+        return cls(registry.parse_intents(data.get("commands")), query)
+
+    def __str__(self):
+        return "；".join(format_call(spec, slots) for spec, slots in self.items)
+
+
+class CommandContext:
+    """处理方法的调用上下文"""
+
+    def __init__(self, system, command, original, is_subcommand=False, cancelled=None):
+        self.system = system
+        self.command = command        # 归一化后的指令
+        self.original = original      # 原始指令
+        self.is_subcommand = is_subcommand
+        self._cancelled = cancelled   # 返回True表示本轮已取消（打断/超时）
+
+    @property
+    def cancelled(self):
+        """本轮是否已取消：多步操作的处理方法在每个有副作用的步骤前检查"""
+        return bool(self._cancelled and self._cancelled())
+
+    def notify(self, text):
+        """耗时操作开始前的提示（复合指令的子指令、已取消的轮次不播报）"""
+        if not self.is_subcommand and not self.cancelled:
+            self.system.text_to_speech(text)
+
+
+class CommandRegistry:
+    """指令注册表"""
+
+    def __init__(self):
+        self.commands = []
+        self._automaton = None
+        self._by_trigger = {}   # 触发关键词 -> [Command]
+        self._lock = threading.Lock()
+        self.stats = {"resolved": 0, "unknown": 0, "resolve_ms": 0.0, "hits": {}}
+
+    def register(self, name, triggers, **kwargs):
+        """登记一条指令，返回 Command"""
+        command = Command(name, triggers, **kwargs)
+        command.order = len(self.commands)
+        self.commands.append(command)
+        self._automaton = None
+        return command
+
+    def get(self, name):
+        for command in self.commands:
+            if command.name == name:
+                return command
+        return None
+
+    def compile(self):
+        """把所有触发词、附加条件词、排除词编译进一个自动机"""
+        automaton = AhoCorasick()
+        by_trigger = {}
+        words = set()
+        for command in self.commands:
+            for word in command.triggers:
+                by_trigger.setdefault(word, []).append(command)
+                words.add(word)
+            for group in command.also:
+                words.update(group)
+            words.update(command.excludes)
+        for word in words:
+            automaton.add(word)
+        automaton.build()
+        self._by_trigger = by_trigger
+        self._automaton = automaton
+
+    def resolve(self, command):
+        """
+        确定归一化指令对应的处理方法（只扫描一遍文本）
+        :return: (Command, 命中的触发词)，没有匹配返回 (None, None)
+        """
+        if self._automaton is None:
+            self.compile()
+        found = {word for _, word, _ in self._automaton.iter_matches(command)}
+        best, best_key, best_trigger = None, None, None
+        for word in found:
+            for candidate in self._by_trigger.get(word, ()):
+                priority = candidate.weak_priority if word in candidate.weak_triggers else candidate.priority
+                key = (priority, len(word), -candidate.order)
+                if (best_key is None or key > best_key) and candidate.accepts(found):
+                    best, best_key, best_trigger = candidate, key, word
+        return best, best_trigger
+
+    def find_keywords(self, command):
+        """
+        指令中所有已登记关键词的位置
+        :return: [(起始位置, 关键词)]
+        """
+        if self._automaton is None:
+            self.compile()
+        return [(start, word) for start, word, _ in self._automaton.iter_matches(command)]
+
+    def match(self, command, original=None):
+        """
+        解析指令并提取参数（计入统计）
+        :return: (Command, 命中的触发词, 参数)，没有匹配返回 (None, None, None)
+        """
+        start = time.perf_counter()
+        spec, trigger = self.resolve(command)
+        cost = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.stats["resolve_ms"] += cost
+            if spec is None:
+                self.stats["unknown"] += 1
+            else:
+                self.stats["resolved"] += 1
+                self.stats["hits"][spec.name] = self.stats["hits"].get(spec.name, 0) + 1
+        if spec is None:
+            return None, None, None
+        slots = spec.extract(command, original or command) if spec.extract else {}
+        return spec, trigger, slots
+
+    def dispatch(self, system, command, original=None, is_subcommand=False, cancelled=None):
+        """
+        解析并执行一条（非复合）指令
+        :param system: 提供 cmd_<指令名> 处理方法和 device_connected() 的对象
+        :param command: 归一化后的指令
+        :param original: 原始指令
+        :param cancelled: 返回True表示本轮已取消的函数，取消后不再调用处理方法
+        :return: 执行结果文本
+        """
+        spec, trigger, slots = self.match(command, original)
+        if spec is None:
+            return UNKNOWN_TEXT.format(command=command)
+        print(f"[执行] 匹配指令: {spec.name}（关键词“{trigger}”）")
+        return self.call(system, spec, slots, command, original, is_subcommand, cancelled)
+
+    def call(self, system, spec, slots, command="", original=None, is_subcommand=False, cancelled=None):
+        """按参数调用处理方法（检查必填参数、手机连接和本轮是否已取消）"""
+        if any(not slots.get(name) for name in spec.required):
+            return spec.prompt
+        if spec.needs_device and not system.device_connected():
+            return NO_DEVICE_TEXT
+        ctx = CommandContext(system, command, original or command, is_subcommand, cancelled)
+        if ctx.cancelled:
+            print(f"[执行] 本轮已取消，跳过: {spec.name}")
+            return CANCELLED_TEXT
+        return getattr(system, spec.handler_name)(ctx, **slots)
+
+    # ==================== 结构化意图 ====================
+
+    def intent_schema(self):
+        """
+        由指令表生成结构化意图输出的 JSON Schema：
+        {"commands": [{"intent": 指令名, "slots": {参数名: 字符串}}], "talk_text": 闲谈回复}
+        """
+        variants = []
+        for command in self.commands:
+            properties = {}
+            for name in command.slots:
+                prop = {"type": "string", "description": SLOT_DESCRIPTIONS.get(name, name)}
+                if name in SLOT_VALUES:
+                    prop["enum"] = list(SLOT_VALUES[name])
+                properties[name] = prop
+            variants.append({
+                "type": "object",
+                "properties": {
+                    "intent": {"const": command.name},
+                    # 必填参数不在 Schema 中强制：用户没说时执行该指令会返回提示语
+                    "slots": {"type": "object", "properties": properties, "additionalProperties": False},
+                },
+                "required": ["intent", "slots"],
+                "additionalProperties": False,
+            })
+        return {
+            "type": "object",
+            "properties": {
+                "commands": {"type": "array", "items": {"oneOf": variants}},
+                "talk_text": {"type": "string"},
+            },
+            "required": ["commands", "talk_text"],
+        }
+
+    def describe_intents(self):
+        """意图列表的文字说明（放进提示词）"""
+        lines = []
+        for command in self.commands:
+            line = f"- {command.name}：{command.description}"
+            if command.slots:
+                slots = [f"{name}（{SLOT_DESCRIPTIONS.get(name, name)}{'，必填' if name in command.required else ''}）"
+                         for name in command.slots]
+                line += "；参数 " + "、".join(slots)
+            lines.append(line)
+        return "\n".join(lines)
+
+    def parse_intents(self, items):
+        """
+        按 intent_schema 校验结构化意图
+        :param items: [{"intent": 指令名, "slots": {...}}]
+        :return: [(Command, 参数dict)]
+        :raises ValueError: 未知意图、未知参数、参数类型或取值不对
+        """
+        if not isinstance(items, list):
+            raise ValueError("commands 必须是列表")
+        result = []
+        for item in items:
+            if not isinstance(item, dict):
+                raise ValueError(f"意图必须是JSON对象: {item!r}")
+            spec = self.get(item.get("intent"))
+            if spec is None:
+                raise ValueError(f"未知的意图: {item.get('intent')!r}")
+            slots = item.get("slots") or {}
+            if not isinstance(slots, dict):
+                raise ValueError(f"{spec.name} 的 slots 必须是JSON对象")
+            unknown = set(slots) - set(spec.slots)
+            if unknown:
+                raise ValueError(f"{spec.name} 没有参数: {', '.join(sorted(unknown))}")
+            clean = {}
+            for name, value in slots.items():
+                if value is None or value == "":
+                    continue
+                if not isinstance(value, str):
+                    raise ValueError(f"{spec.name}.{name} 必须是字符串")
+                value = value.strip()
+                if name in SLOT_VALUES and value not in SLOT_VALUES[name]:
+                    raise ValueError(f"{spec.name}.{name} 取值必须是 {'/'.join(SLOT_VALUES[name])}")
+                clean[name] = value
+            result.append((spec, clean))
+        return result
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats, hits=dict(self.stats["hits"]))
+        total = stats["resolved"] + stats["unknown"]
+        stats["avg_resolve_ms"] = stats["resolve_ms"] / total if total else 0.0
+        return stats
+
+
+# ==================== 参数提取 ====================
+
+def extract_browser_search(command, original):
+    keyword = command
+    for prefix in ["打开", "用", "在"]:
+        if keyword.startswith(prefix):
+            keyword = keyword[len(prefix):]
+    keyword = _strip(keyword, ["浏览器", "搜索", "百度"])
+    # 移除可能的连接词（复合指令场景）
+    for connector in COMPOUND_CONNECTORS:
+        if connector in keyword:
+            keyword = keyword.split(connector)[0].strip()
+    return {"keyword": keyword.strip()}
+
+
+def extract_bilibili(command, original):
+    keyword = _strip(command, ["打开", "b站", "bilibili", "哔哩哔哩", "播放", "视频", "搜索"])
+    for prefix in ["在", "用", "去"]:
+        if keyword.startswith(prefix):
+            keyword = keyword[len(prefix):]
+    return {"keyword": keyword}
+
+
+def extract_taobao(command, original):
+    return {"keyword": _strip(command, ["打开", "淘宝", "搜索", "商品"])}
+
+
+_WECHAT_PATTERNS = [
+    (re.compile(r"发(.+?)(?:信息|消息)?给(.+)"), ("content", "friend")),
+    (re.compile(r"给(.+?)发(.+?)(?:信息|消息)?$"), ("friend", "content")),
+]
+
+
+def extract_wechat(command, original):
+    """解析：打开微信发XXX信息给XXX 或 打开微信给XXX发XXX"""
+    for pattern, names in _WECHAT_PATTERNS:
+        match = pattern.search(command)
+        if match:
+            return {name: match.group(i + 1).strip() for i, name in enumerate(names)}
+    return {}
+
+
+def extract_music(command, original):
+    return {"keyword": _strip(command, ["播放", "音乐", "歌曲", "歌", "打开", "帮我", "听", "放"])}
+
+
+def extract_phone_open(command, original):
+    return {"app_name": _strip(command, ["打开手机", "上的"])}
+
+
+def extract_phone_close(command, original):
+    return {"app_name": _strip(command, ["关闭手机", "上的"])}
+
+
+def extract_volume(command, original):
+    if any(word in command for word in ("增加", "调大", "加")):
+        return {"direction": "up"}
+    if any(word in command for word in ("减少", "调小", "减")):
+        return {"direction": "down"}
+    return {}
+
+
+def extract_document(command, original):
+    # 延迟导入：word 模块依赖 python-docx 和大模型客户端
+    from word import parse_write_command
+    topic, article_type = parse_write_command(original)
+    return {"topic": topic, "article_type": article_type}
+
+
+# ==================== 标准指令表 ====================
+
+def build_default_registry():
+    """
+    标准指令表（与 Instruction.txt 对应）
+    优先级：手机操作 90 > 音乐控制 85 > B站/淘宝/微信 80 > 播放音乐 75 > 屏幕总结翻译/文档 70
+          > 电脑程序 60 > 时间日期 40 > 帮助/退出 20 > 手机状态兜底 0
+    """
+    registry = CommandRegistry()
+    add = registry.register
+
+    # 系统信息
+    add("query_time", ["时间", "几点"], priority=40, description="查询时间")
+    add("query_date", ["日期", "几号", "星期"], priority=40, description="查询日期")
+
+    # 电脑程序
+    add("open_notepad", ["打开记事本", "记事本"], priority=60, resources=(SCREEN,),
+        ready=("process", ["notepad.exe"]), description="打开记事本")
+    add("open_paint", ["打开画图", "画图"], priority=60, resources=(SCREEN,),
+        ready=("process", ["mspaint.exe"]), description="打开画图")
+    # 明确说“打开浏览器”/“浏览器搜索”时，搜索内容里的网站名（淘宝、微信、b站……）不抢占
+    add("browser_search", ["打开浏览器", "浏览器搜索"], priority=85, weak_triggers=["浏览器"], weak_priority=60,
+        extract=extract_browser_search,
+        slots=("keyword",), required=("keyword",),
+        prompt="请说出要搜索的内容，例如：打开浏览器搜索Python教程", resources=(SCREEN,),
+        ready=("window", ["{keyword}"]), description="浏览器搜索")
+    add("open_baidu", ["打开百度"], priority=65, resources=(SCREEN,),
+        ready=("window", ["百度"]), description="打开百度")
+    add("open_cmd", ["打开命令行", "命令提示符", "cmd"], priority=60, resources=(SCREEN,),
+        ready=("process", ["cmd.exe"]), description="打开命令行")
+    add("open_explorer", ["打开资源管理器", "文件管理", "我的电脑"], priority=60, resources=(SCREEN,),
+        ready=("window", ["文件资源管理器", "此电脑", "File Explorer", "This PC"]), description="打开资源管理器")
+
+    # 网站/应用
+    add("bilibili", ["b站", "bilibili", "哔哩哔哩"], priority=80, extract=extract_bilibili,
+        slots=("keyword",), required=("keyword",),
+        prompt="请说出要搜索的视频关键词，例如：打开B站播放音乐视频", resources=(SCREEN,),
+        ready=("window", ["哔哩哔哩", "bilibili"]), description="B站搜索视频")
+    # “打开手机淘宝”由优先级更高的手机指令处理
+    add("taobao", ["淘宝"], priority=80, extract=extract_taobao,
+        slots=("keyword",), required=("keyword",),
+        prompt="请说出要搜索的商品，例如：打开淘宝搜索手机壳", resources=(SCREEN,),
+        ready=("window", ["淘宝", "taobao"]), description="淘宝搜索商品")
+    add("wechat_send", ["微信"], priority=80, also=(("发", "消息", "信息"),), extract=extract_wechat,
+        slots=("friend", "content"), required=("friend", "content"),
+        prompt="请说出完整指令，例如：打开微信发你好给张三", resources=(SCREEN,), description="微信发消息")
+
+    # 音乐
+    add("music_play", ["播放"], priority=75, also=(("音乐", "歌", "歌曲"),), extract=extract_music,
+        slots=("keyword",), resources=(SCREEN, MUSIC), ready=("window", ["网易云音乐"]),
+        description="播放音乐（有关键词时搜索歌曲）")
+    add("music_next", ["下一首", "切歌"], priority=85, resources=(MUSIC,), description="下一首")
+    add("music_previous", ["上一首"], priority=85, resources=(MUSIC,), description="上一首")
+    add("music_pause", ["暂停音乐", "暂停播放"], priority=85, resources=(MUSIC,), description="暂停音乐")
+    add("music_stop", ["停止音乐", "关闭音乐"], priority=85, resources=(MUSIC,), description="停止音乐")
+
+    # 视觉大模型
+    add("summarize_screen", ["总结"], priority=70, also=(("当前", "屏幕", "内容", "界面", "搜索"),),
+        resources=(SCREEN,), description="总结屏幕内容")
+    add("translate_screen", ["翻译"], priority=70, also=(("当前", "屏幕", "界面", "搜索"),),
+        resources=(SCREEN,), description="翻译屏幕内容")
+
+    # 文档
+    # 文体词也可能是写进其他程序的内容（“打开记事本写日记”），优先级低于打开程序
+    add("write_document", ["文档", "word"], priority=70, also=(("写", "创建", "生成"),),
+        weak_triggers=["文章", "作文", "报告", "论文", "计划", "方案", "心得", "日记", "总结"], weak_priority=50,
+        extract=extract_document, slots=("topic", "article_type"), description="生成Word文档")
+
+    # 手机
+    add("phone_open_app", ["打开手机"], priority=90, extract=extract_phone_open, slots=("app_name",),
+        required=("app_name",), prompt="请说出要打开的应用名称，例如：打开手机微信", needs_device=True, resources=(PHONE,),
+        description="打开手机应用")
+    add("phone_close_app", ["关闭手机"], priority=90, excludes=("应用",), extract=extract_phone_close,
+        slots=("app_name",), required=("app_name",), prompt="请说出要关闭的应用名称", needs_device=True, resources=(PHONE,),
+        description="关闭手机应用")
+    add("phone_screenshot", ["手机截图", "手机截屏"], priority=90, needs_device=True, resources=(PHONE,), description="手机截图")
+    add("phone_back", ["手机返回", "返回键"], priority=90, needs_device=True, resources=(PHONE,), description="手机返回")
+    add("phone_home", ["手机主页", "主页键", "回到桌面"], priority=90, needs_device=True, resources=(PHONE,), description="手机主页")
+    add("phone_unlock", ["手机亮屏", "点亮屏幕", "解锁手机"], priority=90, needs_device=True, resources=(PHONE,), description="亮屏解锁")
+    add("phone_lock", ["手机息屏", "锁屏", "手机锁屏"], priority=90, needs_device=True, resources=(PHONE,), description="手机锁屏")
+    add("phone_volume", ["手机音量"], priority=90, extract=extract_volume, slots=("direction",),
+        required=("direction",), prompt="请说手机音量增加或手机音量减少", needs_device=True, resources=(PHONE,),
+        description="调节手机音量")
+    add("phone_swipe_up", ["手机上滑"], priority=90, needs_device=True, resources=(PHONE,), description="手机上滑")
+    add("phone_swipe_down", ["手机下滑"], priority=90, needs_device=True, resources=(PHONE,), description="手机下滑")
+    add("phone_reboot", ["重启手机"], priority=90, needs_device=True, resources=(PHONE,), description="重启手机")
+    # 其他含“手机”的指令都落到检查手机状态
+    add("phone_status", ["手机", "检查手机"], priority=0, resources=(PHONE,), description="检查手机连接状态")
+
+    # 系统控制
+    add("exit", ["退出", "再见"], priority=20, resources=ALL_RESOURCES, description="退出")
+    add("help", ["帮助", "能做什么", "功能"], priority=20, description="帮助")
+
+    registry.compile()
+    return registry
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """获取全局指令注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = build_default_registry()
+        return _registry
+
+
+# ==================== 基准测试 ====================
+
+# 标准指令语料（Instruction.txt 中的标准指令，XXX/YYY 已填入示例）-> 期望的指令名
+STANDARD_CORPUS = [
+    ("查询时间", "query_time"), ("查询日期", "query_date"), ("查询星期", "query_date"),
+    ("打开记事本", "open_notepad"), ("打开画图", "open_paint"), ("打开浏览器搜索python教程", "browser_search"),
+    ("打开浏览器搜索淘宝", "browser_search"), ("打开浏览器搜索微信发消息", "browser_search"),
+    ("浏览器搜索b站", "browser_search"),
+    ("打开百度", "open_baidu"), ("打开命令行", "open_cmd"), ("打开资源管理器", "open_explorer"),
+    ("打开B站播放搞笑视频", "bilibili"), ("打开B站播放音乐视频", "bilibili"),
+    ("打开淘宝搜索手机壳商品", "taobao"), ("打开微信发明天见信息给张三", "wechat_send"),
+    ("打开微信发我回来了信息给老妈", "wechat_send"),
+    ("播放周杰伦歌曲", "music_play"), ("播放音乐", "music_play"), ("下一首", "music_next"),
+    ("上一首", "music_previous"), ("暂停音乐", "music_pause"), ("停止音乐", "music_stop"),
+    ("总结当前内容", "summarize_screen"), ("翻译当前界面", "translate_screen"),
+    ("打开文档写入一篇保护环境文章", "write_document"), ("创建一篇年终总结报告", "write_document"),
+    ("写一篇春节作文", "write_document"), ("生成一份项目计划", "write_document"),
+    ("写一篇关于时间管理的文章", "write_document"), ("打开文档写日记", "write_document"),
+    ("打开记事本写日记", "open_notepad"), ("用记事本写个计划", "open_notepad"), ("打开画图写个方案", "open_paint"),
+    ("退出", "exit"), ("帮助", "help"),
+    ("检查手机", "phone_status"), ("打开手机微信", "phone_open_app"), ("打开手机淘宝", "phone_open_app"),
+    ("关闭手机抖音", "phone_close_app"), ("手机截图", "phone_screenshot"), ("手机返回", "phone_back"),
+    ("手机主页", "phone_home"), ("手机亮屏", "phone_unlock"), ("解锁手机", "phone_unlock"),
+    ("手机息屏", "phone_lock"), ("手机音量增加", "phone_volume"), ("手机音量减少", "phone_volume"),
+    ("手机上滑", "phone_swipe_up"), ("手机下滑", "phone_swipe_down"), ("重启手机", "phone_reboot"),
+]
+
+
+def _has(c, *words):
+    return any(w in c for w in words)
+
+
+# 原 execute_command 中 if/elif 链的匹配顺序（只判断命中哪个分支，用于对比）
+_LEGACY_CHAIN = [
+    ("query_time", lambda c: _has(c, "时间", "几点")),
+    ("query_date", lambda c: _has(c, "日期", "几号", "星期")),
+    ("open_notepad", lambda c: _has(c, "打开记事本", "记事本")),
+    ("open_paint", lambda c: _has(c, "打开画图", "画图")),
+    ("browser_search", lambda c: _has(c, "打开浏览器", "浏览器")),
+    ("open_baidu", lambda c: _has(c, "打开百度")),
+    ("open_cmd", lambda c: _has(c, "打开命令行", "命令提示符", "cmd")),
+    ("open_explorer", lambda c: _has(c, "打开资源管理器", "文件管理", "我的电脑")),
+    ("bilibili", lambda c: _has(c, "b站", "bilibili", "哔哩哔哩")),
+    ("taobao", lambda c: _has(c, "淘宝") and not _has(c, "手机")),
+    ("wechat_send", lambda c: _has(c, "微信") and _has(c, "发", "消息", "信息")),
+    ("music_play", lambda c: _has(c, "播放") and _has(c, "音乐", "歌", "歌曲")),
+    ("music_next", lambda c: _has(c, "下一首", "切歌")),
+    ("music_previous", lambda c: _has(c, "上一首")),
+    ("music_pause", lambda c: _has(c, "暂停音乐", "暂停播放")),
+    ("music_stop", lambda c: _has(c, "停止音乐", "关闭音乐")),
+    ("summarize_screen", lambda c: _has(c, "总结") and _has(c, "当前", "屏幕", "内容", "界面", "搜索")),
+    ("translate_screen", lambda c: _has(c, "翻译") and _has(c, "当前", "屏幕", "界面", "搜索")),
+    ("write_document", lambda c: _has(c, "文档", "word") and _has(c, "写", "创建", "生成")),
+    ("phone_open_app", lambda c: _has(c, "打开手机")),
+    ("phone_close_app", lambda c: _has(c, "关闭手机") and not _has(c, "应用")),
+    ("phone_screenshot", lambda c: _has(c, "手机截图", "手机截屏")),
+    ("phone_back", lambda c: _has(c, "手机返回", "返回键")),
+    ("phone_home", lambda c: _has(c, "手机主页", "主页键", "回到桌面")),
+    ("phone_unlock", lambda c: _has(c, "手机亮屏", "点亮屏幕", "解锁手机")),
+    ("phone_lock", lambda c: _has(c, "手机息屏", "锁屏", "手机锁屏")),
+    ("phone_volume", lambda c: _has(c, "手机音量")),
+    ("phone_swipe_up", lambda c: _has(c, "手机上滑")),
+    ("phone_swipe_down", lambda c: _has(c, "手机下滑")),
+    ("phone_reboot", lambda c: _has(c, "重启手机")),
+    ("phone_status", lambda c: _has(c, "手机", "检查手机")),
+    ("exit", lambda c: _has(c, "退出", "再见")),
+    ("help", lambda c: _has(c, "帮助", "能做什么", "功能")),
+]
+
+
+def _legacy_resolve(c):
+    for name, matched in _LEGACY_CHAIN:
+        if matched(c):
+            return name
+    return None
+
+
+def benchmark(registry, corpus=STANDARD_CORPUS, rounds=2000):
+    """
+    对比注册表与原 if/elif 链：标准指令的匹配正确率和每条指令的解析耗时
+    :return: {"registry": (正确数, 每条耗时us), "legacy": (...), "total": 条数, "diff": [(指令, 原结果, 新结果)]}
+    """
+    commands = [(normalize_command(text), expected) for text, expected in corpus]
+    resolvers = {
+        "registry": lambda c: (registry.resolve(c)[0] or Command(None, ())).name,
+        "legacy": _legacy_resolve,
+    }
+    result = {"total": len(commands), "diff": []}
+    for label, resolve in resolvers.items():
+        correct = sum(resolve(c) == expected for c, expected in commands)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for c, _ in commands:
+                resolve(c)
+        per_command = (time.perf_counter() - start) / (rounds * len(commands)) * 1e6
+        result[label] = (correct, per_command)
+    for c, expected in commands:
+        old, new = _legacy_resolve(c), resolvers["registry"](c)
+        if old != new:
+            result["diff"].append((c, old, new))
+    return result
+
+
+if __name__ == "__main__":
+    registry = get_registry()
+    print(f"已登记 {len(registry.commands)} 条指令")
+    report = benchmark(registry)
+    total = report["total"]
+    for label, name in (("legacy", "原 if/elif 链"), ("registry", "指令注册表")):
+        correct, per_command = report[label]
+        print(f"{name}：正确 {correct}/{total}，每条解析 {per_command:.1f}us")
+    for command, old, new in report["diff"]:
+        print(f"  结果不同：{command}  原: {old}  现: {new}")
@@ -0,0 +1,318 @@
+# coding=utf-8
+"""
+复合指令规划模块
+功能：把“打开记事本并查询时间然后打开浏览器搜索天气”这类复合指令拆成任意条子指令，
+      按子指令占用的资源（前台窗口/手机/音乐，见 command_registry）确定依赖关系：
+      互不相关的子指令在线程池中并发执行，占用相同资源的按顺序执行，
+      后一条要等前一条就绪（新进程/新窗口出现）后才开始，代替固定等待3秒
+支持：就绪检测超时、无法检测时（非Windows/未安装psutil）回退为固定等待
+"""
+
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from command_registry import get_registry, format_call, COMPOUND_CONNECTORS
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 子指令并发线程数
+COMPOUND_WORKERS = int(os.getenv("COMPOUND_WORKERS", "4"))
+# 等待前一条子指令就绪的最长时间（秒）
+READY_TIMEOUT = float(os.getenv("COMPOUND_READY_TIMEOUT", "8"))
+READY_POLL_INTERVAL = 0.1
+# 无法检测就绪时的固定等待（秒）
+READY_FALLBACK_SECONDS = 3
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """获取子指令线程池"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=COMPOUND_WORKERS, thread_name_prefix="command")
+        return _executor
+
+
+# ==================== 就绪检测 ====================
+
+def list_windows():
+    """
+    当前可见的顶层窗口
+    :return: {窗口句柄: 标题}，非Windows平台返回None
+    """
+    if sys.platform != "win32":
+        return None
+    import ctypes
+    from ctypes import wintypes
+
+    user32 = ctypes.windll.user32
+    windows = {}
+
+    @ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    def callback(hwnd, lparam):
+        if user32.IsWindowVisible(hwnd):
+            length = user32.GetWindowTextLengthW(hwnd)
+            if length:
+                buffer = ctypes.create_unicode_buffer(length + 1)
+                user32.GetWindowTextW(hwnd, buffer, length + 1)
+                windows[hwnd] = buffer.value
+        return True
+
+    user32.EnumWindows(callback, 0)
+    return windows
+
+
+def list_processes():
+    """
+    当前进程
+    :return: {pid: 小写进程名}，未安装psutil返回None
+    """
+    if psutil is None:
+        return None
+    processes = {}
+    for proc in psutil.process_iter(["pid", "name"]):
+        name = proc.info.get("name")
+        if name:
+            processes[proc.info["pid"]] = name.lower()
+    return processes
+
+
+class ReadinessProbe:
+    """
+    子指令的就绪检测：执行前记录快照，执行后等待
+    process：出现名称匹配的新进程；window：出现标题包含名称的新窗口（或已有窗口的标题变为包含名称，如浏览器标签页跳转）
+    """
+
+    def __init__(self, kind, names, list_windows=list_windows, list_processes=list_processes):
+        self.kind = kind
+        self.names = [n.lower() for n in names if n]
+        self._list = list_windows if kind == "window" else list_processes
+        self._baseline = None
+
+    def snapshot(self):
+        self._baseline = self._list()
+
+    def _matches(self, text):
+        text = text.lower()
+        return any(name == text if self.kind == "process" else name in text for name in self.names)
+
+    def is_ready(self, current):
+        baseline = self._baseline or {}
+        return any(self._matches(text) and baseline.get(key) != text for key, text in current.items())
+
+    def wait(self, timeout=READY_TIMEOUT):
+        """
+        :return: True 已就绪，False 超时，None 无法检测（已固定等待）
+        """
+        if self._baseline is None or not self.names:
+            time.sleep(READY_FALLBACK_SECONDS)
+            return None
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._list()
+            if current is not None and self.is_ready(current):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(READY_POLL_INTERVAL)
+
+
+# ==================== 规划与执行 ====================
+
+class Step:
+    """一条子指令"""
+
+    def __init__(self, index, text, spec, slots, original=None):
+        self.index = index
+        self.text = text
+        self.original = original or text
+        self.spec = spec
+        self.slots = slots
+        self.deps = []          # 依赖的子指令序号
+        self.wait_ready = False  # 有后续子指令依赖它且声明了就绪条件
+
+    def describe(self):
+        deps = f"（等待第{'、'.join(str(d + 1) for d in self.deps)}条）" if self.deps else "（无依赖）"
+        return f"{self.index + 1}. {self.text} -> {self.spec.name}{deps}"
+
+
+def split_compound(command, registry=None):
+    """
+    按连接词拆分指令（连接词是已登记关键词的一部分时不拆，如“再见”）
+    :return: 子指令列表（只有一条表示不是复合指令）
+    """
+    registry = registry or get_registry()
+    protected = [(start, start + len(word)) for start, word in registry.find_keywords(command)
+                 if word not in COMPOUND_CONNECTORS]
+    cuts = []
+    for connector in sorted(COMPOUND_CONNECTORS, key=len, reverse=True):
+        start = command.find(connector)
+        while start >= 0:
+            end = start + len(connector)
+            overlaps = any(s < end and start < e for s, e in protected + cuts)
+            if not overlaps:
+                cuts.append((start, end))
+            start = command.find(connector, end)
+    parts, position = [], 0
+    for start, end in sorted(cuts):
+        parts.append(command[position:start])
+        position = end
+    parts.append(command[position:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+class CompoundPlanner:
+    """复合指令规划器"""
+
+    def __init__(self, registry=None, executor=None, list_windows=list_windows, list_processes=list_processes):
+        self.registry = registry or get_registry()
+        self.executor = executor
+        self._list_windows = list_windows
+        self._list_processes = list_processes
+
+    def plan(self, command):
+        """
+        拆分复合指令并确定依赖
+        :param command: 归一化后的指令
+        :return: Step 列表；不是复合指令（或有子指令无法识别，整句按一条指令处理）时返回None
+        """
+        parts = split_compound(command, self.registry)
+        if len(parts) < 2:
+            return None
+        steps = []
+        for index, text in enumerate(parts):
+            spec, trigger, slots = self.registry.match(text)
+            if spec is None:
+                print(f"[复合指令] 子指令无法识别：{text}，按整句处理")
+                return None
+            steps.append(Step(index, text, spec, slots))
+        return self._link(steps)
+
+    def plan_items(self, items, query=""):
+        """
+        结构化意图（StructuredCommand.items）直接生成子指令，不再拆分和解析文本
+        :param items: [(Command, 参数)]
+        """
+        return self._link([Step(index, format_call(spec, slots), spec, slots, query)
+                           for index, (spec, slots) in enumerate(items)])
+
+    def _link(self, steps):
+        # 每种资源最后一个使用者：后面占用同一资源的子指令依赖它
+        last_user = {}
+        for step in steps:
+            deps = {last_user[r] for r in step.spec.resources if r in last_user}
+            step.deps = sorted(deps)
+            for dep in step.deps:
+                if steps[dep].spec.ready:
+                    steps[dep].wait_ready = True
+            for resource in step.spec.resources:
+                last_user[resource] = step.index
+        return steps
+
+    def _probe(self, step):
+        kind, names = step.spec.ready
+        names = [name.format(**step.slots) for name in names]
+        return ReadinessProbe(kind, names, self._list_windows, self._list_processes)
+
+    def _run_step(self, system, step, deps, cancelled=None):
+        for future in deps:
+            future.result()
+        probe = None
+        if step.wait_ready:
+            probe = self._probe(step)
+            probe.snapshot()
+        start = time.perf_counter()
+        try:
+            result = self.registry.call(system, step.spec, step.slots, step.text, step.original,
+                                        is_subcommand=True, cancelled=cancelled)
+        except Exception as e:
+            print(f"[复合指令] 第{step.index + 1}条执行失败: {str(e)}")
+            return f"{step.text}执行失败"
+        print(f"[复合指令] 第{step.index + 1}条执行结果（{(time.perf_counter() - start) * 1000:.0f}ms）: {result}")
+        if probe is not None and not (cancelled and cancelled()):
+            start = time.perf_counter()
+            ready = probe.wait(READY_TIMEOUT)
+            state = {True: "已就绪", False: "等待超时", None: "无法检测，固定等待"}[ready]
+            print(f"[复合指令] 第{step.index + 1}条{state}（{(time.perf_counter() - start) * 1000:.0f}ms）")
+        return result
+
+    def execute(self, system, steps, cancelled=None):
+        """
+        执行子指令：每条提交到线程池，先等依赖的子指令完成并就绪再执行
+        （子指令只依赖排在它前面的子指令，线程池按提交顺序执行，不会互相等待卡死）
+        :param cancelled: 返回True表示本轮已取消的函数，取消后尚未开始的子指令不再执行
+        :return: 合并后的结果文本
+        """
+        print(f"[复合指令] 拆分为{len(steps)}条：")
+        for step in steps:
+            print(f"  {step.describe()}")
+        executor = self.executor or get_executor()
+        futures = []
+        for step in steps:
+            deps = [futures[i] for i in step.deps]
+            futures.append(executor.submit(self._run_step, system, step, deps, cancelled))
+        results = [future.result() for future in futures]
+        results = [r for r in results if r]
+        return "，".join(results) if results else "指令执行完成"
+
+
+_planner = None
+_planner_lock = threading.Lock()
+
+
+def get_planner():
+    """获取全局复合指令规划器"""
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            _planner = CompoundPlanner()
+        return _planner
+
+
+if __name__ == "__main__":
+    # 演示：用模拟的处理方法和窗口列表，对比原来的顺序执行（含固定等待3秒）
+    from command_registry import normalize_command
+
+    windows = {}
+
+    class DemoSystem:
+        def device_connected(self):
+            return True
+
+        def text_to_speech(self, text):
+            pass
+
+        def __getattr__(self, name):
+            def handler(ctx, **slots):
+                time.sleep(0.3)
+                if name == "cmd_browser_search":
+                    # 模拟浏览器0.5秒后打开搜索结果页
+                    timer = threading.Timer(0.5, windows.__setitem__, (1, f"{slots['keyword']}_百度搜索"))
+                    timer.start()
+                return f"{name[4:]}完成"
+            return handler
+
+    planner = CompoundPlanner(executor=ThreadPoolExecutor(max_workers=COMPOUND_WORKERS),
+                              list_windows=lambda: dict(windows), list_processes=lambda: {})
+    for text in ["打开记事本并查询时间", "打开浏览器搜索天气然后总结当前内容并查询日期", "退出再见"]:
+        windows.clear()
+        command = normalize_command(text)
+        steps = planner.plan(command)
+        if steps is None:
+            print(f"\n{text}：不是复合指令")
+            continue
+        print(f"\n{text}")
+        start = time.perf_counter()
+        result = planner.execute(DemoSystem(), steps)
+        elapsed = time.perf_counter() - start
+        sequential = 0.3 * len(steps) + (3 if any(s.spec.name == "browser_search" for s in steps[:-1]) else 0)
+        print(f"结果：{result}\n耗时 {elapsed:.2f}秒（原顺序执行约 {sequential:.1f}秒）")
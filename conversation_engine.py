@@ -0,0 +1,366 @@
+# coding=utf-8
+"""
+对话引擎模块
+功能：用 asyncio 串联一轮对话的各个阶段：唤醒/触发 -> 录音 -> 识别 -> 意图识别 -> 执行指令 -> 播报
+支持：阶段之间通过队列衔接、每个阶段单独超时、取消当前轮次（打断/超时）、事件回调（命令行和图形界面共用）
+说明：各阶段调用的仍是 VoiceInteractionSystem 的同步方法，放到后台线程里执行，
+      事件循环本身不会被录音、网络请求或播放阻塞
+"""
+
+import time
+import asyncio
+import threading
+import itertools
+
+from voice_wake_word.wake_engine import ACTION_QUICK, ACTION_STOP
+
+# 各阶段超时（秒），None表示不限时
+STAGE_TIMEOUTS = {
+    "ack": 5,
+    "capture": 20,
+    "recognize": 15,
+    "intent": 20,
+    "execute": 90,
+    "speak": 180,
+}
+
+STAGE_NAMES = {
+    "ack": "应答",
+    "capture": "录音",
+    "recognize": "识别",
+    "intent": "意图识别",
+    "execute": "执行指令",
+    "speak": "播报",
+}
+
+# 流水线阶段（按顺序），每个阶段一个队列和一个处理协程
+PIPELINE = ["capture", "recognize", "intent", "execute", "speak"]
+
+RETRY_TEXT = "抱歉，没有听清，请再说一遍"
+
+# 唤醒监听无法开始（如麦克风打不开）时的重试间隔（秒），每次失败翻倍，直到上限
+WAKE_RETRY_INTERVAL = 0.5
+WAKE_RETRY_MAX_INTERVAL = 30
+# 连续失败这么多次后停止语音唤醒，改为回车触发
+WAKE_MAX_FAILURES = 6
+
+
+class StageTimeout(Exception):
+    """阶段超时"""
+
+
+class Turn:
+    """一轮对话"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, source, text=None):
+        """
+        :param source: 触发来源："wake" 唤醒词、"quick" 快捷唤醒词（不播放应答）、"barge_in" 播报被打断、
+                       "keyboard" 回车、"voice" 界面按钮、"text" 文字输入
+        :param text: 文字输入时直接给出的内容
+        """
+        self.id = next(self._ids)
+        self.source = source
+        self.text = text
+        self.audio = None
+        self.recognizer = None
+        self.is_instruction = False
+        self.result = None
+        self.speech = None          # 流式播报对象
+        self.monitor = None         # 播报打断监听
+        self.cancelled = False
+        self.interrupted = False    # 被唤醒词打断
+        self.next_source = None     # 被打断后紧接着开始的下一轮的触发来源
+        self.timings = {}           # 阶段 -> 耗时（毫秒）
+        self.done = asyncio.Event()
+
+    @property
+    def first_stage(self):
+        """文字输入跳过录音和识别"""
+        return "capture" if self.text is None else "intent"
+
+
+class ConversationEngine:
+    """对话引擎"""
+
+    def __init__(self, system, timeouts=None, on_event=None):
+        """
+        :param system: VoiceInteractionSystem 实例
+        :param timeouts: 覆盖默认的阶段超时
+        :param on_event: 事件回调 on_event(事件名, turn)，在事件循环线程中调用
+                         事件：listening、recognizing、recognized、thinking、result、speaking、done、failed
+        """
+        self.system = system
+        self.timeouts = dict(STAGE_TIMEOUTS, **(timeouts or {}))
+        self.on_event = on_event
+
+        self.loop = None
+        self.queues = {}
+        self.running = False
+        self.active = set()   # 进行中的轮次
+        self._thread = None
+        self._ready = threading.Event()
+        self._tasks = []
+
+    # ========== 阶段 ==========
+    def _emit(self, event, turn):
+        if self.on_event:
+            try:
+                self.on_event(event, turn)
+            except Exception as e:
+                print(f"[引擎] 事件回调错误: {str(e)}")
+
+    def _in_thread(self, func, *args):
+        """
+        在守护线程中执行同步函数，返回可等待的 Future
+        （不用默认线程池：超时或退出时阻塞中的录音/输入不会拖住进程退出）
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def set_result(result, error):
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        def target():
+            try:
+                result, error = func(*args), None
+            except Exception as e:
+                result, error = None, e
+            loop.call_soon_threadsafe(set_result, result, error)
+
+        threading.Thread(target=target, daemon=True).start()
+        return future
+
+    async def _call(self, stage, turn, func, *args, on_timeout=None):
+        """在线程中执行一个阶段，超时则调用 on_timeout 并抛出 StageTimeout"""
+        start = time.time()
+        try:
+            return await asyncio.wait_for(self._in_thread(func, *args), self.timeouts.get(stage))
+        except asyncio.TimeoutError:
+            print(f"[引擎] {STAGE_NAMES[stage]}超时（{self.timeouts[stage]}秒），本轮取消")
+            if on_timeout:
+                on_timeout()
+            raise StageTimeout(stage)
+        finally:
+            turn.timings[stage] = (time.time() - start) * 1000
+
+    async def _capture_stage(self, turn):
+        hold = 0.0
+        if turn.source in ("wake", "barge_in"):
+            # 应答音频已预先解码，播放不阻塞；录音同时开始，应答期间的声音不算作说话
+            hold = await self._call("ack", turn, self.system.play_wake_ack)
+        self._emit("listening", turn)
+        turn.audio, turn.recognizer = await self._call(
+            "capture", turn, self.system.capture_utterance, "vad", hold)
+
+    async def _recognize_stage(self, turn):
+        self._emit("recognizing", turn)
+        turn.text = await self._call("recognize", turn, self.system.recognize, turn.audio, turn.recognizer)
+        if not turn.text:
+            self._emit("failed", turn)
+            await self._call("speak", turn, self.system.text_to_speech, RETRY_TEXT,
+                             on_timeout=self.system.stop_speaking)
+            return False
+        self._emit("recognized", turn)
+
+    async def _intent_stage(self, turn):
+        self._emit("thinking", turn)
+        if turn.source in ("wake", "quick", "barge_in"):
+            # 播报期间继续监听唤醒词，检测到时停止播报并取消本轮剩余阶段
+            turn.monitor = self.system.start_barge_in(on_barge_in=lambda keyword: self._interrupt(turn, keyword))
+        turn.is_instruction, turn.result, turn.speech = await self._call(
+            "intent", turn, self.system.understand, turn.text)
+
+    async def _execute_stage(self, turn):
+        if turn.is_instruction:
+            print(f"[LLM] 标准化指令: {turn.result}")
+            # 超时或被打断后执行线程不会被强行终止：传入取消检查，剩余的子指令和操作不再执行
+            turn.result = await self._call("execute", turn, self.system.execute_command, turn.result,
+                                           False, lambda: turn.cancelled)
+        print(f"[结果] {turn.result}")
+        self._emit("result", turn)
+
+    async def _speak_stage(self, turn):
+        self._emit("speaking", turn)
+
+        def speak():
+            if turn.speech and turn.speech.finish():
+                return
+            if not turn.cancelled:
+                self.system.text_to_speech(turn.result)
+
+        await self._call("speak", turn, speak, on_timeout=self.system.stop_speaking)
+
+    def _interrupt(self, turn, keyword):
+        """播报被唤醒词打断（监听线程中调用）：停止词只停止播报，其他唤醒词紧接着开始下一轮"""
+        turn.cancelled = True
+        if keyword.action != ACTION_STOP:
+            turn.interrupted = True
+            turn.next_source = "quick" if keyword.action == ACTION_QUICK else "barge_in"
+        self.system.stop_speaking()
+
+    # ========== 调度 ==========
+    def _finish(self, turn):
+        """结束一轮：停止打断监听、打印各阶段耗时、通知等待者"""
+        if turn.monitor:
+            turn.monitor.stop()
+            if turn.interrupted:
+                self.system.wake_seq = turn.monitor.seq
+        if turn.timings:
+            print("[引擎] 本轮耗时：" + "，".join(
+                f"{STAGE_NAMES[k]}{v:.0f}ms" for k, v in turn.timings.items()))
+        self.active.discard(turn)
+        turn.done.set()
+        self._emit("done", turn)
+
+    async def _stage_worker(self, index):
+        """
+        一个阶段的处理协程：从本阶段队列取出轮次，处理完放入下一阶段的队列
+        阶段返回False、超时、出错或本轮被取消时，本轮结束
+        """
+        name = PIPELINE[index]
+        handler = getattr(self, f"_{name}_stage")
+        queue = self.queues[name]
+        while True:
+            turn = await queue.get()
+            proceed = False
+            if not turn.cancelled:
+                try:
+                    proceed = await handler(turn) is not False
+                except StageTimeout:
+                    turn.cancelled = True
+                    self._emit("failed", turn)
+                except asyncio.CancelledError:
+                    turn.cancelled = True
+                    self.system.stop_speaking()
+                    self._finish(turn)
+                    raise
+                except Exception as e:
+                    print(f"[错误] {str(e)}")
+                    turn.result = f"处理出错: {str(e)}"
+                    self._emit("failed", turn)
+            if proceed and not turn.cancelled and index + 1 < len(PIPELINE):
+                self.queues[PIPELINE[index + 1]].put_nowait(turn)
+            else:
+                self._finish(turn)
+
+    async def _wake_loop(self):
+        """
+        唤醒词触发：等待唤醒词 -> 提交一轮 -> 等这一轮结束（被打断时不再等唤醒词）
+        监听无法开始时按指数退避重试，连续失败 WAKE_MAX_FAILURES 次后改为回车触发
+        """
+        source = None
+        failures = 0
+        while self.running:
+            if source is None:
+                action = await self._in_thread(self.system.wait_for_wake_word)
+                if not action:
+                    if not self.system.running:
+                        self.running = False
+                        break
+                    failures += 1
+                    if failures >= WAKE_MAX_FAILURES:
+                        print(f"[引擎] 连续{failures}次无法开始唤醒监听，改为按键模式")
+                        await self._keyboard_loop()
+                        break
+                    await asyncio.sleep(min(WAKE_RETRY_INTERVAL * 2 ** (failures - 1), WAKE_RETRY_MAX_INTERVAL))
+                    continue
+                failures = 0
+                source = "quick" if action == ACTION_QUICK else "wake"
+            turn = self.submit(source)
+            await turn.done.wait()
+            source = turn.next_source
+
+    async def _keyboard_loop(self):
+        """回车触发录音，输入q退出（或说“退出”）"""
+        while self.running and self.system.running:
+            user_input = await self._in_thread(input, "\n按Enter开始录音 (输入q退出): ")
+            if user_input.strip().lower() == 'q':
+                break
+            turn = self.submit("keyboard")
+            await turn.done.wait()
+        self.running = False
+
+    def submit(self, source, text=None):
+        """提交一轮对话（事件循环线程中调用）"""
+        turn = Turn(source, text)
+        self.active.add(turn)
+        self.queues[turn.first_stage].put_nowait(turn)
+        return turn
+
+    async def _main(self, trigger=None):
+        self.loop = asyncio.get_running_loop()
+        self.queues = {name: asyncio.Queue() for name in PIPELINE}
+        self.running = True
+        self._tasks = [asyncio.create_task(self._stage_worker(i)) for i in range(len(PIPELINE))]
+        if trigger == "wake":
+            self._tasks.append(asyncio.create_task(self._wake_loop()))
+        elif trigger == "keyboard":
+            self._tasks.append(asyncio.create_task(self._keyboard_loop()))
+        self._ready.set()
+        try:
+            # 有触发循环时，触发循环结束（如输入q）即退出；否则一直运行到 stop()
+            await (self._tasks[-1] if trigger else asyncio.gather(*self._tasks))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    # ========== 对外接口 ==========
+    def run(self, trigger="wake"):
+        """
+        在当前线程运行（命令行入口），阻塞直到退出
+        :param trigger: "wake" 唤醒词触发，"keyboard" 回车触发
+        """
+        try:
+            asyncio.run(self._main(trigger))
+        except KeyboardInterrupt:
+            print("\n\n系统被用户中断")
+        finally:
+            self.running = False
+            self.system.running = False
+
+    def start(self):
+        """在后台线程运行（图形界面使用），通过 submit_text/submit_voice 提交"""
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._main()), daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def submit_threadsafe(self, source, text=None):
+        """
+        从其他线程提交一轮对话
+        :return: concurrent.futures.Future，结果为 Turn（已提交，未完成）
+        """
+        return asyncio.run_coroutine_threadsafe(self._submit_async(source, text), self.loop)
+
+    async def _submit_async(self, source, text):
+        return self.submit(source, text)
+
+    def submit_text(self, text):
+        """提交文字输入"""
+        return self.submit_threadsafe("text", text)
+
+    def submit_voice(self):
+        """提交一次录音"""
+        return self.submit_threadsafe("voice")
+
+    def cancel_current(self):
+        """取消进行中的轮次（停止播报，剩余阶段不再执行）"""
+        for turn in list(self.active):
+            turn.cancelled = True
+        self.system.stop_speaking()
+
+    def stop(self):
+        """停止引擎"""
+        self.running = False
+        if self.loop and self.loop.is_running():
+            for task in self._tasks:
+                self.loop.call_soon_threadsafe(task.cancel)
@@ -0,0 +1,282 @@
+# coding=utf-8
+"""
+手机状态缓存模块
+功能：后台通过 adb server 的 host:track-devices 长连接跟踪设备插拔，缓存设备列表；
+      按TTL缓存每台设备的状态（型号、安卓版本、电量、屏幕是否亮着），
+      手机指令执行前不再同步查询连接状态，“检查手机”直接用缓存回答
+说明：设备连上时在后台预取状态；过期的状态先返回旧值，同时在后台刷新；设备断开时清除其缓存
+      跟踪连接断开期间缓存视为不可用，由 ADBController 回退为同步查询
+用法：python device_watcher.py 实时打印设备变化，并对比缓存与同步查询的耗时（需要连接手机）
+"""
+
+import os
+import re
+import time
+import socket
+import threading
+
+from adb_client import ADBClient, ADBError, ADBConnectionError, ADB_TIMEOUT, read_devices, start_server
+
+# 电量缓存有效期（秒）
+DEVICE_BATTERY_TTL = float(os.getenv("DEVICE_BATTERY_TTL", "60"))
+# 屏幕状态缓存有效期（秒），只缓存“亮着”，见 DeviceWatcher.is_screen_on
+DEVICE_SCREEN_TTL = float(os.getenv("DEVICE_SCREEN_TTL", "5"))
+# 跟踪连接断开后的重连间隔（秒）
+RECONNECT_INTERVAL = 2
+
+# 多条查询合并成一次shell调用，用分隔行切分输出
+_FIELD_SEPARATOR = "__DEVICE_FIELD__"
+
+
+def _parse_battery(output):
+    match = re.search(r'level:\s*(\d+)', output)
+    return match.group(1) if match else None
+
+
+def _parse_screen(output):
+    match = re.search(r'mWakefulness=(\w+)', output)
+    return match.group(1) == "Awake" if match else None
+
+
+# 状态字段：(查询命令, 解析函数, 有效期秒数，None表示设备连接期间不变)
+STATE_FIELDS = {
+    "model": ("getprop ro.product.model", lambda output: output.strip() or None, None),
+    "android_version": ("getprop ro.build.version.release", lambda output: output.strip() or None, None),
+    "battery": ("dumpsys battery", _parse_battery, DEVICE_BATTERY_TTL),
+    "screen_on": ("dumpsys power", _parse_screen, DEVICE_SCREEN_TTL),
+}
+INFO_FIELDS = ["model", "android_version", "battery"]
+
+
+class DeviceState:
+    """一台设备的缓存状态"""
+
+    def __init__(self, serial):
+        self.serial = serial
+        self.values = {}      # 字段 -> 值
+        self.updated = {}     # 字段 -> 更新时间（monotonic）
+        self.refreshing = set()
+
+    def is_fresh(self, field, now=None):
+        if field not in self.updated:
+            return False
+        ttl = STATE_FIELDS[field][2]
+        return ttl is None or (now or time.monotonic()) - self.updated[field] < ttl
+
+
+class DeviceWatcher:
+    """后台设备跟踪与状态缓存（线程安全）"""
+
+    def __init__(self, client=None):
+        self.client = client or ADBClient()
+        self._devices = {}    # 序列号 -> 连接状态（device / offline / unauthorized ...）
+        self._states = {}     # 序列号 -> DeviceState
+        self._lock = threading.Lock()
+        self._refreshed = threading.Condition(self._lock)  # 后台刷新完成时通知
+        self._synced = threading.Event()
+        self._stop = threading.Event()
+        self._sock = None
+        self._thread = None
+        self.stats = {"changes": 0, "cache_hits": 0, "queries": 0}
+
+    # ---------- 设备跟踪 ----------
+
+    def start(self):
+        """启动后台跟踪线程"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="device-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # 让阻塞在读取上的跟踪线程立即返回
+            except OSError:
+                pass
+
+    @property
+    def synced(self):
+        """是否已拿到当前设备列表（跟踪连接正常）"""
+        return self._synced.is_set()
+
+    def wait_synced(self, timeout=1.0):
+        return self._synced.wait(timeout)
+
+    def _run(self):
+        server_started = False
+        reported = False
+        while not self._stop.is_set():
+            try:
+                self._sock = self.client.track_devices()
+                reported = False
+                while not self._stop.is_set():
+                    self._update(read_devices(self._sock))
+            except ADBConnectionError as e:
+                if not server_started:
+                    server_started = True
+                    if start_server():
+                        continue
+                if not reported:
+                    print(f"[手机] {str(e)}，设备状态缓存暂不可用")
+                    reported = True
+            except (ADBError, OSError) as e:
+                if not self._stop.is_set() and not reported:
+                    print(f"[手机] 设备跟踪中断: {str(e)}，{RECONNECT_INTERVAL}秒后重连")
+                    reported = True
+            finally:
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+            # 断开期间错过的变化无法得知，缓存不再可信
+            self._synced.clear()
+            self._stop.wait(RECONNECT_INTERVAL)
+
+    def _update(self, devices):
+        """收到新的设备列表：记录变化，清除断开设备的缓存，预取新连上设备的状态"""
+        current = dict(devices)
+        with self._lock:
+            for serial in sorted(set(self._devices) | set(current)):
+                old, new = self._devices.get(serial), current.get(serial)
+                if old != new:
+                    self.stats["changes"] += 1
+                    print(f"[手机] {serial}: {old or '未连接'} -> {new or '已断开'}")
+            gone = [s for s in self._states if current.get(s) != "device"]
+            for serial in gone:
+                del self._states[serial]
+            added = [s for s, state in current.items() if state == "device" and s not in self._states]
+            for serial in added:
+                self._states[serial] = DeviceState(serial)
+            self._devices = current
+        for serial in gone:
+            self.client.close(serial)  # 常驻shell会话随设备断开失效
+        for serial in added:
+            self.refresh_async(serial, list(STATE_FIELDS))
+        self._synced.set()
+
+    def devices(self):
+        """:return: {序列号: 连接状态}"""
+        with self._lock:
+            return dict(self._devices)
+
+    def online_devices(self):
+        """:return: 可用（已授权）设备的序列号列表"""
+        with self._lock:
+            return [serial for serial, state in self._devices.items() if state == "device"]
+
+    # ---------- 状态缓存 ----------
+
+    def _state(self, serial):
+        with self._lock:
+            if serial not in self._states:
+                self._states[serial] = DeviceState(serial)
+            return self._states[serial]
+
+    def _refresh(self, state, fields):
+        """一次shell调用查询多个字段"""
+        script = f"; echo {_FIELD_SEPARATOR}; ".join(STATE_FIELDS[field][0] for field in fields)
+        self.stats["queries"] += 1
+        try:
+            _, stdout, _ = self.client.shell(state.serial, script)
+        except ADBError as e:
+            print(f"[手机] 读取设备状态失败: {str(e)}")
+            return
+        outputs = stdout.split(f"{_FIELD_SEPARATOR}\n")
+        now = time.monotonic()
+        for field, output in zip(fields, outputs):
+            value = STATE_FIELDS[field][1](output)
+            if value is not None:
+                state.values[field] = value
+                state.updated[field] = now
+
+    def refresh_async(self, serial, fields):
+        """后台刷新（同一字段已在刷新时跳过）"""
+        state = self._state(serial)
+        with self._lock:
+            fields = [f for f in fields if f not in state.refreshing]
+            state.refreshing.update(fields)
+        if not fields:
+            return
+
+        def run():
+            try:
+                self._refresh(state, fields)
+            finally:
+                with self._lock:
+                    state.refreshing.difference_update(fields)
+                    self._refreshed.notify_all()
+
+        threading.Thread(target=run, name="device-refresh", daemon=True).start()
+
+    def get_state(self, serial, fields=None):
+        """
+        读取设备状态
+        :param fields: 需要的字段，默认 INFO_FIELDS
+        :return: {字段: 值}；缓存里没有的字段同步查询，已有但过期的先返回旧值并在后台刷新
+        """
+        fields = fields or INFO_FIELDS
+        state = self._state(serial)
+        with self._lock:
+            # 刚连上时预取还没完成：等它，不重复查询
+            self._refreshed.wait_for(lambda: not any(f in state.refreshing and f not in state.values
+                                                     for f in fields), ADB_TIMEOUT)
+        now = time.monotonic()
+        missing = [f for f in fields if f not in state.values]
+        stale = [f for f in fields if f in state.values and not state.is_fresh(f, now)]
+        if missing:
+            self._refresh(state, missing)
+        else:
+            self.stats["cache_hits"] += 1
+        if stale:
+            self.refresh_async(serial, stale)
+        return {f: state.values[f] for f in fields if f in state.values}
+
+    def is_screen_on(self, serial):
+        """
+        屏幕是否亮着
+        只有“亮着”在有效期内直接用缓存；息屏或已过期时重新查询
+        （调用方据此决定是否按电源键，把亮屏误判为息屏会反而关掉屏幕）
+        """
+        state = self._state(serial)
+        if state.values.get("screen_on") and state.is_fresh("screen_on"):
+            self.stats["cache_hits"] += 1
+            return True
+        self._refresh(state, ["screen_on"])
+        return bool(state.values.get("screen_on"))
+
+    def invalidate(self, serial, *fields):
+        """清除缓存的字段（如按了电源键后的屏幕状态）"""
+        state = self._state(serial)
+        for field in fields or list(STATE_FIELDS):
+            state.values.pop(field, None)
+            state.updated.pop(field, None)
+
+
+if __name__ == "__main__":
+    watcher = DeviceWatcher().start()
+    if not watcher.wait_synced(5):
+        print("无法连接 adb server")
+        raise SystemExit(1)
+    serials = watcher.online_devices()
+    print(f"设备: {watcher.devices()}")
+    if serials:
+        serial = serials[0]
+        start = time.perf_counter()
+        info = watcher.get_state(serial)
+        print(f"首次读取（含预取）: {info}，{(time.perf_counter() - start) * 1000:.1f}ms")
+        start = time.perf_counter()
+        for _ in range(100):
+            watcher.get_state(serial)
+        print(f"缓存读取: {(time.perf_counter() - start) * 10:.3f}ms/次")
+        start = time.perf_counter()
+        watcher._refresh(watcher._state(serial), INFO_FIELDS)
+        print(f"同步查询: {(time.perf_counter() - start) * 1000:.1f}ms")
+    print("跟踪设备变化中，Ctrl+C 退出")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop()
@@ -0,0 +1,173 @@
+# coding=utf-8
+"""
+模拟大模型服务
+功能：本地启动一个兼容 OpenAI 接口的 HTTP 服务（/v1/chat/completions、/v1/models），按固定节奏逐段返回内容
+用途：不联网测试流式输出、切句播报和首句延迟，用法：
+    server = FakeLLMServer(reply='{"standard_instruction": "", "talk_text": "你好！..."}').start()
+    LLM.BASE_URL = server.base_url
+"""
+
+import json
+import time
+import uuid
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = json.dumps({
+    "standard_instruction": "",
+    "talk_text": "你好！我是你的智能语音助手。我可以帮你控制电脑程序、手机应用、播放视频、搜索商品等，有什么需要帮忙的吗？"
+}, ensure_ascii=False)
+
+
+class FakeLLMServer:
+    """模拟的 OpenAI 兼容服务"""
+
+    def __init__(self, reply=DEFAULT_REPLY, host="127.0.0.1", port=0,
+                 chunk_size=4, chunk_delay=0.05, first_token_delay=0.3):
+        """
+        :param reply: 回复内容，字符串或函数 reply(messages) -> 字符串
+        :param port: 监听端口，0表示自动分配
+        :param chunk_size: 流式输出时每段的字数
+        :param chunk_delay: 流式输出时每段的间隔（秒），模拟生成速度
+        :param first_token_delay: 第一段输出前的等待（秒），模拟首token延迟
+                                  （非流式请求等待 first_token_delay + 段数 × chunk_delay 后一次返回）
+        """
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.first_token_delay = first_token_delay
+        self.requests = []  # 收到的请求体，便于检查
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _reply_text(self, messages):
+        return self.reply(messages) if callable(self.reply) else self.reply
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, data, status=200):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json({"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+                else:
+                    self._send_json({"error": {"message": "not found"}}, status=404)
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json({"error": {"message": "not found"}}, status=404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                server.requests.append(request)
+
+                text = server._reply_text(request.get("messages", []))
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                model = request.get("model", "fake-model")
+                usage = {"prompt_tokens": 100, "completion_tokens": len(text), "total_tokens": 100 + len(text),
+                         "prompt_tokens_details": {"cached_tokens": 0}}
+
+                time.sleep(server.first_token_delay)
+                if not request.get("stream"):
+                    # 非流式要等整段生成完才返回：与流式输出最后一段的时间相同
+                    chunks = (len(text) + server.chunk_size - 1) // server.chunk_size
+                    time.sleep(chunks * server.chunk_delay)
+                    self._send_json({
+                        "id": completion_id, "object": "chat.completion", "created": int(time.time()),
+                        "model": model, "usage": usage,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": text}}]
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+
+                def send_chunk(delta, finish_reason=None, **extra):
+                    data = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                            "model": model,
+                            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+                    data.update(extra)
+                    self.wfile.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                send_chunk({"role": "assistant", "content": ""})
+                for i in range(0, len(text), server.chunk_size):
+                    send_chunk({"content": text[i:i + server.chunk_size]})
+                    time.sleep(server.chunk_delay)
+                send_chunk({}, finish_reason="stop")
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    data = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                            "model": model, "choices": [], "usage": usage}
+                    self.wfile.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+if __name__ == "__main__":
+    # 对比：非流式（等完整回复再播报）与流式（第一句生成完就播报）的首句延迟
+    import LLM
+    import query_cache
+    from speech_stream import SpeechStream
+
+    query_cache._cache = query_cache.QueryCache(cache_file=None)  # 不读写本地缓存文件
+
+    server = FakeLLMServer().start()
+    LLM.API_KEY, LLM.BASE_URL = "test", server.base_url
+    print(f"模拟服务: {server.base_url}")
+
+    def fake_synthesize(text):
+        time.sleep(0.1)  # 模拟合成耗时
+        return text.encode("utf-8")
+
+    def fake_play(audio):
+        time.sleep(0.2)  # 模拟播放耗时
+
+    query = "你是谁呀"
+
+    start = time.time()
+    is_instruction, result = LLM.process_query(query)
+    received_ms = (time.time() - start) * 1000
+    fake_synthesize(result)  # 拿到完整回复后才开始合成第一句
+    print(f"非流式: 拿到完整回复 {received_ms:.0f}ms，首句开始播放 {(time.time() - start) * 1000:.0f}ms -> {result}")
+    LLM.get_cache().clear()
+
+    stream = SpeechStream(fake_synthesize, fake_play)
+    is_instruction, result = LLM.process_query(query, on_talk_text=stream.feed_text)
+    stream.wait()
+    print(f"流式: 首句开始播放 {stream.first_audio_ms:.0f}ms，共 {stream.spoken} 句")
+    server.stop()
@@ -0,0 +1,140 @@
+# coding=utf-8
+"""
+HTTP连接池模块
+功能：所有对外接口共用按主机划分的长连接 Session，避免每次请求重新握手TCP/TLS
+支持：默认超时、有限次数的退避重试、连接复用统计
+说明：requests 基于 urllib3，只支持 HTTP/1.1 长连接；百度/网易云/B站接口均为 HTTP/1.1，长连接即可省去握手开销
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 默认超时：(连接超时, 读取超时)，单位秒
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# 重试配置：仅对连接失败和网关类错误重试，退避间隔 0.3s、0.6s...
+MAX_RETRIES = 2
+BACKOFF_FACTOR = 0.3
+RETRY_STATUS = (502, 503, 504)
+
+# 每个主机保持的连接数（TTS预加载线程会并发请求）
+POOL_MAXSIZE = 8
+
+_sessions = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _create_session():
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=0,                      # 读超时不重试，避免重复提交
+        status=MAX_RETRIES,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=None,        # POST 也允许在连接失败时重试
+        backoff_factor=BACKOFF_FACTOR,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url):
+    """获取目标主机对应的长连接Session"""
+    key = _host_key(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _create_session()
+            _sessions[key] = session
+            _stats[key] = {"requests": 0, "errors": 0}
+        return session
+
+
+def request(method, url, **kwargs):
+    """
+    通过连接池发送请求，参数与 requests.request 相同，未指定时使用默认超时
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    session = get_session(url)
+    key = _host_key(url)
+    try:
+        response = session.request(method, url, **kwargs)
+    except Exception:
+        with _lock:
+            _stats[key]["errors"] += 1
+        raise
+    with _lock:
+        _stats[key]["requests"] += 1
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def get_stats():
+    """
+    连接复用统计
+    :return: {主机: {"requests": 请求数, "connections": 新建连接数, "reused": 复用次数, "errors": 失败数}}
+    """
+    result = {}
+    with _lock:
+        for key, session in _sessions.items():
+            connections = 0
+            adapter = session.get_adapter(key + "/")
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    connections += pool.num_connections
+            stats = dict(_stats[key])
+            stats["connections"] = connections
+            stats["reused"] = max(0, stats["requests"] - connections)
+            result[key] = stats
+    return result
+
+
+def print_stats():
+    """打印连接复用统计"""
+    for host, stats in get_stats().items():
+        print(f"[连接池] {host}: 请求{stats['requests']}次，新建连接{stats['connections']}个，"
+              f"复用{stats['reused']}次，失败{stats['errors']}次")
+
+
+def close_all():
+    """关闭所有连接"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+if __name__ == "__main__":
+    import time
+    url = "https://www.baidu.com/"
+    for i in range(5):
+        start = time.time()
+        try:
+            get(url)
+            print(f"第{i + 1}次请求耗时: {(time.time() - start) * 1000:.0f}ms")
+        except Exception as e:
+            print(f"请求失败: {e}")
+    print_stats()
@@ -0,0 +1,167 @@
+# coding=utf-8
+"""
+意图识别端到端评测
+功能：在标注好的评测集上对比两种意图输出格式（LLM.INTENT_OUTPUT）：
+  text  两段式：大模型输出标准指令文本，再由指令表（command_registry）解析出指令名和参数
+  json  结构化：大模型直接输出 {intent, slots}，按指令表生成的 Schema 校验后直接交给处理方法
+统计意图准确率、端到端准确率（意图和参数都对）以及每条的耗时（本地匹配/大模型请求 + 解析）
+说明：只评测到“调用哪个处理方法、带什么参数”为止，不真正执行指令；意图识别结果不缓存
+
+评测集（JSON列表）：
+  {"query": "去B站看动漫", "standard": "打开B站播放动漫视频", "intent": "bilibili", "slots": {"keyword": "动漫"}}
+  {"query": "打开记事本然后告诉我几点了", "standard": "打开记事本并查询时间",
+   "commands": [{"intent": "open_notepad", "slots": {}}, {"intent": "query_time", "slots": {}}]}
+  intent 为 null 表示闲谈；多步指令用 commands 列出每一步；standard 为两段式下期望的大模型输出（--fake 时使用）
+
+用法：
+  python intent_eval.py [评测集.json]      # 请求真实大模型（需要 ALI_API_KEY），默认 test_data/intent_eval.json
+  python intent_eval.py --fake             # 本地模拟大模型，按标注给出正确输出，只衡量两段式“文本再解析”环节的损失和耗时
+                                           # （结构化模式直接返回标注，准确率必然100%，不代表真实大模型的效果）
+  --no-local 关闭本地快速匹配，每条都请求大模型；--verbose 列出每条错误
+"""
+
+import os
+import json
+import time
+import argparse
+
+import LLM
+import query_cache
+from command_registry import get_registry, normalize_command, StructuredCommand
+from compound_planner import get_planner
+from fake_llm_server import FakeLLMServer
+
+EVAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_data", "intent_eval.json")
+OUTPUTS = ("text", "json")
+
+
+def load_eval_set(path=EVAL_FILE):
+    with open(path, mode='r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def resolve(query, output):
+    """
+    走一遍 意图识别 -> 确定处理方法和参数（与 main.execute_command 相同的路径，但不执行）
+    :return: [(指令名, 参数)]，闲谈返回空列表
+    """
+    # 流式请求（与开启流式播报时一致），输出越长耗时越多
+    is_instruction, result = LLM.process_query(query, on_talk_text=lambda text: None, output=output)
+    if not is_instruction:
+        return []
+    if isinstance(result, StructuredCommand):
+        return [(spec.name, slots) for spec, slots in result.items]
+    command = normalize_command(result)
+    steps = get_planner().plan(command)
+    if steps:
+        return [(step.spec.name, step.slots) for step in steps]
+    spec, _, slots = get_registry().match(command, result)
+    return [(spec.name, slots)] if spec else [(None, {})]
+
+
+def _normalize_slots(slots):
+    return {name: normalize_command(value) for name, value in (slots or {}).items() if value}
+
+
+def expected_commands(item):
+    """:return: [(指令名, 参数)]，闲谈为空列表"""
+    if item.get("commands"):
+        return [(c["intent"], c.get("slots") or {}) for c in item["commands"]]
+    return [(item["intent"], item.get("slots") or {})] if item.get("intent") else []
+
+
+def evaluate(items, output):
+    """
+    :return: 统计结果 {"total", "intent_correct", "correct", "multi_total", "multi_correct", "latencies_ms", "errors"}
+    """
+    stats = {"total": len(items), "intent_correct": 0, "correct": 0, "multi_total": 0, "multi_correct": 0,
+             "latencies_ms": [], "errors": []}
+    for item in items:
+        start = time.perf_counter()
+        predicted = resolve(item["query"], output)
+        stats["latencies_ms"].append((time.perf_counter() - start) * 1000)
+
+        expected = [(name, _normalize_slots(slots)) for name, slots in expected_commands(item)]
+        actual = [(name, _normalize_slots(slots)) for name, slots in predicted]
+        if len(expected) > 1:
+            stats["multi_total"] += 1
+        if [name for name, _ in actual] == [name for name, _ in expected]:
+            stats["intent_correct"] += 1
+        if actual == expected:
+            stats["correct"] += 1
+            if len(expected) > 1:
+                stats["multi_correct"] += 1
+        else:
+            stats["errors"].append((item["query"], expected, actual))
+    return stats
+
+
+def _describe(values):
+    values = sorted(values)
+    return (f"平均 {sum(values) / len(values):.0f}ms，中位 {values[len(values) // 2]:.0f}ms，"
+            f"最大 {values[-1]:.0f}ms")
+
+
+def print_report(output, stats, verbose=False, fake=False):
+    total = stats["total"]
+    label = "解析损失后" if fake else "端到端"
+    print(f"\n[{output}] 意图准确率 {stats['intent_correct'] / total:.1%}（{stats['intent_correct']}/{total}），"
+          f"{label}准确率 {stats['correct'] / total:.1%}（{stats['correct']}/{total}），"
+          f"其中多步指令 {stats['multi_correct']}/{stats['multi_total']}")
+    if fake and output == "json":
+        print(f"[{output}] 模拟大模型直接返回标注，结构化模式的准确率由构造保证，只有耗时可参考")
+    print(f"[{output}] 耗时：{_describe(stats['latencies_ms'])}")
+    if verbose:
+        for query, expected, actual in stats["errors"]:
+            print(f"  {query}\n    期望: {expected}\n    实际: {actual}")
+
+
+def make_fake_reply(items):
+    """模拟大模型：按标注给出两种格式下的正确输出"""
+    by_query = {item["query"]: item for item in items}
+
+    def reply(messages):
+        prompt = messages[-1]["content"]
+        query = prompt.split("<query>")[-1].split("</query>")[0].strip()
+        item = by_query.get(query, {})
+        structured = '"commands"' in messages[0]["content"]
+        commands = [{"intent": name, "slots": slots} for name, slots in expected_commands(item)]
+        talk_text = "" if commands else "你好，我是你的智能语音助手。"
+        if structured:
+            return json.dumps({"commands": commands, "talk_text": talk_text}, ensure_ascii=False)
+        return json.dumps({"standard_instruction": item.get("standard", ""), "talk_text": talk_text},
+                          ensure_ascii=False)
+
+    return reply
+
+
+def main():
+    parser = argparse.ArgumentParser(description="意图识别端到端评测（两段式 vs 结构化意图）")
+    parser.add_argument("eval_file", nargs="?", default=EVAL_FILE, help="评测集（JSON）")
+    parser.add_argument("--fake", action="store_true", help="使用本地模拟大模型")
+    parser.add_argument("--no-local", action="store_true", help="关闭本地快速匹配")
+    parser.add_argument("--verbose", action="store_true", help="列出每条错误")
+    args = parser.parse_args()
+
+    items = load_eval_set(args.eval_file)
+    # 不读写缓存文件，也不缓存识别结果，每条都完整走一遍
+    query_cache._cache = query_cache.QueryCache(cache_file=None, instruction_ttl=0, chat_ttl=0)
+    if args.no_local:
+        LLM.match_intent = lambda query: None
+
+    server = None
+    if args.fake:
+        server = FakeLLMServer(reply=make_fake_reply(items), first_token_delay=0.2, chunk_delay=0.02).start()
+        LLM.API_KEY, LLM.BASE_URL = "test", server.base_url
+        print(f"模拟大模型: {server.base_url}")
+    print(f"评测集: {args.eval_file}，共 {len(items)} 条")
+    try:
+        for output in OUTPUTS:
+            print_report(output, evaluate(items, output), args.verbose, args.fake)
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# coding=utf-8
+"""
+本地意图快速匹配模块
+功能：根据 Instruction.txt 中的标准指令和口语化变体，在本地直接识别高频指令，跳过大模型请求
+支持：精确匹配、Aho-Corasick 子串匹配（按覆盖率计算置信度）、模糊匹配（容忍ASR错字）、命中率统计
+说明：只处理不带参数的指令（如"几点了"、"下一首"），带参数（XXX）或含义不明确的输入仍交给大模型
+"""
+
+import os
+import re
+import difflib
+import threading
+from collections import namedtuple
+
+from aho_corasick import AhoCorasick
+
+INSTRUCTION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Instruction.txt")
+
+# 置信度阈值，低于该值回退到大模型
+CONFIDENCE_THRESHOLD = 0.8
+
+# 模糊匹配只比较长度相近的短语，且要求更高的相似度
+FUZZY_MAX_LEN_DIFF = 2
+FUZZY_THRESHOLD = 0.85
+
+# 归一化时去掉的口语词
+FILLER_WORDS = ["帮我", "给我", "麻烦", "请", "一下", "吧", "啊", "呀", "呢", "哦", "嗯", "哈"]
+
+# 标点与空白
+_PUNCT_RE = re.compile(r"[\s，。！？、；：,.!?;:\"'“”‘’（）()【】\[\]《》<>~～…\-]+")
+
+# 不参与匹配的表格（按表头第一列判断）
+_SKIP_HEADERS = {"唤醒词", "口语称呼"}
+
+IntentMatch = namedtuple("IntentMatch", ["instruction", "confidence", "method", "phrase"])
+
+
+def normalize(text):
+    """归一化：小写、去标点空白、去口语词"""
+    text = _PUNCT_RE.sub("", text.lower())
+    for word in FILLER_WORDS:
+        text = text.replace(word, "")
+    return text
+
+
+def _is_parametric(text):
+    return "XXX" in text or "YYY" in text
+
+
+def parse_instruction_phrases(content):
+    """
+    从指令说明文本中解析 (短语, 标准指令) 对
+    - 「标准指令 | 口语化变体」表：标准指令及其各个变体都映射到标准指令
+    - 「用户说 | 转换为标准指令」表：用户说的内容映射到标准指令
+    带参数（XXX/YYY）的行跳过
+    """
+    pairs = []
+    header = None
+    for line in content.splitlines():
+        line = line.strip()
+        if not line.startswith("|"):
+            header = None
+            continue
+        cells = [c.strip() for c in line.strip("|").split("|")]
+        if header is None:
+            header = cells
+            continue
+        if all(set(c) <= set("-: ") for c in cells):
+            continue  # 分隔行
+        if len(cells) < 2 or header[0] in _SKIP_HEADERS:
+            continue
+
+        if header[0] == "用户说":
+            phrase, standard = cells[0], cells[1]
+            if standard and not _is_parametric(standard):
+                pairs.append((phrase, standard))
+        elif header[0].startswith("标准指令"):
+            standard = cells[0]
+            if not standard or _is_parametric(standard):
+                continue
+            pairs.append((standard, standard))
+            for variant in cells[1].split("、"):
+                variant = variant.strip()
+                if variant and not _is_parametric(variant):
+                    pairs.append((variant, standard))
+    return pairs
+
+
+class IntentMatcher:
+    """本地意图匹配器"""
+
+    def __init__(self, pairs, threshold=CONFIDENCE_THRESHOLD):
+        """
+        :param pairs: [(口语短语, 标准指令), ...]
+        :param threshold: 置信度阈值
+        """
+        self.threshold = threshold
+        self.phrases = {}  # 归一化短语 -> 标准指令
+        ambiguous = set()
+        for phrase, standard in pairs:
+            key = normalize(phrase)
+            if not key:
+                continue
+            if key in self.phrases and self.phrases[key] != standard:
+                ambiguous.add(key)  # 同一短语对应多个指令，不在本地处理
+            self.phrases[key] = standard
+        for key in ambiguous:
+            del self.phrases[key]
+
+        self.automaton = AhoCorasick()
+        for key, standard in self.phrases.items():
+            self.automaton.add(key, standard)
+        self.automaton.build()
+
+        self._lock = threading.Lock()
+        self.stats = {"total": 0, "exact": 0, "substring": 0, "fuzzy": 0, "fallback": 0}
+
+    @classmethod
+    def from_file(cls, path=INSTRUCTION_FILE, **kwargs):
+        with open(path, mode='r', encoding='utf-8') as f:
+            return cls(parse_instruction_phrases(f.read()), **kwargs)
+
+    def match(self, text):
+        """
+        匹配用户输入
+        :return: IntentMatch，置信度不足返回None
+        """
+        result = self._match(text)
+        with self._lock:
+            self.stats["total"] += 1
+            self.stats[result.method if result else "fallback"] += 1
+        return result
+
+    def _match(self, text):
+        query = normalize(text or "")
+        if not query:
+            return None
+
+        # 1. 精确匹配
+        if query in self.phrases:
+            return IntentMatch(self.phrases[query], 1.0, "exact", query)
+
+        # 2. 子串匹配：覆盖率 = 命中短语覆盖的字数 / 输入字数
+        covered = {}
+        longest = {}
+        for start, phrase, standard in self.automaton.iter_matches(query):
+            covered.setdefault(standard, set()).update(range(start, start + len(phrase)))
+            if len(phrase) > len(longest.get(standard, "")):
+                longest[standard] = phrase
+        best = None
+        if covered:
+            ranked = sorted(covered.items(), key=lambda item: len(item[1]), reverse=True)
+            standard, positions = ranked[0]
+            confidence = len(positions) / len(query)
+            # 输入中同时出现其他指令的关键词，说明意图不唯一
+            if len(ranked) > 1 and len(ranked[1][1] - positions) >= 2:
+                confidence *= 0.5
+            best = IntentMatch(standard, confidence, "substring", longest[standard])
+            if confidence >= self.threshold:
+                return best
+
+        # 3. 模糊匹配：容忍同音错字（如"几点啦"/"几点了"）
+        for phrase, standard in self.phrases.items():
+            if abs(len(phrase) - len(query)) > FUZZY_MAX_LEN_DIFF or len(phrase) < 3:
+                continue
+            if phrase in query:
+                continue  # 完整包含短语但多出其他内容（多半是参数），已由子串匹配判定
+            ratio = difflib.SequenceMatcher(None, query, phrase).ratio()
+            if ratio >= max(self.threshold, FUZZY_THRESHOLD) and (best is None or ratio > best.confidence):
+                best = IntentMatch(standard, ratio, "fuzzy", phrase)
+
+        if best and best.confidence >= self.threshold:
+            return best
+        return None
+
+    def get_stats(self):
+        """命中率统计"""
+        with self._lock:
+            stats = dict(self.stats)
+        hits = stats["total"] - stats["fallback"]
+        stats["hit_rate"] = hits / stats["total"] if stats["total"] else 0.0
+        return stats
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher():
+    """获取全局匹配器（首次调用时加载 Instruction.txt）"""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            try:
+                _matcher = IntentMatcher.from_file()
+            except FileNotFoundError:
+                print(f"警告：找不到指令文件 {INSTRUCTION_FILE}，本地快速匹配不可用")
+                _matcher = IntentMatcher([])
+        return _matcher
+
+
+def match_intent(text):
+    """
+    本地快速匹配
+    :return: IntentMatch，需要交给大模型时返回None
+    """
+    return get_matcher().match(text)
+
+
+def get_stats():
+    return get_matcher().get_stats()
+
+
+if __name__ == "__main__":
+    import time
+    matcher = get_matcher()
+    print(f"已加载 {len(matcher.phrases)} 条短语")
+
+    samples = [
+        "几点了", "现在几点啦？", "下一首", "换首歌", "帮我打开一下记事本", "今天周几",
+        "手机截个图", "暂停一下", "退出系统", "帮我在B站找个猫咪视频", "你叫什么名字",
+        "用微信告诉老妈我今晚回家吃饭", "明天的时间安排是什么", "打开手机微信"
+    ]
+    for text in samples:
+        start = time.perf_counter()
+        result = matcher.match(text)
+        cost = (time.perf_counter() - start) * 1000
+        if result:
+            print(f"  {text} -> {result.instruction}（{result.method}，置信度{result.confidence:.2f}，{cost:.2f}ms）")
+        else:
+            print(f"  {text} -> 交给大模型（{cost:.2f}ms）")
+
+    stats = matcher.get_stats()
+    print(f"命中率: {stats['hit_rate']:.0%}（精确{stats['exact']}，子串{stats['substring']}，"
+          f"模糊{stats['fuzzy']}，回退{stats['fallback']}）")
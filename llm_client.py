@@ -0,0 +1,65 @@
+# coding=utf-8
+"""
+大模型客户端管理模块
+功能：按 (base_url, api_key) 复用 OpenAI 客户端，进程内只建一次连接池
+支持：启动时预热连接（提前完成DNS/TCP/TLS握手），唤醒后的第一次意图识别不用再等握手
+"""
+
+import time
+import threading
+
+from openai import OpenAI
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(api_key, base_url):
+    """
+    获取共享的 OpenAI 客户端
+    :param api_key: API Key
+    :param base_url: 接口地址
+    :return: OpenAI 客户端实例
+    """
+    key = (base_url, api_key)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=base_url)
+            _clients[key] = client
+        return client
+
+
+def _warm_up(api_key, base_url):
+    start = time.time()
+    try:
+        # 轻量请求（模型列表），目的是建立并保持长连接，结果本身不重要
+        get_client(api_key, base_url).models.list()
+        print(f"[LLM] 连接预热完成: {base_url}（{(time.time() - start) * 1000:.0f}ms）")
+    except Exception as e:
+        # 即使接口返回错误，TLS连接也已建立，不影响后续请求
+        print(f"[LLM] 连接预热: {base_url} 返回 {type(e).__name__}（{(time.time() - start) * 1000:.0f}ms）")
+
+
+def warm_up(api_key, base_url, background=True):
+    """
+    预热到大模型服务的连接
+    :param background: 是否在后台线程执行，不阻塞启动流程
+    """
+    if not api_key:
+        return
+    if background:
+        threading.Thread(target=_warm_up, args=(api_key, base_url), daemon=True).start()
+    else:
+        _warm_up(api_key, base_url)
+
+
+def close_all():
+    """关闭所有客户端"""
+    with _lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
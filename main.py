@@ -10,12 +10,10 @@ import sys
 import json
 import base64
 import time
-import wave
 import subprocess
 import datetime
 import webbrowser
 import re
-import struct
 import threading
 
 # 导入自定义模块
@@ -23,9 +21,29 @@ from video import play_bilibili_video
 from taobao import search_taobao
 from WeChat import send_wechat_message
 from music import start_music, stop_music, next_music, previous_music, play_music, pause_music
-from LLM_VL import summarize_screen, translate_screen
-from LLM import process_query
+from LLM_VL import summarize_screen, translate_screen, warm_up as warm_up_vl
+from LLM import process_query, warm_up as warm_up_llm
+from intent_matcher import get_stats as get_intent_stats
+from command_registry import get_registry, normalize_command, StructuredCommand
+from compound_planner import get_planner
+from adb_client import ADBClient, ADBError, ADBConnectionError, start_server
+from device_watcher import DeviceWatcher
+from query_cache import get_cache as get_query_cache
 from word import write_document, parse_write_command
+from vad import VADEndpointer
+from audio_capture import AudioCaptureService, FileCaptureService, PCMFrameView
+from streaming_asr import StreamingRecognizer
+from audio_buffer import AudioBuffer
+from speech_stream import SpeechStream
+from tts_pipeline import TTSPipeline, format_stats
+from audio_player import get_player, make_earcon
+from barge_in import BargeInMonitor
+from conversation_engine import ConversationEngine
+from voice_wake_word.wake_engine import WakeEngine, parse_keywords, ACTION_WAKE, ACTION_STOP, WAKE_BACKEND
+from tts_cache import (get_cache as get_tts_cache, cache_key as tts_cache_key, find_fixed_phrases,
+                       prewarm as prewarm_tts, MAX_TEXT_LEN as TTS_CACHE_MAX_TEXT_LEN)
+from baidu_auth import get_token_manager, is_auth_error
+import http_pool
 
 # 尝试导入语音唤醒模块
 try:
@@ -66,12 +84,17 @@ except ImportError:
     import psutil
 
 # ==================== 百度API配置 ====================
-API_KEY = os.getenv("BAIDU_API_KEY", "")
-SECRET_KEY = os.getenv("BAIDU_SECRET_KEY", "")
-TOKEN_URL = os.getenv("BAIDU_TOKEN_URL", "https://aip.baidubce.com/oauth/2.0/token")
+# 鉴权（API_KEY/SECRET_KEY/Token缓存）统一由 baidu_auth 模块管理
 ASR_URL = os.getenv("BAIDU_ASR_URL", "https://vop.baidu.com/server_api")
 TTS_URL = os.getenv("BAIDU_TTS_URL", "https://tsn.baidu.com/text2audio")
 
+# 请求超时：(连接超时, 读取超时)，单位秒
+ASR_TIMEOUT = (3.05, 15)
+TTS_TIMEOUT = (3.05, 10)
+
+# 识别模式："batch" 录完后整段上传，"stream" 边录边传（流式识别）
+ASR_MODE = os.getenv("ASR_MODE", "batch")
+
 # TTS配置
 TTS_PER = 4194  # 发音人
 TTS_SPD = 5     # 语速
@@ -79,46 +102,60 @@ TTS_PIT = 5     # 音调
 TTS_VOL = 5     # 音量
 
 # 录音配置
-CHUNK = 1024
+CHUNK = 512  # 与Porcupine帧长度一致，唤醒和录音共用同一个输入流
 FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 16000
 RECORD_SECONDS = 5  # 默认录音时长
 
-# 临时文件路径
-AUDIO_FILE = "./temp_audio.wav"
-TTS_OUTPUT = "./tts_output.mp3"
+# 录音模式："vad" 说完自动结束，"fixed" 固定时长录音
+RECORD_MODE = os.getenv("RECORD_MODE", "vad")
+VAD_TRAILING_SILENCE = 0.8   # 尾部静音多久判定说话结束（秒）
+VAD_MIN_DURATION = 0.5       # 最短语音时长（秒）
+VAD_MAX_DURATION = 10        # 最长录音时长（秒）
+VAD_PREROLL = 0.3            # 语音起点前保留的音频（秒）
+VAD_NO_SPEECH_TIMEOUT = 5    # 未开口说话的超时时间（秒）
+
+# 用音频文件代替麦克风（多个文件用 os.pathsep 分隔），用于离线测试整个唤醒-录音-响应流程
+AUDIO_INPUT_FILES = [p for p in os.getenv("AUDIO_INPUT_FILE", "").split(os.pathsep) if p]
+AUDIO_INPUT_SPEED = float(os.getenv("AUDIO_INPUT_SPEED", "1.0"))
+
+# 调试模式下保存录音，便于排查识别问题
+DEBUG_SAVE_AUDIO = os.getenv("DEBUG_SAVE_AUDIO", "0") == "1"
+DEBUG_AUDIO_DIR = "./debug_audio"
+
+# 流式播报：闲谈回复边生成边播报（设为0则等完整回复后再播报）
+LLM_STREAM = os.getenv("LLM_STREAM", "1") != "0"
 
 # ==================== 语音唤醒配置 ====================
 # Picovoice Access Key（从 https://console.picovoice.ai/ 获取）
-WAKE_ACCESS_KEY = "e8l7EtexO4ea2jYy0bodkgj74vB2f4GwypZQT5RmdWO//qzpKO9WYA=="
+WAKE_ACCESS_KEY = os.getenv("PICOVOICE_ACCESS_KEY", "e8l7EtexO4ea2jYy0bodkgj74vB2f4GwypZQT5RmdWO//qzpKO9WYA==")
 
 # 获取脚本所在目录
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# 唤醒词模型文件路径
-WAKE_KEYWORD_PATH = os.path.join(SCRIPT_DIR, "voice_wake_word", "models", "小蓝_zh_windows_v3_0_0.ppn")
+# 唤醒词：名称:动作[:灵敏度]，模型文件为 voice_wake_word/models 下以“名称_”开头的 .ppn
+# （WAKE_BACKEND=template 时为同名的 .wav 模板录音，本地匹配，不需要 pvporcupine）
+# 动作：wake 播放应答后录音，quick 跳过应答直接录音，stop 停止播报
+# 例如 "小蓝:wake,小度:quick:0.6"（在 init_wake_word 中解析，写错时只关闭语音唤醒）
+WAKE_KEYWORDS = os.getenv("WAKE_KEYWORDS", "小蓝:wake:0.5")
 WAKE_MODEL_PATH = os.path.join(SCRIPT_DIR, "voice_wake_word", "models", "porcupine_params_zh.pv")
 
-# 唤醒词灵敏度 (0.0-1.0)
-WAKE_SENSITIVITY = 0.5
+# 唤醒应答："voice" 播放“我在”（首次合成后缓存在内存和本地），"earcon" 播放本地生成的提示音
+WAKE_ACK_MODE = os.getenv("WAKE_ACK", "voice")
+WAKE_ACK_TEXT = "我在"
+# 应答播放期间及结束后这段时间（秒）内不判定说话开始，屏蔽应答声音的回声
+WAKE_ACK_ECHO_TAIL = 0.15
 
-
-def get_access_token():
-    """
-    使用 AK，SK 生成鉴权签名（Access Token）
-    :return: access_token，或是None(如果错误)
-    """
-    params = {
-        "grant_type": "client_credentials",
-        "client_id": API_KEY,
-        "client_secret": SECRET_KEY
-    }
-    response = requests.post(TOKEN_URL, params=params)
-    return str(response.json().get("access_token"))
+# 播报期间说唤醒词可打断播报（设为0关闭）
+BARGE_IN_ENABLED = os.getenv("BARGE_IN", "1") != "0"
 
 
 # ==================== ADB 手机控制类 ====================
+# 控制方式："socket" 直接连接 adb server（见 adb_client，常驻shell会话），"subprocess" 每条命令启动一个adb进程
+ADB_BACKEND = os.getenv("ADB_BACKEND", "socket")
+
+
 class ADBController:
     """ADB手机控制器"""
     
@@ -150,9 +187,69 @@ class ADBController:
         "饿了么": "me.ele",
     }
     
-    def __init__(self):
+    def __init__(self, backend=ADB_BACKEND):
         self.connected = False
         self.device_name = None
+        self.backend = backend
+        # socket 方式：直接连接本机 adb server，每个设备复用一个常驻shell会话
+        self.client = ADBClient() if backend == "socket" else None
+        self._server_started = False
+        # 后台跟踪设备连接并缓存设备状态（socket 方式），见 start_watcher
+        self.watcher = DeviceWatcher(self.client) if self.client else None
+    
+    def start_watcher(self):
+        """启动后台设备跟踪，等待拿到首个设备列表"""
+        if self.watcher is None:
+            return False
+        return self.watcher.start().wait_synced(1.0)
+    
+    def _cached(self):
+        """可用的设备状态缓存；未启动、跟踪中断或已改用子进程方式时返回None（同步查询）"""
+        if self.watcher is not None and self.client is not None and self.watcher.synced:
+            return self.watcher
+        return None
+    
+    def close(self):
+        """停止设备跟踪，关闭常驻shell会话"""
+        if self.watcher:
+            self.watcher.stop()
+        if self.client:
+            self.client.close()
+    
+    def _via_server(self, func):
+        """
+        通过 adb server 协议执行 func(client)
+        连不上 adb server 时先启动一次，仍连不上则之后改用子进程方式
+        :return: (是否走了 adb server, 结果)，结果为None表示执行失败
+        """
+        if self.client is None:
+            return False, None
+        try:
+            return True, func(self.client)
+        except ADBConnectionError as e:
+            if not self._server_started:
+                self._server_started = True
+                if start_server():
+                    return self._via_server(func)
+            print(f"[ADB] {str(e)}，改用adb命令行")
+            self.client = None
+            return False, None
+        except ADBError as e:
+            print(f"[ADB] {str(e)}")
+            return True, None
+    
+    def run_shell(self, command):
+        """
+        在手机上执行shell命令
+        :return: (success, stdout, stderr)
+        """
+        used, result = self._via_server(lambda client: client.shell(self.device_name, command))
+        if not used:
+            return self.run_adb_command(f"shell {command}")
+        if result is None:
+            return False, "", "命令执行失败"
+        code, stdout, stderr = result
+        return code == 0, stdout.strip(), stderr.strip()
     
     def run_adb_command(self, command):
         """执行ADB命令并返回结果"""
@@ -177,6 +274,24 @@ class ADBController:
     
     def check_device_connected(self):
         """检查是否有设备连接"""
+        watcher = self._cached()
+        if watcher:
+            online = watcher.online_devices()
+            self.connected = bool(online)
+            if online and self.device_name not in online:
+                self.device_name = online[0]
+            return self.connected
+        
+        used, devices = self._via_server(lambda client: client.devices())
+        if used:
+            for serial, state in devices or []:
+                if state == "device":
+                    self.device_name = serial
+                    self.connected = True
+                    return True
+            self.connected = False
+            return False
+        
         success, stdout, stderr = self.run_adb_command("devices")
         if success and stdout:
             lines = stdout.strip().split('\n')
@@ -193,19 +308,23 @@ class ADBController:
         if not self.check_device_connected():
             return None
         
+        watcher = self._cached()
+        if watcher:
+            return watcher.get_state(self.device_name)
+        
         info = {}
         # 获取设备型号
-        success, stdout, _ = self.run_adb_command("shell getprop ro.product.model")
+        success, stdout, _ = self.run_shell("getprop ro.product.model")
         if success:
             info['model'] = stdout
         
         # 获取Android版本
-        success, stdout, _ = self.run_adb_command("shell getprop ro.build.version.release")
+        success, stdout, _ = self.run_shell("getprop ro.build.version.release")
         if success:
             info['android_version'] = stdout
         
         # 获取电池电量（Windows不支持grep，直接获取全部输出再解析）
-        success, stdout, _ = self.run_adb_command("shell dumpsys battery")
+        success, stdout, _ = self.run_shell("dumpsys battery")
         if success:
             match = re.search(r'level:\s*(\d+)', stdout)
             if match:
@@ -215,7 +334,9 @@ class ADBController:
     
     def press_key(self, keycode):
         """模拟按键"""
-        success, _, _ = self.run_adb_command(f"shell input keyevent {keycode}")
+        success, _, _ = self.run_shell(f"input keyevent {keycode}")
+        if keycode == 26 and self.watcher:
+            self.watcher.invalidate(self.device_name, "screen_on")
         return success
     
     def press_home(self):
@@ -236,10 +357,12 @@ class ADBController:
     
     def is_screen_on(self):
         """检查屏幕是否亮着"""
-        success, stdout, _ = self.run_adb_command('shell dumpsys power | findstr "mWakefulness"')
-        if success and "Awake" in stdout:
-            return True
-        return False
+        watcher = self._cached()
+        if watcher:
+            return watcher.is_screen_on(self.device_name)
+        # 在本地解析输出，不依赖电脑上的 findstr/grep
+        success, stdout, _ = self.run_shell("dumpsys power")
+        return success and re.search(r'mWakefulness=Awake', stdout) is not None
     
     def wake_screen(self):
         """唤醒屏幕（只有在屏幕关闭时才亮屏）"""
@@ -260,6 +383,15 @@ class ADBController:
     
     def take_screenshot(self, save_path="./phone_screenshot.png"):
         """手机截图"""
+        # 直接读取 screencap 的PNG输出，不经过手机存储中转
+        used, data = self._via_server(lambda client: client.exec_out(self.device_name, "screencap -p"))
+        if used:
+            if not data:
+                return False, "截图失败"
+            with open(save_path, 'wb') as f:
+                f.write(data)
+            return True, save_path
+        
         # 在手机上截图
         success, _, _ = self.run_adb_command("shell screencap -p /sdcard/screenshot.png")
         if not success:
@@ -311,24 +443,18 @@ class ADBController:
         
         # 优先使用am start -n直接指定Activity（最可靠）
         if package in self.APP_ACTIVITIES:
-            success, stdout, _ = self.run_adb_command(
-                f"shell am start -n {self.APP_ACTIVITIES[package]}"
-            )
+            success, stdout, _ = self.run_shell(f"am start -n {self.APP_ACTIVITIES[package]}")
             if success or "Starting:" in stdout:
                 return True, f"已打开{app_name}"
         
         # 备用方案1：使用monkey命令
-        success, stdout, _ = self.run_adb_command(
-            f"shell monkey -p {package} -c android.intent.category.LAUNCHER 1"
-        )
+        success, stdout, _ = self.run_shell(f"monkey -p {package} -c android.intent.category.LAUNCHER 1")
         if "Events injected: 1" in stdout:
             # 再检查一下是否真的启动了
             return True, f"已打开{app_name}"
         
         # 备用方案2：使用am start不指定activity，让系统自动解析
-        success, stdout, _ = self.run_adb_command(
-            f"shell am start {package}"
-        )
+        success, stdout, _ = self.run_shell(f"am start {package}")
         if success and "Error" not in stdout:
             return True, f"已打开{app_name}"
         
@@ -346,7 +472,7 @@ class ADBController:
         if not package:
             return False, f"未找到应用：{app_name}"
         
-        success, _, _ = self.run_adb_command(f"shell am force-stop {package}")
+        success, _, _ = self.run_shell(f"am force-stop {package}")
         if success:
             return True, f"已关闭{app_name}"
         else:
@@ -356,24 +482,24 @@ class ADBController:
         """输入文字（仅支持英文和数字）"""
         # 注意：ADB直接输入不支持中文
         text = text.replace(" ", "%s")
-        success, _, _ = self.run_adb_command(f'shell input text "{text}"')
+        success, _, _ = self.run_shell(f'input text "{text}"')
         return success
     
     def swipe(self, direction):
         """滑动屏幕"""
         # 获取屏幕尺寸（假设1080x1920）
         if direction == "up":
-            cmd = "shell input swipe 540 1500 540 500 300"
+            cmd = "input swipe 540 1500 540 500 300"
         elif direction == "down":
-            cmd = "shell input swipe 540 500 540 1500 300"
+            cmd = "input swipe 540 500 540 1500 300"
         elif direction == "left":
-            cmd = "shell input swipe 900 960 180 960 300"
+            cmd = "input swipe 900 960 180 960 300"
         elif direction == "right":
-            cmd = "shell input swipe 180 960 900 960 300"
+            cmd = "input swipe 180 960 900 960 300"
         else:
             return False
         
-        success, _, _ = self.run_adb_command(cmd)
+        success, _, _ = self.run_shell(cmd)
         return success
     
     def unlock_screen(self):
@@ -390,6 +516,11 @@ class ADBController:
     
     def reboot(self):
         """重启手机"""
+        used, result = self._via_server(lambda client: client.reboot(self.device_name) or True)
+        if used:
+            # 设备重启后常驻shell会话失效
+            self.client.close(self.device_name)
+            return result is not None
         success, _, _ = self.run_adb_command("reboot")
         return success
 
@@ -398,104 +529,142 @@ class VoiceInteractionSystem:
     """语音交互系统主类"""
     
     def __init__(self):
-        self.access_token = None
+        self.token_manager = get_token_manager()
         self.running = True
         self.adb = ADBController()  # ADB控制器
         pygame.mixer.init()
+        self.player = get_player()  # 内存解码、排队无缝播放
+        self.active_tts = None      # 正在进行的播报流水线（用于打断）
+        self.wake_ack = None        # 预先解码好的唤醒应答音频
         
         # 语音唤醒相关
         self.wake_word_enabled = False
-        self.porcupine = None
+        self.wake_engine = None
         self.wake_detected = False
         
+        # 常驻音频采集服务（唤醒检测与录音共享）
+        self.capture = None
+        self.wake_seq = None  # 唤醒词结束时的帧序号，录音从这里接着开始
+        
         print("=" * 50)
         print("       智能语音助手 v3.0")
         print("    支持语音唤醒 + PC控制 + 手机控制")
         print("=" * 50)
     
     def init_wake_word(self):
-        """初始化语音唤醒系统"""
-        if not WAKE_WORD_AVAILABLE:
+        """初始化语音唤醒系统（所有唤醒词共用一个检测器）"""
+        if WAKE_BACKEND == "porcupine" and not WAKE_WORD_AVAILABLE:
             print("[唤醒] pvporcupine未安装，语音唤醒不可用")
             return False
         
-        # 检查模型文件是否存在
-        if not os.path.exists(WAKE_KEYWORD_PATH):
-            print(f"[唤醒] 唤醒词模型文件不存在: {WAKE_KEYWORD_PATH}")
-            return False
-        if not os.path.exists(WAKE_MODEL_PATH):
-            print(f"[唤醒] 中文模型文件不存在: {WAKE_MODEL_PATH}")
+        try:
+            keywords = parse_keywords(WAKE_KEYWORDS)
+        except ValueError as e:
+            print(f"[唤醒] 唤醒词配置 WAKE_KEYWORDS 有误：{str(e)}，语音唤醒不可用")
             return False
         
-        try:
-            self.porcupine = pvporcupine.create(
-                access_key=WAKE_ACCESS_KEY,
-                keyword_paths=[WAKE_KEYWORD_PATH],
-                sensitivities=[WAKE_SENSITIVITY],
-                model_path=WAKE_MODEL_PATH
-            )
-            self.wake_word_enabled = True
-            print("[唤醒] 语音唤醒系统初始化成功！")
-            print(f"[唤醒] 唤醒词: 小蓝")
-            return True
-        except Exception as e:
-            print(f"[唤醒] 初始化失败: {str(e)}")
+        engine = WakeEngine(keywords, WAKE_ACCESS_KEY, WAKE_MODEL_PATH)
+        if not engine.start():
             return False
+        self.wake_engine = engine
+        self.wake_word_enabled = True
+        print("[唤醒] 语音唤醒系统初始化成功！")
+        return True
+    
+    @property
+    def wake_word_names(self):
+        """唤醒用的唤醒词名称（用于提示语）"""
+        if self.wake_engine:
+            keywords = self.wake_engine.keywords
+        else:
+            try:
+                keywords = parse_keywords(WAKE_KEYWORDS)
+            except ValueError:
+                return "唤醒词"
+        names = [k.name for k in keywords if k.action == ACTION_WAKE] or [k.name for k in keywords]
+        return "或".join(names)
     
     def wait_for_wake_word(self):
-        """等待唤醒词"""
-        if not self.wake_word_enabled or not self.porcupine:
-            return True  # 如果唤醒不可用，直接返回True
-        
-        print("\n[唤醒] 正在监听唤醒词，请说'小蓝'...")
-        
-        pa = pyaudio.PyAudio()
-        audio_stream = pa.open(
-            rate=self.porcupine.sample_rate,
-            channels=1,
-            format=pyaudio.paInt16,
-            input=True,
-            frames_per_buffer=self.porcupine.frame_length
-        )
+        """
+        等待唤醒词（检测到停止词时只停止播报，继续等待）
+        :return: 唤醒词的动作（"wake" 或 "quick"），唤醒不可用时返回"wake"，出错或退出返回None
+        """
+        if not self.wake_word_enabled or not self.wake_engine:
+            return ACTION_WAKE  # 如果唤醒不可用，直接返回
+        
+        print(f"\n[唤醒] 正在监听唤醒词，请说'{self.wake_word_names}'...")
+        
+        capture = self.get_capture()
+        if not capture:
+            return None
+        subscription = capture.subscribe()
+        to_samples = PCMFrameView(self.wake_engine.frame_length)
         
         try:
             while self.running:
-                pcm = audio_stream.read(self.porcupine.frame_length, exception_on_overflow=False)
-                pcm = struct.unpack_from("h" * self.porcupine.frame_length, pcm)
-                
-                keyword_index = self.porcupine.process(pcm)
+                pcm = subscription.read()
+                if pcm is None:
+                    if isinstance(capture, FileCaptureService) and capture.finished:
+                        print("\n[唤醒] 音频文件已读完")
+                        self.running = False
+                    break
                 
-                if keyword_index >= 0:
-                    print("\n[唤醒] 检测到唤醒词！")
-                    audio_stream.close()
-                    pa.terminate()
-                    return True
+                keyword = self.wake_engine.process(to_samples(pcm), subscription.last_time)
+                if keyword is None:
+                    continue
+                if keyword.action == ACTION_STOP:
+                    print(f"\n[唤醒] 检测到“{keyword.name}”，停止播报")
+                    self.stop_speaking()
+                    continue
+                print(f"\n[唤醒] 检测到唤醒词“{keyword.name}”！")
+                self.wake_seq = subscription.last_seq
+                return keyword.action
         except Exception as e:
             print(f"[唤醒] 监听错误: {str(e)}")
         finally:
-            try:
-                audio_stream.close()
-                pa.terminate()
-            except:
-                pass
+            subscription.close()
         
-        return False
+        return None
+    
+    def get_capture(self):
+        """获取常驻音频采集服务（首次调用时打开麦克风；设置了 AUDIO_INPUT_FILE 时从音频文件读取）"""
+        if self.capture is None or not self.capture.running:
+            if isinstance(self.capture, FileCaptureService) and self.capture.finished:
+                return None
+            frame_length = self.wake_engine.frame_length if self.wake_engine else CHUNK
+            if AUDIO_INPUT_FILES:
+                self.capture = FileCaptureService(AUDIO_INPUT_FILES, rate=RATE, frame_length=frame_length,
+                                                  channels=CHANNELS, speed=AUDIO_INPUT_SPEED)
+            else:
+                self.capture = AudioCaptureService(rate=RATE, frame_length=frame_length, channels=CHANNELS)
+            try:
+                if not self.capture.start():
+                    self.capture = None
+            except Exception as e:
+                print(f"[采集] 打开麦克风失败: {str(e)}")
+                self.capture = None
+        return self.capture
     
     def cleanup_wake_word(self):
         """清理语音唤醒资源"""
-        if self.porcupine:
-            try:
-                self.porcupine.delete()
-                self.porcupine = None
-            except:
-                pass
-        
+        if self.wake_engine:
+            stats = self.wake_engine.format_stats()
+            if stats:
+                print(f"[唤醒] 检测统计：{stats}")
+            self.wake_engine.delete()
+            self.wake_engine = None
+        
+    @property
+    def access_token(self):
+        """当前有效的Access Token（过期时自动刷新）"""
+        return self.token_manager.get_token()
+    
     def init_token(self):
-        """初始化Access Token"""
+        """初始化Access Token（优先使用本地缓存，并启动到期前自动刷新）"""
         print("\n[初始化] 正在获取百度API Token...")
         try:
-            self.access_token = get_access_token()
-            if self.access_token and self.access_token != "None":
+            if self.access_token:
+                self.token_manager.start_auto_refresh()
                 print("[初始化] Token获取成功！")
                 return True
             else:
@@ -505,72 +674,211 @@ class VoiceInteractionSystem:
             print(f"[初始化] 获取Token出错: {str(e)}")
             return False
     
-    def record_audio(self, duration=RECORD_SECONDS):
-        """录制音频"""
-        print(f"\n[录音] 开始录音，时长{duration}秒，请说话...")
-        
-        p = pyaudio.PyAudio()
-        stream = p.open(format=FORMAT,
-                       channels=CHANNELS,
-                       rate=RATE,
-                       input=True,
-                       frames_per_buffer=CHUNK)
-        
-        frames = []
-        for i in range(0, int(RATE / CHUNK * duration)):
-            data = stream.read(CHUNK, exception_on_overflow=False)
-            frames.append(data)
-            # 显示录音进度
-            progress = int((i + 1) / (RATE / CHUNK * duration) * 20)
-            print(f"\r[录音] 进度: [{'█' * progress}{'░' * (20 - progress)}]", end="")
-        
-        print("\n[录音] 录音完成！")
-        
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-        
-        # 保存为WAV文件
-        wf = wave.open(AUDIO_FILE, 'wb')
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(p.get_sample_size(FORMAT))
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
-        wf.close()
-        
-        return AUDIO_FILE
-    
-    def speech_to_text(self, audio_file):
-        """语音识别：将音频转为文字"""
+    def warm_up(self):
+        """预热大模型连接，避免唤醒后第一次请求还要等握手；后台预合成固定提示语"""
+        warm_up_llm()
+        warm_up_vl()
+        
+        segments = []
+        for phrase in find_fixed_phrases():
+            segments.extend(s for s in self._split_text_for_tts(phrase) if s not in segments)
+        get_tts_cache().pin(self._tts_cache_key(s) for s in segments + [WAKE_ACK_TEXT])
+        prewarm_tts(segments, self._tts_single)
+        threading.Thread(target=self.prepare_wake_ack, daemon=True).start()
+    
+    def prepare_wake_ack(self):
+        """预先准备唤醒应答音频（解码到内存），唤醒后直接播放，不再请求合成接口"""
+        if self.wake_ack is not None:
+            return self.wake_ack
+        audio = self._tts_single(WAKE_ACK_TEXT) if WAKE_ACK_MODE == "voice" else None
+        sound = self.player.decode(audio) if audio else None
+        if sound is None:
+            # 合成失败或配置为提示音时，使用本地生成的提示音
+            sound = self.player.decode(make_earcon())
+        self.wake_ack = sound
+        return sound
+    
+    def play_wake_ack(self):
+        """
+        播放唤醒应答（不阻塞，录音可以同时开始）
+        :return: 录音开头需要屏蔽的时长（秒），即应答时长加回声余量
+        """
+        sound = self.wake_ack or self.prepare_wake_ack()
+        if sound is None:
+            return 0.0
+        self.player.play(sound)
+        return sound.get_length() + WAKE_ACK_ECHO_TAIL
+    
+    def record_audio(self, duration=RECORD_SECONDS, mode=RECORD_MODE, on_frame=None, hold=0.0):
+        """
+        录制音频
+        :param duration: 固定模式下的录音时长（秒）
+        :param mode: "vad" 检测到说话结束后自动停止，"fixed" 录满固定时长
+        :param on_frame: 音频帧回调 on_frame(pcm)，用于边录边传
+        :param hold: VAD模式下录音开头这段时间（秒）内不判定说话开始（正在播放唤醒应答）
+        :return: AudioBuffer 内存音频
+        """
+        capture = self.get_capture()
+        if not capture:
+            raise RuntimeError("麦克风不可用")
+        
+        # 紧接唤醒词之后的帧开始录音，避免丢失开头的音节
+        subscription = capture.subscribe(from_seq=self.wake_seq)
+        self.wake_seq = None
+        frame_length = capture.frame_length
+        
+        try:
+            if mode == "vad":
+                frames = self._record_until_silence(subscription, on_frame, hold)
+            else:
+                print(f"\n[录音] 开始录音，时长{duration}秒，请说话...")
+                frames = []
+                total = int(RATE / frame_length * duration)
+                for i in range(0, total):
+                    data = subscription.read()
+                    if data is None:
+                        break
+                    frames.append(data)
+                    if on_frame:
+                        on_frame(data)
+                    # 显示录音进度
+                    progress = int((i + 1) / total * 20)
+                    print(f"\r[录音] 进度: [{'█' * progress}{'░' * (20 - progress)}]", end="")
+                print("\n[录音] 录音完成！")
+        finally:
+            subscription.close()
+        
+        audio = AudioBuffer(b''.join(frames), sample_rate=RATE, channels=CHANNELS,
+                            sample_width=pyaudio.get_sample_size(FORMAT))
+        
+        # 调试模式下保存录音
+        if DEBUG_SAVE_AUDIO:
+            os.makedirs(DEBUG_AUDIO_DIR, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            path = audio.save_wav(os.path.join(DEBUG_AUDIO_DIR, f"record_{timestamp}.wav"))
+            print(f"[录音] 调试录音已保存: {path}")
+        
+        return audio
+    
+    def _record_until_silence(self, subscription, on_frame=None, hold=0.0):
+        """VAD模式录音：说完话并静音一段时间后自动结束"""
+        print(f"\n[录音] 开始录音，说完后自动结束（最长{VAD_MAX_DURATION}秒），请说话...")
+        
+        endpointer = VADEndpointer(
+            sample_rate=RATE,
+            trailing_silence=VAD_TRAILING_SILENCE,
+            min_duration=VAD_MIN_DURATION,
+            max_duration=VAD_MAX_DURATION,
+            preroll=VAD_PREROLL,
+            no_speech_timeout=VAD_NO_SPEECH_TIMEOUT + hold
+        )
+        endpointer.hold_until = hold
+        while True:
+            data = subscription.read()
+            if data is None:
+                break
+            done = endpointer.process(data)
+            if on_frame:
+                # 只推送端点检测保留下来的帧（前置缓冲 + 语音段）
+                for frame in endpointer.take_new_frames():
+                    on_frame(frame)
+            if done:
+                break
+            status = "说话中" if endpointer.state == VADEndpointer.SPEAKING else "等待说话"
+            print(f"\r[录音] {status}... {endpointer.elapsed:.1f}秒", end="")
+        
+        print(f"\n[录音] 录音完成！时长{endpointer.elapsed:.1f}秒（{endpointer.end_reason}）")
+        return [endpointer.get_audio()]
+    
+    def listen_and_recognize(self, mode=RECORD_MODE):
+        """
+        录音并识别，流式模式下边录音边上传
+        :return: 识别文本，失败返回None
+        """
+        audio, recognizer = self.capture_utterance(mode=mode)
+        return self.recognize(audio, recognizer)
+    
+    def capture_utterance(self, mode=RECORD_MODE, hold=0.0):
+        """
+        录一句话；流式识别模式下同时把音频边录边传给识别服务
+        :param hold: 录音开头不判定说话开始的时长（秒），用于屏蔽唤醒应答的回声
+        :return: (audio, recognizer)，recognizer 为流式识别器（未使用流式识别时为None）
+        """
+        recognizer = None
+        if ASR_MODE == "stream":
+            recognizer = StreamingRecognizer(
+                sample_rate=RATE,
+                on_partial=lambda text: print(f"\r[识别] {text}", end="")
+            )
+            try:
+                recognizer.start()
+            except Exception as e:
+                print(f"[识别] 流式识别连接失败，改用整段识别: {str(e)}")
+                recognizer = None
+        
+        audio = self.record_audio(mode=mode, on_frame=recognizer.feed if recognizer else None, hold=hold)
+        return audio, recognizer
+    
+    def recognize(self, audio, recognizer=None):
+        """
+        获取一句话的识别结果
+        :param recognizer: capture_utterance 返回的流式识别器
+        :return: 识别文本，失败返回None
+        """
+        if recognizer:
+            text = recognizer.finish()
+            if text:
+                print(f"\n[识别] 识别结果: {text}")
+                return text
+        # 流式识别失败时用已录好的音频兜底
+        return self.speech_to_text(audio)
+    
+    def speech_to_text(self, audio):
+        """
+        语音识别：将音频转为文字
+        :param audio: AudioBuffer 内存音频，或WAV文件路径
+        """
         print("[识别] 正在进行语音识别...")
         
-        # 读取音频文件
-        with open(audio_file, 'rb') as f:
-            speech_data = f.read()
+        if not isinstance(audio, AudioBuffer):
+            audio = AudioBuffer.from_wav(audio)
+        if not audio:
+            print("[识别] 没有录到音频")
+            return None
+        speech_data = audio.view()
         
         # Base64编码
         speech = base64.b64encode(speech_data).decode('utf-8')
         
-        # 构建请求
-        payload = json.dumps({
-            "format": "wav",
-            "rate": RATE,
-            "channel": 1,
-            "cuid": "VoiceInteractionSystem",
-            "token": self.access_token,
-            "speech": speech,
-            "len": len(speech_data)
-        }, ensure_ascii=False)
-        
         headers = {
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         }
         
         try:
-            response = requests.post(ASR_URL, headers=headers, data=payload.encode("utf-8"))
-            response.encoding = "utf-8"
-            result = response.json()
+            for attempt in range(2):
+                # 构建请求（直接上传PCM裸数据，无需WAV封装）
+                payload = json.dumps({
+                    "format": "pcm",
+                    "rate": audio.sample_rate,
+                    "channel": audio.channels,
+                    "cuid": "VoiceInteractionSystem",
+                    "token": self.access_token,
+                    "speech": speech,
+                    "len": len(speech_data)
+                }, ensure_ascii=False)
+                
+                response = http_pool.post(ASR_URL, headers=headers, data=payload.encode("utf-8"),
+                                          timeout=ASR_TIMEOUT)
+                response.encoding = "utf-8"
+                result = response.json()
+                
+                # Token失效时强制刷新后重试一次
+                if attempt == 0 and is_auth_error(result):
+                    print("[识别] Token已失效，正在刷新...")
+                    self.token_manager.refresh(force=True)
+                    continue
+                break
             
             if result.get('err_no') == 0:
                 text = result['result'][0]
@@ -625,498 +933,309 @@ class VoiceInteractionSystem:
         
         return sentences if sentences else [text]
     
-    def _tts_single(self, text, audio_file=None):
-        """合成单段文字并保存到文件"""
+    def _tts_cache_key(self, text):
+        return tts_cache_key(text, TTS_PER, TTS_SPD, TTS_PIT, TTS_VOL, 3)
+    
+    def _tts_single(self, text):
+        """
+        合成单段文字
+        :return: mp3音频数据(bytes)，失败返回None
+        """
+        # 固定提示语和重复出现的文字优先从本地缓存读取（一次性的内容不会写入缓存）
+        key = self._tts_cache_key(text)
+        cacheable = len(text) <= TTS_CACHE_MAX_TEXT_LEN
+        if cacheable:
+            audio = get_tts_cache().get(key)
+            if audio:
+                return audio
+        
         from urllib.parse import quote
         tex = quote(text)
         
-        if audio_file is None:
-            audio_file = TTS_OUTPUT
-        
-        payload = f'tex={tex}&tok={self.access_token}&cuid=VoiceInteractionSystem&ctp=1&lan=zh&spd={TTS_SPD}&pit={TTS_PIT}&vol={TTS_VOL}&per={TTS_PER}&aue=3'
-        
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded',
             'Accept': '*/*'
         }
         
         try:
-            response = requests.post(TTS_URL, headers=headers, data=payload.encode("utf-8"))
+            for attempt in range(2):
+                payload = f'tex={tex}&tok={self.access_token}&cuid=VoiceInteractionSystem&ctp=1&lan=zh&spd={TTS_SPD}&pit={TTS_PIT}&vol={TTS_VOL}&per={TTS_PER}&aue=3'
+                response = http_pool.post(TTS_URL, headers=headers, data=payload.encode("utf-8"),
+                                          timeout=TTS_TIMEOUT)
+                
+                # 合成失败时返回JSON错误信息，Token失效则强制刷新后重试一次
+                content_type = response.headers.get('Content-Type', '')
+                if attempt == 0 and 'audio/' not in content_type:
+                    try:
+                        error = response.json()
+                    except ValueError:
+                        error = None
+                    if is_auth_error(error):
+                        self.token_manager.refresh(force=True)
+                        continue
+                break
             
-            content_type = response.headers.get('Content-Type', '')
             if 'audio/' in content_type:
-                # 写入音频文件
-                with open(audio_file, 'wb') as f:
-                    f.write(response.content)
-                return True, audio_file
+                if cacheable:
+                    get_tts_cache().put(key, response.content)
+                return response.content
             else:
-                return False, None
+                return None
         except Exception as e:
             print(f"[播报] 合成错误: {str(e)}")
-            return False, None
+            return None
     
-    def _play_audio(self, audio_file):
-        """播放音频文件"""
-        try:
-            pygame.mixer.music.stop()
-            pygame.mixer.music.unload()
-        except:
-            pass
-        time.sleep(0.02)  # 短暂等待释放文件句柄
+    def _play_audio(self, audio):
+        """
+        把内存中的mp3音频加入播放队列（不阻塞）
+        :return: 播放句柄，handle.wait() 等待播放结束
+        """
+        return self.player.play(audio)
+    
+    def stop_speaking(self):
+        """打断当前播报：取消未合成/未播放的段并立即停止声音"""
+        pipeline = self.active_tts
+        if pipeline:
+            pipeline.cancel()
+        return self.player.stop()
+    
+    def understand(self, text):
+        """
+        意图识别；开启流式播报时，闲谈回复边生成边播报
+        :return: (is_instruction, result, speech)
+                 speech 为流式播报对象（未开启时为None），调用 speech.finish() 等待播完，返回False表示还需自行播报
+        """
+        if not LLM_STREAM:
+            is_instruction, result = process_query(text)
+            return is_instruction, result, None
         
+        speech = SpeechStream(self._tts_single, self._play_audio)
+        self.active_tts = speech.pipeline
         try:
-            pygame.mixer.music.load(audio_file)
-            pygame.mixer.music.play()
-            while pygame.mixer.music.get_busy():
-                time.sleep(0.05)
-        except Exception as e:
-            print(f"[播报] 播放错误: {str(e)}")
+            is_instruction, result = process_query(text, on_talk_text=speech.feed_text)
+        finally:
+            speech.close()
+        return is_instruction, result, speech
     
     def text_to_speech(self, text):
-        """语音合成：将文字转为语音并播放（支持长文本流式播放，带预加载）"""
+        """语音合成：将文字转为语音并播放（长文本切分后流水线合成，边合成边播放）"""
         print(f"[播报] 正在合成语音: {text}")
         
-        # 先释放之前的音频占用
-        try:
-            pygame.mixer.music.stop()
-            pygame.mixer.music.unload()
-        except:
-            pass
-        time.sleep(0.05)
-        
         # 切分长文本
         sentences = self._split_text_for_tts(text)
         
         if len(sentences) > 1:
             print(f"[播报] 文本已切分为 {len(sentences)} 段进行流式播放")
         
-        # 使用两个临时文件交替，实现预加载
-        audio_files = ["./tts_temp_0.mp3", "./tts_temp_1.mp3"]
-        
-        # 清理可能存在的旧文件
-        for f in audio_files:
-            try:
-                if os.path.exists(f):
-                    os.remove(f)
-            except:
-                pass
-        
-        # 预先合成第一段
-        if sentences:
-            success, current_audio = self._tts_single(sentences[0], audio_files[0])
-            if not success:
-                print("[播报] 第 1 段合成失败")
-                return False
-        
-        # 逐段播放，同时预加载下一段
-        for i, sentence in enumerate(sentences):
-            if not sentence.strip():
-                continue
-            
-            current_audio = audio_files[i % 2]
-            next_audio = audio_files[(i + 1) % 2]
-            
-            # 如果有下一段，启动后台线程预加载
-            next_thread = None
-            if i + 1 < len(sentences):
-                next_sentence = sentences[i + 1]
-                if next_sentence.strip():
-                    next_thread = threading.Thread(
-                        target=self._tts_single, 
-                        args=(next_sentence, next_audio)
-                    )
-                    next_thread.start()
-            
-            # 播放当前段
-            if len(sentences) > 1:
-                print(f"[播报] 播放第 {i+1}/{len(sentences)} 段")
-            self._play_audio(current_audio)
-            
-            # 等待预加载完成
-            if next_thread:
-                next_thread.join()
-        
-        # 清理临时文件
-        try:
-            pygame.mixer.music.unload()
-        except:
-            pass
-        time.sleep(0.02)
-        for f in audio_files:
-            try:
-                if os.path.exists(f):
-                    os.remove(f)
-            except:
-                pass
+        pipeline = self.active_tts = TTSPipeline(self._tts_single, self._play_audio)
+        stats = pipeline.speak(sentences)
         
+        if not stats["played"]:
+            print("[播报] 语音合成失败")
+            return False
+        if len(sentences) > 1:
+            print(f"[播报] {format_stats(stats)}")
         print("[播报] 语音播放完成！")
         return True
     
-    def execute_command(self, command, is_subcommand=False):
+    def execute_command(self, command, is_subcommand=False, cancelled=None):
         """
-        解析并执行语音指令
-        :param command: 指令内容
+        解析并执行语音指令（指令表见 command_registry）
+        :param command: 指令内容（标准指令文本，或结构化意图 StructuredCommand）
         :param is_subcommand: 是否为子指令（用于复合指令）
+        :param cancelled: 返回True表示本轮已取消（打断/超时）的函数，取消后不再执行有副作用的操作
         :return: 执行结果
         """
+        if isinstance(command, StructuredCommand):
+            return self.execute_structured(command, cancelled)
+        
         original_command = command
-        command = command.replace("，", "").replace("。", "").replace(" ", "").lower()
+        command = normalize_command(command)
         print(f"[执行] 正在解析指令: {command}")
         
         # ============ 复合指令处理 ============
-        # 检查是否包含复合指令连接词
-        compound_keywords = ["并", "然后", "再", "接着", "之后"]
-        split_keyword = None
-        for keyword in compound_keywords:
-            if keyword in command:
-                split_keyword = keyword
-                break
-        
-        if split_keyword and not is_subcommand:
-            # 拆分复合指令
-            parts = command.split(split_keyword, 1)
-            if len(parts) == 2:
-                first_command = parts[0].strip()
-                second_command = parts[1].strip()
-                
-                print(f"[复合指令] 检测到复合指令，拆分为：")
-                print(f"  第一部分: {first_command}")
-                print(f"  第二部分: {second_command}")
-                
-                # 执行第一部分
-                first_result = self.execute_command(first_command, is_subcommand=True)
-                print(f"[复合指令] 第一部分执行结果: {first_result}")
-                
-                # 判断是否需要等待（对于打开浏览器、B站、淘宝等需要加载的操作）
-                need_wait = False
-                wait_keywords = ["浏览器", "b站", "bilibili", "哔哩哔哩", "淘宝", "百度"]
-                for kw in wait_keywords:
-                    if kw in first_command:
-                        need_wait = True
-                        break
-                
-                if need_wait:
-                    print(f"[复合指令] 检测到需要等待的操作，等待3秒让页面加载...")
-                    time.sleep(3)
-                
-                # 执行第二部分
-                second_result = self.execute_command(second_command, is_subcommand=True)
-                print(f"[复合指令] 第二部分执行结果: {second_result}")
-                
-                # 合并结果
-                if first_result and second_result:
-                    return f"{first_result}，{second_result}"
-                elif first_result:
-                    return first_result
-                elif second_result:
-                    return second_result
-                else:
-                    return "指令执行完成"
-        
-        result = None
-        
-        # ============ 系统信息类指令 ============
-        if "时间" in command or "几点" in command:
-            now = datetime.datetime.now()
-            result = f"现在时间是{now.hour}点{now.minute}分{now.second}秒"
-            
-        elif "日期" in command or "几号" in command or "星期" in command:
-            now = datetime.datetime.now()
-            weekdays = ["一", "二", "三", "四", "五", "六", "日"]
-            result = f"今天是{now.year}年{now.month}月{now.day}日，星期{weekdays[now.weekday()]}"
-            
-            
-        # ============ 系统操作类指令 ============
-        elif "打开记事本" in command or "记事本" in command:
-            subprocess.Popen("notepad.exe")
-            result = "已为您打开记事本"
-             
-        elif "打开画图" in command or "画图" in command:
-            subprocess.Popen("mspaint.exe")
-            result = "已为您打开画图程序"
-            
-        elif "打开浏览器" in command or "浏览器" in command:
-            # 提取搜索关键词（支持复合指令场景）
-            keyword = command
-            # 移除常见的前缀和后缀
-            for prefix in ["打开", "用", "在"]:
-                if keyword.startswith(prefix):
-                    keyword = keyword[len(prefix):]
-            keyword = keyword.replace("浏览器", "").replace("搜索", "").replace("百度", "").strip()
-            # 移除可能的连接词（复合指令场景）
-            for connector in ["并", "然后", "再", "接着", "之后"]:
-                if connector in keyword:
-                    keyword = keyword.split(connector)[0].strip()
-            keyword = keyword.strip()
-            if keyword:
-                from urllib.parse import quote
-                search_url = f"https://www.baidu.com/s?wd={quote(keyword)}"
-                webbrowser.open(search_url)
-                result = f"已为您在浏览器中搜索{keyword}"
-            else:
-                result = "请说出要搜索的内容，例如：打开浏览器搜索Python教程"
-            
-        elif "打开百度" in command:
-            webbrowser.open("https://www.baidu.com")
-            result = "已为您打开百度"
-            
-        elif "打开命令行" in command or "命令提示符" in command or "cmd" in command:
-            subprocess.Popen("cmd.exe")
-            result = "已为您打开命令提示符"
-            
-        elif "打开资源管理器" in command or "文件管理" in command or "我的电脑" in command:
-            subprocess.Popen("explorer.exe")
-            result = "已为您打开资源管理器"
-        
-        # ============ B站视频播放 ============
-        elif "b站" in command or "bilibili" in command or "哔哩哔哩" in command:
-            # 提取视频关键词
-            keyword = command.replace("打开", "").replace("b站", "").replace("bilibili", "")
-            keyword = keyword.replace("哔哩哔哩", "").replace("播放", "").replace("视频", "")
-            keyword = keyword.replace("搜索", "").strip()
-            if keyword:
-                success, msg = play_bilibili_video(keyword)
-                result = msg
-            else:
-                result = "请说出要搜索的视频关键词，例如：打开B站播放音乐视频"
-        
-        # ============ 淘宝搜索 （排除手机淘宝）============
-        elif "淘宝" in command and "手机" not in command:
-            # 提取商品关键词
-            keyword = command.replace("打开", "").replace("淘宝", "").replace("搜索", "")
-            keyword = keyword.replace("商品", "").strip()
-            if keyword:
-                success, msg = search_taobao(keyword)
-                result = msg
-            else:
-                result = "请说出要搜索的商品，例如：打开淘宝搜索手机壳"
-        
-        # ============ 微信发消息 ============
-        elif "微信" in command and ("发" in command or "消息" in command or "信息" in command):
-            # 解析：打开微信发XXX信息给XXX 或 打开微信给XXX发XXX
-            import re
-            # 尝试匹配 "发XXX给XXX" 或 "给XXX发XXX"
-            pattern1 = r"发(.+?)(?:信息|消息)?给(.+)"
-            pattern2 = r"给(.+?)发(.+?)(?:信息|消息)?"
-            
-            match1 = re.search(pattern1, command)
-            match2 = re.search(pattern2, command)
-            
-            if match1:
-                content = match1.group(1).strip()
-                friend = match1.group(2).strip()
-            elif match2:
-                friend = match2.group(1).strip()
-                content = match2.group(2).strip()
-            else:
-                content = None
-                friend = None
-            
-            if friend and content:
-                success, msg = send_wechat_message(friend, content)
-                result = msg
-            else:
-                result = "请说出完整指令，例如：打开微信发你好给张三"
-        
-        # ============ 音乐播放控制 ============
-        elif "播放" in command and ("音乐" in command or "歌" in command or "歌曲" in command):
-            # 提取歌曲关键词
-            keyword = command.replace("播放", "").replace("音乐", "").replace("歌曲", "")
-            keyword = keyword.replace("歌", "").replace("打开", "").replace("帮我", "")
-            keyword = keyword.replace("听", "").replace("放", "").strip()
-            
-            if keyword:
-                # 搜索指定歌曲
-                result = f"正在搜索: {keyword}..."
-                if not is_subcommand:
-                    self.text_to_speech(result)
-                success, msg = play_music(keyword)
-                result = msg
-            else:
-                # 播放热门歌曲
-                success, msg = start_music()
-                result = msg if msg else "已开始播放音乐"
-        
-        elif "下一首" in command or "切歌" in command:
-            success, msg = next_music()
-            result = msg
-        
-        elif "上一首" in command:
-            success, msg = previous_music()
-            result = msg
-        
-        elif "暂停音乐" in command or "暂停播放" in command:
-            success, msg = pause_music()
-            result = msg
-        
-        elif "停止音乐" in command or "关闭音乐" in command:
-            success, msg = stop_music()
-            result = msg
-        
-        # ============ 视觉大模型功能 ============
-        elif "总结" in command and ("当前" in command or "屏幕" in command or "内容" in command or "界面" in command or "搜索" in command):
-            result = "正在截屏并分析内容，请稍候..."
-            if not is_subcommand:
-                self.text_to_speech(result)
-            success, summary = summarize_screen()
-            if success:
-                result = f"屏幕内容总结：{summary}"
-            else:
-                result = summary
-        
-        elif "翻译" in command and ("当前" in command or "屏幕" in command or "界面" in command or "搜索" in command):
-            result = "正在截屏并翻译内容，请稍候..."
-            if not is_subcommand:
-                self.text_to_speech(result)
-            success, translation = translate_screen()
-            if success:
-                result = f"翻译结果：{translation}"
-            else:
-                result = translation
-        
-        # ============ Word文档写入 ============
-        elif ("文档" in command or "word" in command.lower()) and ("写" in command or "创建" in command or "生成" in command):
-            # 解析指令提取主题和类型
-            topic, article_type = parse_write_command(original_command)
-            result = f"正在生成关于{topic}的{article_type}，请稍候..."
-            if not is_subcommand:
-                self.text_to_speech(result)
-            success, msg = write_document(topic, article_type)
-            if success:
-                result = f"文档创建成功，{article_type}已保存到documents文件夹"
-            else:
-                result = msg
-        
-        # ============ ADB手机控制类指令 ============
-        elif "打开手机" in command:
-            # 提取应用名称
-            app_name = command.replace("打开手机", "").replace("上的", "").strip()
-            if app_name:
-                if not self.adb.check_device_connected():
-                    result = "未检测到手机连接"
-                else:
-                    success, msg = self.adb.open_app(app_name)
-                    result = msg
-            else:
-                result = "请说出要打开的应用名称，例如：打开手机微信"
-        
-        elif "关闭手机" in command and "应用" not in command:
-            # 提取应用名称
-            app_name = command.replace("关闭手机", "").replace("上的", "").strip()
-            if app_name:
-                if not self.adb.check_device_connected():
-                    result = "未检测到手机连接"
-                else:
-                    success, msg = self.adb.close_app(app_name)
-                    result = msg
-            else:
-                result = "请说出要关闭的应用名称"
-        
-        elif "手机截图" in command or "手机截屏" in command:
-            if not self.adb.check_device_connected():
-                result = "未检测到手机连接"
-            else:
-                success, msg = self.adb.take_screenshot()
-                if success:
-                    result = f"手机截图已保存到{msg}"
-                else:
-                    result = msg
-        
-        elif "手机返回" in command or "返回键" in command:
-            if not self.adb.check_device_connected():
-                result = "未检测到手机连接"
-            elif self.adb.press_back():
-                result = "已按下返回键"
-            else:
-                result = "返回键操作失败"
-        
-        elif "手机主页" in command or "主页键" in command or "回到桌面" in command:
-            if not self.adb.check_device_connected():
-                result = "未检测到手机连接"
-            elif self.adb.press_home():
-                result = "已返回主页"
-            else:
-                result = "主页键操作失败"
-        
-        elif "手机亮屏" in command or "点亮屏幕" in command or "解锁手机" in command:
-            if not self.adb.check_device_connected():
-                result = "未检测到手机连接"
-            elif self.adb.unlock_screen():
-                result = "已点亮并解锁屏幕"
-            else:
-                result = "亮屏操作失败"
-        
-        elif "手机息屏" in command or "锁屏" in command or "手机锁屏" in command:
-            if not self.adb.check_device_connected():
-                result = "未检测到手机连接"
-            elif self.adb.lock_screen():
-                result = "已锁定屏幕"
-            else:
-                result = "锁屏操作失败"
-        
-        elif "手机音量" in command:
-            if not self.adb.check_device_connected():
-                result = "未检测到手机连接"
-            elif "增加" in command or "调大" in command or "加" in command:
-                if self.adb.volume_up():
-                    result = "已增加音量"
-                else:
-                    result = "音量调节失败"
-            elif "减少" in command or "调小" in command or "减" in command:
-                if self.adb.volume_down():
-                    result = "已减少音量"
-                else:
-                    result = "音量调节失败"
-            else:
-                result = "请说手机音量增加或手机音量减少"
-        
-        elif "手机上滑" in command:
-            if not self.adb.check_device_connected():
-                result = "未检测到手机连接"
-            elif self.adb.swipe("up"):
-                result = "已向上滑动"
-            else:
-                result = "滑动操作失败"
-        
-        elif "手机下滑" in command:
-            if not self.adb.check_device_connected():
-                result = "未检测到手机连接"
-            elif self.adb.swipe("down"):
-                result = "已向下滑动"
-            else:
-                result = "滑动操作失败"
-        
-        elif "重启手机" in command:
-            if not self.adb.check_device_connected():
-                result = "未检测到手机连接"
-            elif self.adb.reboot():
-                result = "手机正在重启"
-            else:
-                result = "重启操作失败"
-        
-        # 检查手机状态（放在所有具体手机指令之后，作为兜底）
-        elif "手机" in command or "检查手机" in command:
-            if self.adb.check_device_connected():
-                info = self.adb.get_device_info()
-                if info:
-                    result = f"手机已连接，型号{info.get('model', '未知')}，安卓版本{info.get('android_version', '未知')}，电量{info.get('battery', '未知')}%"
-                else:
-                    result = "手机已连接"
-            else:
-                result = "未检测到手机连接，请确保USB调试已开启并连接手机"
-                
-        # ============ 系统控制类指令 ============
-        elif "退出" in command or "再见" in command:
-            result = "好的，再见！系统即将关闭"
-            self.running = False
-            
-        elif "帮助" in command or "能做什么" in command or "功能" in command:
-            result = "我可以：播放B站视频、淘宝搜索商品、微信发消息、播放音乐、总结翻译屏幕内容、创建Word文档。还可以控制手机，如打开手机微信、手机截图等。说检查手机可查看连接状态"
-            
-        else:
-            result = f"抱歉，我不理解指令：{command}，请说帮助查看可用功能"
-        
-        return result
+        # 拆成多条子指令，互不相关的并发执行，有依赖的等前一条就绪后执行
+        if not is_subcommand:
+            planner = get_planner()
+            steps = planner.plan(command)
+            if steps:
+                return planner.execute(self, steps, cancelled)
+        
+        return get_registry().dispatch(self, command, original_command, is_subcommand, cancelled)
+    
+    def execute_structured(self, structured, cancelled=None):
+        """
+        执行结构化意图（指令名和参数已由大模型/本地匹配给出，不再解析指令文本）
+        :param structured: StructuredCommand
+        :param cancelled: 同 execute_command
+        :return: 执行结果
+        """
+        print(f"[执行] 结构化指令: {structured}")
+        if len(structured.items) > 1:
+            planner = get_planner()
+            return planner.execute(self, planner.plan_items(structured.items, structured.query), cancelled)
+        spec, slots = structured.items[0]
+        return get_registry().call(self, spec, slots, str(structured), structured.query, cancelled=cancelled)
+    
+    def device_connected(self):
+        """需要手机的指令执行前检查连接"""
+        return self.adb.check_device_connected()
+    
+    # ============ 指令处理方法（由 command_registry 按指令名 cmd_<name> 调用）============
+    # ============ 系统信息类指令 ============
+    def cmd_query_time(self, ctx):
+        now = datetime.datetime.now()
+        return f"现在时间是{now.hour}点{now.minute}分{now.second}秒"
+    
+    def cmd_query_date(self, ctx):
+        now = datetime.datetime.now()
+        weekdays = ["一", "二", "三", "四", "五", "六", "日"]
+        return f"今天是{now.year}年{now.month}月{now.day}日，星期{weekdays[now.weekday()]}"
+    
+    # ============ 系统操作类指令 ============
+    def cmd_open_notepad(self, ctx):
+        subprocess.Popen("notepad.exe")
+        return "已为您打开记事本"
+    
+    def cmd_open_paint(self, ctx):
+        subprocess.Popen("mspaint.exe")
+        return "已为您打开画图程序"
+    
+    def cmd_browser_search(self, ctx, keyword):
+        from urllib.parse import quote
+        webbrowser.open(f"https://www.baidu.com/s?wd={quote(keyword)}")
+        return f"已为您在浏览器中搜索{keyword}"
+    
+    def cmd_open_baidu(self, ctx):
+        webbrowser.open("https://www.baidu.com")
+        return "已为您打开百度"
+    
+    def cmd_open_cmd(self, ctx):
+        subprocess.Popen("cmd.exe")
+        return "已为您打开命令提示符"
+    
+    def cmd_open_explorer(self, ctx):
+        subprocess.Popen("explorer.exe")
+        return "已为您打开资源管理器"
+    
+    # ============ B站 / 淘宝 / 微信 ============
+    def cmd_bilibili(self, ctx, keyword):
+        success, msg = play_bilibili_video(keyword)
+        return msg
+    
+    def cmd_taobao(self, ctx, keyword):
+        success, msg = search_taobao(keyword)
+        return msg
+    
+    def cmd_wechat_send(self, ctx, friend, content):
+        success, msg = send_wechat_message(friend, content)
+        return msg
+    
+    # ============ 音乐播放控制 ============
+    def cmd_music_play(self, ctx, keyword=None):
+        if keyword:
+            # 搜索指定歌曲
+            ctx.notify(f"正在搜索: {keyword}...")
+            success, msg = play_music(keyword)
+            return msg
+        # 播放热门歌曲
+        success, msg = start_music()
+        return msg if msg else "已开始播放音乐"
+    
+    def cmd_music_next(self, ctx):
+        success, msg = next_music()
+        return msg
+    
+    def cmd_music_previous(self, ctx):
+        success, msg = previous_music()
+        return msg
+    
+    def cmd_music_pause(self, ctx):
+        success, msg = pause_music()
+        return msg
+    
+    def cmd_music_stop(self, ctx):
+        success, msg = stop_music()
+        return msg
+    
+    # ============ 视觉大模型功能 ============
+    def cmd_summarize_screen(self, ctx):
+        ctx.notify("正在截屏并分析内容，请稍候...")
+        success, summary = summarize_screen()
+        return f"屏幕内容总结：{summary}" if success else summary
+    
+    def cmd_translate_screen(self, ctx):
+        ctx.notify("正在截屏并翻译内容，请稍候...")
+        success, translation = translate_screen()
+        return f"翻译结果：{translation}" if success else translation
+    
+    # ============ Word文档写入 ============
+    def cmd_write_document(self, ctx, topic=None, article_type=None):
+        if not topic or not article_type:
+            # 从原始指令中解析主题和类型
+            parsed_topic, parsed_type = parse_write_command(ctx.original)
+            topic, article_type = topic or parsed_topic, article_type or parsed_type
+        ctx.notify(f"正在生成关于{topic}的{article_type}，请稍候...")
+        success, msg = write_document(topic, article_type)
+        if success:
+            return f"文档创建成功，{article_type}已保存到documents文件夹"
+        return msg
+    
+    # ============ ADB手机控制类指令（连接检查由注册表统一完成）============
+    def cmd_phone_open_app(self, ctx, app_name):
+        success, msg = self.adb.open_app(app_name)
+        return msg
+    
+    def cmd_phone_close_app(self, ctx, app_name):
+        success, msg = self.adb.close_app(app_name)
+        return msg
+    
+    def cmd_phone_screenshot(self, ctx):
+        success, msg = self.adb.take_screenshot()
+        return f"手机截图已保存到{msg}" if success else msg
+    
+    def cmd_phone_back(self, ctx):
+        return "已按下返回键" if self.adb.press_back() else "返回键操作失败"
+    
+    def cmd_phone_home(self, ctx):
+        return "已返回主页" if self.adb.press_home() else "主页键操作失败"
+    
+    def cmd_phone_unlock(self, ctx):
+        return "已点亮并解锁屏幕" if self.adb.unlock_screen() else "亮屏操作失败"
+    
+    def cmd_phone_lock(self, ctx):
+        return "已锁定屏幕" if self.adb.lock_screen() else "锁屏操作失败"
+    
+    def cmd_phone_volume(self, ctx, direction):
+        if direction == "up":
+            return "已增加音量" if self.adb.volume_up() else "音量调节失败"
+        return "已减少音量" if self.adb.volume_down() else "音量调节失败"
+    
+    def cmd_phone_swipe_up(self, ctx):
+        return "已向上滑动" if self.adb.swipe("up") else "滑动操作失败"
+    
+    def cmd_phone_swipe_down(self, ctx):
+        return "已向下滑动" if self.adb.swipe("down") else "滑动操作失败"
+    
+    def cmd_phone_reboot(self, ctx):
+        return "手机正在重启" if self.adb.reboot() else "重启操作失败"
+    
+    def cmd_phone_status(self, ctx):
+        # 检查手机状态（其他具体手机指令都没匹配时的兜底）
+        if not self.adb.check_device_connected():
+            return "未检测到手机连接，请确保USB调试已开启并连接手机"
+        info = self.adb.get_device_info()
+        if info:
+            return f"手机已连接，型号{info.get('model', '未知')}，安卓版本{info.get('android_version', '未知')}，电量{info.get('battery', '未知')}%"
+        return "手机已连接"
+    
+    # ============ 系统控制类指令 ============
+    def cmd_exit(self, ctx):
+        self.running = False
+        return "好的，再见！系统即将关闭"
+    
+    def cmd_help(self, ctx):
+        return "我可以：播放B站视频、淘宝搜索商品、微信发消息、播放音乐、总结翻译屏幕内容、创建Word文档。还可以控制手机，如打开手机微信、手机截图等。说检查手机可查看连接状态"
     
     def run(self, use_wake_word=True):
         """
@@ -1128,10 +1247,14 @@ class VoiceInteractionSystem:
             print("系统初始化失败，请检查网络和API配置！")
             return
         
+        # 预热大模型连接（后台进行，不阻塞启动）
+        self.warm_up()
+        
         # 检查ADB和手机连接
         print("\n[初始化] 检查ADB环境...")
         if self.adb.check_adb_installed():
             print("[初始化] ADB已安装")
+            self.adb.start_watcher()
             if self.adb.check_device_connected():
                 print(f"[初始化] 手机已连接: {self.adb.device_name}")
             else:
@@ -1150,14 +1273,14 @@ class VoiceInteractionSystem:
         
         # 欢迎语
         if use_wake_word and self.wake_word_enabled:
-            welcome = "欢迎使用智能语音助手，说小蓝唤醒我"
+            welcome = f"欢迎使用智能语音助手，说{self.wake_word_names}唤醒我"
         else:
             welcome = "欢迎使用智能语音助手，按回车键开始对话"
         self.text_to_speech(welcome)
         
         print("\n" + "=" * 50)
         if use_wake_word and self.wake_word_enabled:
-            print("系统已就绪！说'小蓝'唤醒，按Ctrl+C退出")
+            print(f"系统已就绪！说'{self.wake_word_names}'唤醒，按Ctrl+C退出")
         else:
             print("系统已就绪！按Enter键开始录音，输入q退出")
         print("=" * 50)
@@ -1172,103 +1295,59 @@ class VoiceInteractionSystem:
         print("示例：'播放周杰伦的稻香'、'帮我在B站找个搞笑视频'")
         print("=" * 50)
         
-        # 根据模式选择运行方式
-        if use_wake_word and self.wake_word_enabled:
-            self._run_wake_word_mode()
-        else:
-            self._run_keyboard_mode()
+        # 根据模式选择触发方式，一轮对话的各阶段由对话引擎调度
+        engine = ConversationEngine(self)
+        engine.run(trigger="wake" if use_wake_word and self.wake_word_enabled else "keyboard")
         
         # 清理资源
         self.cleanup()
         self.cleanup_wake_word()
         print("\n系统已退出，感谢使用！")
     
-    def _run_wake_word_mode(self):
-        """语音唤醒模式主循环"""
-        while self.running:
-            try:
-                # 等待唤醒词
-                if not self.wait_for_wake_word():
-                    continue
-                
-                # 播放提示音或提示语
-                self.text_to_speech("我在")
-                
-                # 录音
-                audio_file = self.record_audio()
-                
-                # 语音识别
-                text = self.speech_to_text(audio_file)
-                
-                if text:
-                    # 处理指令
-                    self._process_and_respond(text)
-                else:
-                    self.text_to_speech("抱歉，没有听清，请再说一遍")
-                    
-            except KeyboardInterrupt:
-                print("\n\n系统被用户中断")
-                break
-            except Exception as e:
-                print(f"[错误] {str(e)}")
-                continue
-    
-    def _run_keyboard_mode(self):
-        """按键模式主循环"""
-        while self.running:
-            try:
-                user_input = input("\n按Enter开始录音 (输入q退出): ")
-                if user_input.lower() == 'q':
-                    break
-                
-                # 录音
-                audio_file = self.record_audio()
-                
-                # 语音识别
-                text = self.speech_to_text(audio_file)
-                
-                if text:
-                    # 处理指令
-                    self._process_and_respond(text)
-                else:
-                    self.text_to_speech("抱歉，没有识别到有效语音，请重试")
-                    
-            except KeyboardInterrupt:
-                print("\n\n系统被用户中断")
-                break
-            except Exception as e:
-                print(f"[错误] {str(e)}")
-                continue
-    
-    def _process_and_respond(self, text):
-        """处理用户输入并响应"""
-        # 通过LLM进行指令修正和意图识别
-        print(f"[LLM] 正在分析指令...")
-        is_instruction, processed_result = process_query(text)
-        
-        if is_instruction:
-            # 是指令类，执行标准化后的指令
-            print(f"[LLM] 标准化指令: {processed_result}")
-            result = self.execute_command(processed_result)
-        else:
-            # 是闲谈类，直接使用LLM的回复
-            print(f"[LLM] 闲谈回复")
-            result = processed_result
-        
-        print(f"[结果] {result}")
-        
-        # 语音播报结果
-        self.text_to_speech(result)
+    def start_barge_in(self, on_barge_in=None):
+        """
+        启动播报期间的唤醒词监听（唤醒可用时）
+        :param on_barge_in: 检测到唤醒词时的回调 on_barge_in(WakeKeyword)，默认只停止播报
+        :return: BargeInMonitor，唤醒不可用返回None
+        """
+        if not BARGE_IN_ENABLED or not self.wake_word_enabled or not self.wake_engine:
+            return None
+        capture = self.get_capture()
+        if not capture:
+            return None
+        on_barge_in = on_barge_in or (lambda keyword: self.stop_speaking())
+        return BargeInMonitor(capture, self.wake_engine, on_barge_in, player=self.player).start()
     
     def cleanup(self):
         """清理临时文件"""
+        self.token_manager.stop()
+        http_pool.print_stats()
+        intent_stats = get_intent_stats()
+        if intent_stats["total"]:
+            print(f"[快速匹配] 本地命中率 {intent_stats['hit_rate']:.0%}"
+                  f"（{intent_stats['total'] - intent_stats['fallback']}/{intent_stats['total']}）")
+        command_stats = get_registry().get_stats()
+        if command_stats["resolved"] + command_stats["unknown"]:
+            print(f"[执行] 指令解析 {command_stats['resolved']}条，未识别 {command_stats['unknown']}条，"
+                  f"平均解析 {command_stats['avg_resolve_ms']:.3f}ms")
+        cache_stats = get_query_cache().get_stats()
+        if cache_stats["hits"] + cache_stats["near_hits"] + cache_stats["misses"]:
+            print(f"[缓存] 命中率 {cache_stats['hit_rate']:.0%}（精确{cache_stats['hits']}，"
+                  f"近似{cache_stats['near_hits']}，未命中{cache_stats['misses']}）")
+        tts_stats = get_tts_cache().get_stats()
+        if tts_stats["hits"] + tts_stats["misses"]:
+            print(f"[播报] 合成缓存命中率 {tts_stats['hit_rate']:.0%}（{tts_stats['hits']}/{tts_stats['hits'] + tts_stats['misses']}）")
+        if self.adb.watcher and self.adb.watcher.stats["cache_hits"] + self.adb.watcher.stats["queries"]:
+            device_stats = self.adb.watcher.stats
+            print(f"[手机] 状态缓存命中 {device_stats['cache_hits']}次，查询手机 {device_stats['queries']}次")
+        self.adb.close()
+        if self.capture:
+            self.capture.stop()
+            self.capture = None
         try:
+            self.player.close()
             pygame.mixer.quit()
             time.sleep(0.5)
-            if os.path.exists(AUDIO_FILE):
-                os.remove(AUDIO_FILE)
-            if os.path.exists(TTS_OUTPUT):
-                os.remove(TTS_OUTPUT)
         except:
             pass
 
@@ -1278,7 +1357,7 @@ if __name__ == "__main__":
     
     # 选择运行模式
     print("\n请选择运行模式：")
-    print("1. 语音唤醒模式（说'小蓝'唤醒）")
+    print(f"1. 语音唤醒模式（说'{system.wake_word_names}'唤醒）")
     print("2. 按键模式（按Enter开始录音）")
     
     choice = input("请输入选项 (1/2，默认1): ").strip()
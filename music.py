@@ -7,7 +7,7 @@
 import os
 import time
 import webbrowser
-import requests
+import http_pool
 
 # 网易云音乐API
 NETEASE_SEARCH_URL = "https://music.163.com/api/search/get/web"
@@ -42,7 +42,7 @@ class NeteasePlayer:
                 'limit': limit
             }
             
-            response = requests.post(NETEASE_SEARCH_URL, headers=headers, data=params, timeout=10)
+            response = http_pool.post(NETEASE_SEARCH_URL, headers=headers, data=params, timeout=10)
             data = response.json()
             
             if data.get('code') == 200 and data.get('result', {}).get('songs'):
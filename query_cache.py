@@ -0,0 +1,192 @@
+# coding=utf-8
+"""
+意图识别结果缓存模块
+功能：缓存大模型对用户输入的识别结果，重复的请求直接返回，不再请求大模型
+支持：输入归一化（去标点、去口语词）、LRU淘汰 + 过期时间、字符n-gram近似匹配、本地持久化、命中统计
+说明：指令类结果长期有效；闲谈类回复只短期缓存（内容可能过时）
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from intent_matcher import normalize
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".query_cache.json")
+
+MAX_ENTRIES = 500                 # 最多缓存条数
+INSTRUCTION_TTL = 7 * 24 * 3600   # 指令类结果有效期（秒）
+CHAT_TTL = 300                    # 闲谈类回复有效期（秒），0表示不缓存闲谈
+
+# 近似匹配：字符二元组 Jaccard 相似度阈值（只用于不带参数的指令）
+NGRAM_SIZE = 2
+SIMILARITY_THRESHOLD = 0.85
+
+
+def char_ngrams(text, n=NGRAM_SIZE):
+    """字符n-gram集合"""
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def allows_near_match(result):
+    """
+    识别结果是否允许近似匹配
+    只有不带参数的指令（查询时间/日期、打开记事本、音乐控制等）才允许；
+    参数取自用户原话的指令（微信消息内容、搜索关键词等）差一个字意思就不同，必须精确命中
+    :param result: 标准指令文本，或结构化意图（StructuredCommand.to_dict）
+    """
+    from command_registry import get_registry, normalize_command
+    from compound_planner import split_compound
+
+    registry = get_registry()
+    if isinstance(result, dict):
+        commands = result.get("commands") or []
+        specs = [registry.get(item.get("intent")) if isinstance(item, dict) else None for item in commands]
+    else:
+        specs = [registry.resolve(part)[0] for part in split_compound(normalize_command(str(result)), registry)]
+    return bool(specs) and all(spec is not None and not spec.slots for spec in specs)
+
+
+class QueryCache:
+    """意图识别结果缓存"""
+
+    def __init__(self, cache_file=CACHE_FILE, max_entries=MAX_ENTRIES,
+                 instruction_ttl=INSTRUCTION_TTL, chat_ttl=CHAT_TTL):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.instruction_ttl = instruction_ttl
+        self.chat_ttl = chat_ttl
+
+        self.entries = OrderedDict()  # 归一化文本 -> {"is_instruction", "result", "expires_at", "fuzzy"}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "near_hits": 0, "misses": 0, "evictions": 0}
+        self._load()
+
+    def _load(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        now = time.time()
+        for key, entry in data.items():
+            if entry.get("expires_at", 0) > now:
+                self.entries[key] = entry
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"[缓存] 保存失败: {str(e)}")
+
+    def get(self, query):
+        """
+        查询缓存
+        :return: (is_instruction, result)，未命中返回None
+        """
+        key = normalize(query or "")
+        if not key:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry and entry["expires_at"] <= now:
+                del self.entries[key]
+                entry = None
+            if entry:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry["is_instruction"], entry["result"]
+
+            # 近似匹配（仅不带参数的指令，见 allows_near_match）
+            grams = char_ngrams(key)
+            best_key, best_score = None, 0.0
+            for other, other_entry in self.entries.items():
+                if not other_entry.get("fuzzy") or other_entry["expires_at"] <= now:
+                    continue
+                score = jaccard(grams, char_ngrams(other))
+                if score > best_score:
+                    best_key, best_score = other, score
+            if best_key and best_score >= SIMILARITY_THRESHOLD:
+                entry = self.entries[best_key]
+                self.entries.move_to_end(best_key)
+                self.stats["near_hits"] += 1
+                return entry["is_instruction"], entry["result"]
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, query, is_instruction, result):
+        """写入缓存"""
+        key = normalize(query or "")
+        ttl = self.instruction_ttl if is_instruction else self.chat_ttl
+        if not key or not result or ttl <= 0:
+            return
+        fuzzy = is_instruction and allows_near_match(result)
+        with self._lock:
+            self.entries[key] = {
+                "is_instruction": is_instruction,
+                "result": result,
+                "expires_at": time.time() + ttl,
+                "fuzzy": fuzzy
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self._save()
+
+    def get_stats(self):
+        """命中统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self.entries)
+        total = stats["hits"] + stats["near_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["near_hits"]) / total if total else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """获取全局缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = QueryCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    cache = QueryCache(cache_file=None)
+    cache.put("打开B站播放猫咪视频", True, "打开B站播放猫咪视频")
+    cache.put("帮我总结一下当前屏幕", True, "总结当前内容")
+    cache.put("微信告诉老妈我今天晚上回家吃饭", True, "打开微信发我今天晚上回家吃饭信息给老妈")
+    cache.put("你好", False, "你好！有什么可以帮你的吗？")
+
+    for text in ["打开B站播放猫咪视频。", "总结当前屏幕吧", "打开B站播放猫咪的视频", "打开B站播放狗狗视频",
+                 "微信告诉老妈我今天晚上不回家吃饭", "你好"]:
+        print(f"  {text} -> {cache.get(text)}")
+    print(cache.get_stats())
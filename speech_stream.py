@@ -0,0 +1,145 @@
+# coding=utf-8
+"""
+流式播报模块
+功能：大模型边生成边切句，每凑满一句就立即送去合成并播放，不必等完整回复
+支持：增量切句（按句末标点，过长时按逗号切）、通过合成流水线边合成边播放、首句延迟统计
+"""
+
+import time
+import threading
+
+from tts_pipeline import TTSPipeline, TTS_LOOKAHEAD, format_stats
+
+# 主要切分点：句末标点
+SENTENCE_ENDINGS = '。！？；;!?\n'
+# 次要切分点：句子过长时按逗号切分
+CLAUSE_ENDINGS = '，,、'
+# 超过该长度时遇到逗号即切分
+MAX_SENTENCE_LEN = 30
+# 切出的片段最短长度（太短的片段合成开销大，并入下一句）
+MIN_SENTENCE_LEN = 2
+
+
+class SentenceSplitter:
+    """增量切句器：逐段喂入文本，返回已经完整的句子"""
+
+    def __init__(self, max_len=MAX_SENTENCE_LEN, min_len=MIN_SENTENCE_LEN):
+        self.max_len = max_len
+        self.min_len = min_len
+        self._buffer = ""
+
+    def feed(self, text):
+        """
+        喂入新生成的文本
+        :return: 本次切出的完整句子列表
+        """
+        sentences = []
+        for char in text or "":
+            self._buffer += char
+            if char in SENTENCE_ENDINGS or (char in CLAUSE_ENDINGS and len(self._buffer) > self.max_len):
+                sentence = self._buffer.strip()
+                if len(sentence.strip(SENTENCE_ENDINGS + CLAUSE_ENDINGS)) >= self.min_len:
+                    sentences.append(sentence)
+                    self._buffer = ""
+                elif not sentence:
+                    self._buffer = ""
+        return sentences
+
+    def flush(self):
+        """
+        结束输入，返回剩余文本
+        :return: 剩余句子列表（可能为空）
+        """
+        sentence = self._buffer.strip()
+        self._buffer = ""
+        return [sentence] if sentence.strip(SENTENCE_ENDINGS + CLAUSE_ENDINGS) else []
+
+
+class SpeechStream:
+    """
+    流式播报：切出的句子立即送入合成流水线，播放线程按顺序播放
+    """
+
+    def __init__(self, synthesize, play, lookahead=TTS_LOOKAHEAD):
+        """
+        :param synthesize: 合成函数 synthesize(文字) -> 音频数据(bytes)，失败返回None
+        :param play: 播放函数 play(音频数据)，播放完成后返回
+        :param lookahead: 预合成深度
+        """
+        self.pipeline = TTSPipeline(synthesize, play, lookahead=lookahead)
+        self._splitter = SentenceSplitter()
+        self._closed = False
+        self.stats = None
+
+        self._play_thread = threading.Thread(target=self._play_loop, daemon=True)
+        self._play_thread.start()
+
+    @property
+    def spoken(self):
+        """已播放的句数"""
+        return self.pipeline.stats["played"]
+
+    @property
+    def first_audio_ms(self):
+        """第一句开始播放的时间（距创建，毫秒）"""
+        return self.pipeline.stats["first_audio_ms"]
+
+    def feed_text(self, text):
+        """喂入增量文本，切出完整句子后立即送去合成"""
+        for sentence in self._splitter.feed(text):
+            self.feed(sentence)
+
+    def feed(self, sentence):
+        """送入一个完整句子"""
+        if self._closed or not sentence:
+            return
+        self.pipeline.submit(sentence)
+
+    def close(self):
+        """输入结束（剩余未成句的文本作为最后一句）"""
+        if self._closed:
+            return
+        for sentence in self._splitter.flush():
+            self.pipeline.submit(sentence)
+        self._closed = True
+        self.pipeline.close()
+
+    def cancel(self):
+        """停止播报（未播放的句子全部丢弃）"""
+        self._closed = True
+        self.pipeline.cancel()
+
+    def wait(self, timeout=None):
+        """
+        等待全部播放完成
+        :return: 是否在超时前完成
+        """
+        self.close()
+        self._play_thread.join(timeout)
+        return not self._play_thread.is_alive()
+
+    def finish(self):
+        """
+        等待全部播放完成
+        :return: 是否播报过内容（未播报时调用方需自行播报完整结果）
+        """
+        self.wait()
+        return self.spoken > 0
+
+    def _play_loop(self):
+        self.stats = self.pipeline.run()
+        if self.stats["played"]:
+            print(f"[播报] 流式播报完成：{format_stats(self.stats)}")
+
+
+if __name__ == "__main__":
+    # 模拟大模型逐字输出，观察切句时机
+    reply = "你好！我是你的智能语音助手，不过我暂时无法查询天气信息。我可以帮你控制电脑程序、手机应用、播放视频、搜索商品等，有什么需要帮忙的吗？"
+    splitter = SentenceSplitter()
+    start = time.time()
+    for i in range(0, len(reply), 3):
+        time.sleep(0.02)
+        for sentence in splitter.feed(reply[i:i + 3]):
+            print(f"  {(time.time() - start) * 1000:5.0f}ms  {sentence}")
+    for sentence in splitter.flush():
+        print(f"  {(time.time() - start) * 1000:5.0f}ms  {sentence}（结尾）")
@@ -0,0 +1,405 @@
+# coding=utf-8
+"""
+流式语音识别模块
+功能：边录音边上传音频，实时返回中间结果，说完话后很快拿到最终结果
+支持：百度实时语音识别（WebSocket）、本地分帧协议后端、离线模拟ASR服务（用于测试）
+
+消息格式与百度实时语音识别保持一致：
+  客户端 -> 服务端：{"type": "START", "data": {...}}、二进制音频帧、{"type": "FINISH"}
+  服务端 -> 客户端：{"type": "MID_TEXT", "result": "..."}、{"type": "FIN_TEXT", "result": "...", "err_no": 0}
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import socket
+import struct
+import threading
+import socketserver
+
+# 尝试加载 .env
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+# 百度实时语音识别配置
+BAIDU_APP_ID = os.getenv("BAIDU_APP_ID", "")
+BAIDU_API_KEY = os.getenv("BAIDU_API_KEY", "")
+BAIDU_REALTIME_URL = os.getenv("BAIDU_REALTIME_ASR_URL", "wss://vop.baidu.com/realtime_asr")
+BAIDU_DEV_PID = 15372  # 普通话（加强标点）
+
+# 后端选择："baidu" 百度实时识别，"socket" 本地分帧协议（如模拟服务）
+STREAM_BACKEND = os.getenv("ASR_STREAM_BACKEND", "baidu")
+STREAM_ADDR = os.getenv("ASR_STREAM_ADDR", "127.0.0.1:8765")
+
+# 每次发送的音频大小：160ms（16000Hz * 2字节 * 0.16秒）
+SEND_CHUNK_BYTES = 5120
+
+# 分帧协议的帧类型
+FRAME_TEXT = b'T'
+FRAME_BINARY = b'B'
+
+
+# ==================== 后端 ====================
+
+class StreamingASRBackend:
+    """流式识别后端基类"""
+
+    def connect(self, sample_rate):
+        """建立连接并发送开始帧"""
+        raise NotImplementedError
+
+    def send_audio(self, pcm):
+        """发送一段PCM音频"""
+        raise NotImplementedError
+
+    def finish(self):
+        """发送结束帧"""
+        raise NotImplementedError
+
+    def recv(self):
+        """
+        接收一条识别结果
+        :return: 结果字典，连接关闭返回None
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """关闭连接"""
+        pass
+
+
+def _send_frame(sock, frame_type, payload):
+    sock.sendall(frame_type + struct.pack(">I", len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _recv_frame(sock):
+    """读取一帧，返回(类型, 负载)，连接关闭返回(None, None)"""
+    header = _recv_exact(sock, 5)
+    if header is None:
+        return None, None
+    length = struct.unpack(">I", header[1:])[0]
+    payload = _recv_exact(sock, length) if length else b''
+    if payload is None:
+        return None, None
+    return header[:1], payload
+
+
+class SocketASRBackend(StreamingASRBackend):
+    """本地分帧协议后端：1字节类型 + 4字节长度 + 负载，走普通TCP连接"""
+
+    def __init__(self, host="127.0.0.1", port=8765, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+
+    def connect(self, sample_rate):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        start = {"type": "START", "data": {"format": "pcm", "sample": sample_rate}}
+        _send_frame(self.sock, FRAME_TEXT, json.dumps(start).encode("utf-8"))
+
+    def send_audio(self, pcm):
+        _send_frame(self.sock, FRAME_BINARY, pcm)
+
+    def finish(self):
+        _send_frame(self.sock, FRAME_TEXT, json.dumps({"type": "FINISH"}).encode("utf-8"))
+
+    def recv(self):
+        try:
+            frame_type, payload = _recv_frame(self.sock)
+        except (socket.timeout, OSError):
+            return None
+        if frame_type != FRAME_TEXT:
+            return None
+        return json.loads(payload.decode("utf-8"))
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+
+class BaiduRealtimeASRBackend(StreamingASRBackend):
+    """百度实时语音识别后端（需要 pip install websocket-client）"""
+
+    def __init__(self, app_id=BAIDU_APP_ID, app_key=BAIDU_API_KEY,
+                 url=BAIDU_REALTIME_URL, dev_pid=BAIDU_DEV_PID, timeout=10):
+        self.app_id = app_id
+        self.app_key = app_key
+        self.url = url
+        self.dev_pid = dev_pid
+        self.timeout = timeout
+        self.ws = None
+
+    def connect(self, sample_rate):
+        import websocket
+        self.ws = websocket.create_connection(f"{self.url}?sn={uuid.uuid4()}", timeout=self.timeout)
+        start = {
+            "type": "START",
+            "data": {
+                "appid": int(self.app_id) if str(self.app_id).isdigit() else self.app_id,
+                "appkey": self.app_key,
+                "dev_pid": self.dev_pid,
+                "cuid": "VoiceInteractionSystem",
+                "format": "pcm",
+                "sample": sample_rate
+            }
+        }
+        self.ws.send(json.dumps(start))
+
+    def send_audio(self, pcm):
+        import websocket
+        self.ws.send(pcm, opcode=websocket.ABNF.OPCODE_BINARY)
+
+    def finish(self):
+        self.ws.send(json.dumps({"type": "FINISH"}))
+
+    def recv(self):
+        try:
+            message = self.ws.recv()
+        except Exception:
+            return None
+        if not message:
+            return None
+        return json.loads(message)
+
+    def close(self):
+        if self.ws:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+            self.ws = None
+
+
+def create_backend(name=STREAM_BACKEND):
+    """根据配置创建识别后端"""
+    if name == "socket":
+        host, _, port = STREAM_ADDR.partition(":")
+        return SocketASRBackend(host, int(port or 8765))
+    return BaiduRealtimeASRBackend()
+
+
+# ==================== 识别器 ====================
+
+class StreamingRecognizer:
+    """流式识别器：feed() 随录音推送音频，finish() 获取最终结果"""
+
+    def __init__(self, backend=None, sample_rate=16000, on_partial=None):
+        """
+        :param backend: 识别后端，默认按配置创建
+        :param sample_rate: 采样率
+        :param on_partial: 中间结果回调 on_partial(text)
+        """
+        self.backend = backend or create_backend()
+        self.sample_rate = sample_rate
+        self.on_partial = on_partial
+        self.results = queue.Queue()  # (is_final, text)
+        self.error = None
+        self.failed = False   # 上传中断：本次录音不再上传，由调用方改用整段识别
+        self._buffer = b''
+        self._finals = []
+        self._reader = None
+        self._done = threading.Event()
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        """连接识别服务"""
+        self.started_at = time.time()
+        self.backend.connect(self.sample_rate)
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        """后台线程：接收识别结果"""
+        try:
+            while True:
+                message = self.backend.recv()
+                if message is None:
+                    break
+                if message.get("err_no", 0) != 0:
+                    self.error = message.get("err_msg", "识别失败")
+                    break
+                text = message.get("result", "")
+                if message.get("type") == "MID_TEXT":
+                    self.results.put((False, text))
+                    if self.on_partial:
+                        self.on_partial("".join(self._finals) + text)
+                elif message.get("type") == "FIN_TEXT":
+                    self._finals.append(text)
+                    self.results.put((True, text))
+        finally:
+            self._done.set()
+            self.results.put(None)
+
+    def feed(self, pcm):
+        """推送一段音频，凑够一个发送块后立即上传（上传出错不影响录音，本次录音不再上传）"""
+        if self.failed:
+            return
+        self._buffer += pcm
+        try:
+            while len(self._buffer) >= SEND_CHUNK_BYTES:
+                self.backend.send_audio(self._buffer[:SEND_CHUNK_BYTES])
+                self._buffer = self._buffer[SEND_CHUNK_BYTES:]
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, error):
+        self.failed = True
+        self.error = f"上传中断: {str(error)}"
+        self._buffer = b''
+        print(f"\n[识别] 流式上传中断，录音完成后改用整段识别: {str(error)}")
+        self.backend.close()
+
+    def finish(self, timeout=5):
+        """
+        结束上传并等待最终结果
+        :param timeout: 等待最终结果的超时时间（秒）
+        :return: 识别文本，失败返回None
+        """
+        if self.failed:
+            self.finished_at = time.time()
+            return None
+        try:
+            if self._buffer:
+                self.backend.send_audio(self._buffer)
+                self._buffer = b''
+            self.backend.finish()
+            self._done.wait(timeout)
+        except Exception as e:
+            self.failed = True
+            self.error = f"上传中断: {str(e)}"
+        finally:
+            self.finished_at = time.time()
+            self.backend.close()
+
+        if self.error:
+            print(f"[识别] 流式识别失败: {self.error}")
+            return None
+        text = "".join(self._finals).strip()
+        return text or None
+
+    def iter_results(self):
+        """逐条产出识别结果 (is_final, text)，直到识别结束"""
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            yield item
+
+
+# ==================== 离线模拟ASR服务 ====================
+
+class _MockASRHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        transcript = server.transcript
+        received = 0
+        sent_chars = 0
+        while True:
+            frame_type, payload = _recv_frame(self.request)
+            if frame_type is None:
+                break
+            if frame_type == FRAME_BINARY:
+                received += len(payload)
+                server.bytes_received += len(payload)
+                # 每收到约0.5秒音频返回一次中间结果，文字逐步变长
+                chars = min(len(transcript), received // server.bytes_per_char)
+                if chars > sent_chars:
+                    sent_chars = chars
+                    self._send({"type": "MID_TEXT", "err_no": 0, "result": transcript[:chars]})
+                continue
+
+            message = json.loads(payload.decode("utf-8"))
+            if message.get("type") == "FINISH":
+                if server.decode_delay:
+                    time.sleep(server.decode_delay)
+                self._send({"type": "FIN_TEXT", "err_no": 0, "result": transcript})
+                break
+
+    def _send(self, message):
+        _send_frame(self.request, FRAME_TEXT, json.dumps(message, ensure_ascii=False).encode("utf-8"))
+
+
+class MockASRServer(socketserver.ThreadingTCPServer):
+    """本地模拟ASR服务，按收到的音频量逐步返回预设文本"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, transcript="现在几点了", host="127.0.0.1", port=0,
+                 bytes_per_char=16000, decode_delay=0.05):
+        """
+        :param transcript: 最终返回的识别文本
+        :param port: 监听端口，0表示自动分配
+        :param bytes_per_char: 每收到多少字节音频多返回一个字的中间结果
+        :param decode_delay: 收到结束帧后模拟的解码耗时（秒）
+        """
+        super().__init__((host, port), _MockASRHandler)
+        self.transcript = transcript
+        self.bytes_per_char = bytes_per_char
+        self.decode_delay = decode_delay
+        self.bytes_received = 0
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    # 离线测试：启动模拟服务，按实时速度推送音频
+    server = MockASRServer(transcript="帮我打开记事本").start()
+    print(f"模拟ASR服务已启动: 127.0.0.1:{server.port}")
+
+    test_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_data", "纯净人声测试.mp3")
+    try:
+        from vad import load_pcm_file
+        pcm = load_pcm_file(sys.argv[1] if len(sys.argv) > 1 else test_file)
+    except Exception as e:
+        print(f"读取测试音频失败（{e}），使用2秒静音代替")
+        pcm = b'\x00\x00' * 16000 * 2
+
+    recognizer = StreamingRecognizer(
+        SocketASRBackend("127.0.0.1", server.port),
+        on_partial=lambda text: print(f"  中间结果: {text}")
+    )
+    recognizer.start()
+    frame = 1024  # 512采样，32ms
+    for offset in range(0, len(pcm), frame):
+        recognizer.feed(pcm[offset:offset + frame])
+        time.sleep(0.032)
+    speech_end = time.time()
+    text = recognizer.finish()
+    print(f"最终结果: {text}")
+    print(f"说话结束到拿到结果: {(time.time() - speech_end) * 1000:.0f}ms")
+    server.stop()
@@ -0,0 +1,235 @@
+# coding=utf-8
+"""
+语音合成缓存模块
+功能：按 (文字, 发音人, 语速, 音调, 音量, 格式) 缓存合成好的音频，固定提示语不再重复请求TTS接口
+支持：内容寻址的本地文件缓存、按总大小的LRU淘汰、命中统计、启动时后台预合成固定提示语
+"""
+
+import os
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tts_cache")
+
+# 缓存总大小上限（字节）
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+
+# 超过该长度的文字不缓存（多为动态内容，复用概率低）
+MAX_TEXT_LEN = 80
+
+# 固定提示语首次合成即写入缓存；其他文字（如闲谈回复）请求到这么多次才写入，一次性内容不落盘
+MIN_REQUESTS = 2
+MAX_TRACKED_REQUESTS = 2000  # 请求次数最多记录的文字条数
+
+# 扫描固定提示语的源码文件（指令回复在 command_registry 和 main 的处理方法中，对话流程提示在 conversation_engine）
+PHRASE_SOURCES = ("main.py", "command_registry.py", "conversation_engine.py")
+
+
+def cache_key(text, per, spd, pit, vol, aue):
+    """缓存键：合成参数的哈希"""
+    raw = "\x1f".join(str(v) for v in (text, per, spd, pit, vol, aue))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """合成音频缓存"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, min_requests=MIN_REQUESTS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.min_requests = min_requests
+        self.entries = OrderedDict()  # 缓存键 -> 文件大小，按最近使用排序
+        self.total_bytes = 0
+        self._pinned = set()           # 固定提示语的缓存键
+        self._requests = OrderedDict()  # 未命中的缓存键 -> 请求次数
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._load()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _load(self):
+        """扫描缓存目录，按最后使用时间恢复LRU顺序"""
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return
+        files = []
+        for name in names:
+            if not name.endswith(".mp3"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            files.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def get(self, key):
+        """
+        读取缓存
+        :return: 音频数据(bytes)，未命中返回None
+        """
+        with self._lock:
+            if key not in self.entries:
+                self.stats["misses"] += 1
+                self._requests[key] = self._requests.pop(key, 0) + 1
+                while len(self._requests) > MAX_TRACKED_REQUESTS:
+                    self._requests.popitem(last=False)
+                return None
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                os.utime(self._path(key))  # 更新最后使用时间，重启后保持LRU顺序
+            except OSError:
+                self.total_bytes -= self.entries.pop(key)
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return data
+
+    def pin(self, keys):
+        """登记固定提示语：首次合成即写入缓存"""
+        with self._lock:
+            self._pinned.update(keys)
+
+    def should_store(self, key):
+        """固定提示语，或请求过至少 min_requests 次的文字才写入缓存"""
+        with self._lock:
+            return key in self._pinned or self._requests.get(key, 0) >= self.min_requests
+
+    def put(self, key, data):
+        """写入缓存（只写入 should_store 允许的）"""
+        if not data or len(data) > self.max_bytes or not self.should_store(key):
+            return
+        with self._lock:
+            self._requests.pop(key, None)
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = self._path(key) + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                print(f"[播报] 写入合成缓存失败: {str(e)}")
+                return
+            self.total_bytes += len(data) - self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                self.stats["evictions"] += 1
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.entries
+
+    def get_stats(self):
+        """命中统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self.entries)
+            stats["bytes"] = self.total_bytes
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
+
+
+def find_fixed_phrases(source_files=PHRASE_SOURCES, speak_methods=("text_to_speech", "notify"), result_name="result"):
+    """
+    从源码中找出固定的播报内容（用于预合成）
+    包括：赋值给 result 的字符串常量、直接传给 text_to_speech/notify 的字符串常量、函数返回的字符串常量
+    （含条件表达式的两个分支）、模块级 *_TEXT 常量、指令表中的 prompt= 提示语
+    f-string、带 {占位符} 的模板等动态内容以及纯ASCII的标识符不计入
+    :param source_files: 源码文件（单个路径或路径列表），相对路径相对本模块所在目录
+    :return: 去重后的短语列表（按出现顺序）
+    """
+    if isinstance(source_files, str):
+        source_files = [source_files]
+
+    def constant_strs(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return [node.value]
+        if isinstance(node, ast.IfExp):
+            return constant_strs(node.body) + constant_strs(node.orelse)
+        return []
+
+    phrases = []
+    for source_file in source_files:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), source_file)
+        with open(path, mode='r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+
+        for node in ast.walk(tree):
+            values = []
+            if isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name) and (target.id == result_name or target.id.endswith("_TEXT")):
+                        values = constant_strs(node.value)
+            elif isinstance(node, ast.Return) and node.value is not None:
+                values = constant_strs(node.value)
+            elif isinstance(node, ast.Call):
+                if isinstance(node.func, ast.Attribute) and node.func.attr in speak_methods and node.args:
+                    values = constant_strs(node.args[0])
+                values += [v for kw in node.keywords if kw.arg == "prompt" for v in constant_strs(kw.value)]
+            for value in values:
+                # 纯ASCII的是阶段名、字典键等标识符，不是播报内容
+                if (value.strip() and not value.isascii() and "{" not in value
+                        and len(value) <= MAX_TEXT_LEN and value not in phrases):
+                    phrases.append(value)
+    return phrases
+
+
+def prewarm(texts, synthesize, background=True):
+    """
+    预合成（synthesize 会把结果写入缓存，已缓存的不会再请求接口；调用前先用 pin 登记这些文字）
+    :param texts: 文字列表
+    :param synthesize: 带缓存的合成函数 synthesize(文字) -> 音频数据
+    :param background: 是否在后台线程执行
+    """
+    def run():
+        done = 0
+        for text in texts:
+            if synthesize(text):
+                done += 1
+        print(f"[播报] 固定提示语预合成完成（{done}/{len(texts)}）")
+
+    if background:
+        threading.Thread(target=run, daemon=True).start()
+    else:
+        run()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """获取全局合成缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTSCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    phrases = find_fixed_phrases()
+    print(f"{'、'.join(PHRASE_SOURCES)} 中共找到 {len(phrases)} 条固定提示语：")
+    for phrase in phrases:
+        print(f"  {phrase}")
+
+    cache = get_cache()
+    cached = sum(1 for p in phrases if cache_key(p, 4194, 5, 5, 5, 3) in cache)
+    stats = cache.get_stats()
+    print(f"已缓存 {cached}/{len(phrases)} 条（缓存共 {stats['size']} 条，{stats['bytes'] / 1024:.0f}KB）")
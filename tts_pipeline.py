@@ -0,0 +1,225 @@
+# coding=utf-8
+"""
+语音合成流水线模块
+功能：多段文字按顺序播放，同时在共享线程池里提前合成后面的若干段，音频只保存在内存中
+支持：可配置预合成深度、按顺序播放、单段合成失败自动跳过、段间停顿（等待合成）统计
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# 预合成深度：正在播放的段之后最多同时合成几段
+TTS_LOOKAHEAD = int(os.getenv("TTS_LOOKAHEAD", "2"))
+# 合成线程数（进程内共享）
+TTS_WORKERS = 4
+# 段间停顿超过该值（毫秒）记为一次卡顿
+GAP_THRESHOLD_MS = 50
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """获取共享的合成线程池"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+        return _executor
+
+
+class TTSPipeline:
+    """
+    合成/播放流水线
+    用法一（整段文字已知）：pipeline.speak(句子列表)
+    用法二（边生成边播报）：其他线程调用 submit()/close()，播放线程调用 run()
+    """
+
+    def __init__(self, synthesize, play, lookahead=TTS_LOOKAHEAD, executor=None):
+        """
+        :param synthesize: 合成函数 synthesize(文字) -> 音频数据(bytes)，失败返回None
+        :param play: 播放函数 play(音频数据)，播放完成后返回；也可以只把音频加入播放队列并返回播放句柄
+        :param lookahead: 预合成深度
+        :param executor: 合成线程池，默认使用共享线程池
+        """
+        self.synthesize = synthesize
+        self.play = play
+        self.lookahead = max(1, lookahead)
+        self.executor = executor or get_executor()
+
+        self._segments = deque()  # [文字, Future或None]，按播放顺序排列
+        self._cond = threading.Condition()
+        self._closed = False
+        self._cancelled = False
+
+        self.started_at = time.time()
+        self.stats = {
+            "segments": 0,         # 送入的段数
+            "played": 0,           # 播放成功的段数
+            "failed": 0,           # 合成失败跳过的段数
+            "first_audio_ms": None,
+            "gaps_ms": [],         # 每两段之间等待合成的时间
+        }
+
+    def _synthesize(self, text):
+        try:
+            return self.synthesize(text)
+        except Exception as e:
+            print(f"[播报] 合成错误: {str(e)}")
+            return None
+
+    def _schedule(self):
+        """为队首的 lookahead 段启动合成（调用方持有锁）"""
+        for index, segment in enumerate(self._segments):
+            if index >= self.lookahead:
+                break
+            if segment[1] is None:
+                segment[1] = self.executor.submit(self._synthesize, segment[0])
+
+    def submit(self, text):
+        """追加一段文字"""
+        if not text or not text.strip():
+            return
+        with self._cond:
+            if self._closed:
+                return
+            self._segments.append([text, None])
+            self.stats["segments"] += 1
+            self._schedule()
+            self._cond.notify_all()
+
+    def close(self):
+        """不再追加文字"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def cancel(self):
+        """取消未播放的段（用于打断）"""
+        with self._cond:
+            self._cancelled = True
+            self._closed = True
+            for _, future in self._segments:
+                if future:
+                    future.cancel()
+            self._segments.clear()
+            self._cond.notify_all()
+
+    def _next_segment(self):
+        with self._cond:
+            while not self._segments and not self._closed:
+                self._cond.wait()
+            if not self._segments:
+                return None
+            text, future = self._segments[0]
+            if future is None:
+                future = self._segments[0][1] = self.executor.submit(self._synthesize, text)
+            return text, future
+
+    def _pop_segment(self):
+        with self._cond:
+            if self._segments:
+                self._segments.popleft()
+            self._schedule()
+
+    def run(self):
+        """
+        按顺序播放，直到 close() 后全部播完
+        play 返回播放句柄（带 wait()/done/ended_at，如 audio_player.PlaybackHandle）时按异步播放处理：
+        下一段合成好就立即入队，与正在播放的段无缝衔接
+        :return: 统计信息
+        """
+        last_end = None   # 同步播放：上一段结束时间
+        playing = None    # 异步播放：上一段的播放句柄
+        while True:
+            segment = self._next_segment()
+            if segment is None:
+                break
+            text, future = segment
+            try:
+                audio = future.result()
+            except Exception:  # 被取消
+                audio = None
+            self._pop_segment()
+            if self._cancelled:
+                break
+            if not audio:
+                self.stats["failed"] += 1
+                print(f"[播报] 合成失败，跳过: {text}")
+                continue
+
+            now = time.time()
+            if playing is not None:
+                # 上一段已经播完还没等到这一段，差值就是停顿；否则可以无缝衔接
+                self.stats["gaps_ms"].append((now - playing.ended_at) * 1000 if playing.done else 0.0)
+            elif last_end is not None:
+                self.stats["gaps_ms"].append((now - last_end) * 1000)
+            else:
+                self.stats["first_audio_ms"] = (now - self.started_at) * 1000
+            try:
+                handle = self.play(audio)
+            except Exception as e:
+                print(f"[播报] 播放错误: {str(e)}")
+                handle = None
+            self.stats["played"] += 1
+            if hasattr(handle, "wait"):
+                # 最多保留一段排队，等上一段播完再去取下一段
+                if playing is not None:
+                    playing.wait()
+                playing = handle
+            else:
+                last_end = time.time()
+        if playing is not None:
+            playing.wait()
+        return self.get_stats()
+
+    def speak(self, texts):
+        """
+        合成并按顺序播放多段文字
+        :return: 统计信息
+        """
+        for text in texts:
+            self.submit(text)
+        self.close()
+        return self.run()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        gaps = stats.pop("gaps_ms")
+        stats["max_gap_ms"] = max(gaps) if gaps else 0.0
+        stats["avg_gap_ms"] = sum(gaps) / len(gaps) if gaps else 0.0
+        stats["stalls"] = sum(1 for gap in gaps if gap > GAP_THRESHOLD_MS)
+        return stats
+
+
+def format_stats(stats):
+    """统计信息的日志文本"""
+    text = f"{stats['played']}/{stats['segments']}段"
+    if stats["first_audio_ms"] is not None:
+        text += f"，首段 {stats['first_audio_ms']:.0f}ms"
+    if stats["played"] > 1:
+        text += f"，段间最大停顿 {stats['max_gap_ms']:.0f}ms（卡顿{stats['stalls']}次）"
+    if stats["failed"]:
+        text += f"，失败{stats['failed']}段"
+    return text
+
+
+if __name__ == "__main__":
+    import random
+
+    # 模拟：合成耗时 150~450ms，播放每段 300ms，第4段合成失败
+    def fake_synthesize(text):
+        time.sleep(random.uniform(0.15, 0.45))
+        return None if text == "第4段" else text.encode("utf-8")
+
+    def fake_play(audio):
+        time.sleep(0.3)
+
+    texts = [f"第{i}段" for i in range(1, 9)]
+    for depth in (1, 2, 4):
+        random.seed(0)
+        stats = TTSPipeline(fake_synthesize, fake_play, lookahead=depth).speak(texts)
+        print(f"预合成深度 {depth}: {format_stats(stats)}，平均停顿 {stats['avg_gap_ms']:.0f}ms")
@@ -23,7 +23,7 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # 导入主程序的核心类和函数
 from main import VoiceInteractionSystem
-from LLM import process_query
+from conversation_engine import ConversationEngine
 
 
 # ===== 信号类（用于线程间通信） =====
@@ -63,6 +63,9 @@ class AssistantWindow(QMainWindow):
         self.signals.voice_finished.connect(self._on_voice_finished)
         self.signals.show_result.connect(self._on_show_result)
         
+        # 对话引擎（后台事件循环，文字/语音输入都提交给它处理）
+        self.engine = ConversationEngine(self.system, on_event=self._on_engine_event).start()
+        
         # 初始化Token（在后台线程）
         threading.Thread(target=self._init_system, daemon=True).start()
 
@@ -74,6 +77,7 @@ class AssistantWindow(QMainWindow):
     def _init_system(self):
         """后台初始化系统"""
         self.signals.update_status.emit("正在初始化...")
+        self.system.warm_up()
         if self.system.init_token():
             self.signals.update_status.emit("系统就绪")
             self.signals.update_input.emit("询问任何问题...", False)
@@ -221,6 +225,27 @@ class AssistantWindow(QMainWindow):
         """显示结果"""
         self.status_label.setText(text)
 
+    def _on_engine_event(self, event, turn):
+        """对话引擎事件（在引擎线程中调用，通过信号转到界面线程）"""
+        if event == "recognizing":
+            self.signals.update_status.emit("正在识别...")
+        elif event == "recognized":
+            self.signals.update_status.emit(f"识别结果: {turn.text}")
+        elif event == "result":
+            self.signals.show_result.emit(f"🤖 {turn.result}")
+        elif event == "failed":
+            if not turn.text:
+                self.signals.show_result.emit("未能识别到语音，请重试")
+            elif isinstance(turn.result, str) and turn.result.startswith("处理出错"):
+                self.signals.show_result.emit(turn.result)
+            else:
+                self.signals.show_result.emit("处理超时，请重试")
+        elif event == "done":
+            if turn.source == "voice":
+                self.signals.voice_finished.emit()
+            else:
+                self.is_processing = False
+
     # ========== 文本输入处理 ==========
     def send_text(self):
         """处理文本输入"""
@@ -232,32 +257,8 @@ class AssistantWindow(QMainWindow):
         self.is_processing = True
         self.status_label.setText(f"正在处理: {text}")
         
-        # 在后台线程处理
-        threading.Thread(target=self._process_text_input, args=(text,), daemon=True).start()
-
-    def _process_text_input(self, text):
-        """后台处理文本输入"""
-        try:
-            # 通过LLM处理
-            is_instruction, processed_result = process_query(text)
-            
-            if is_instruction:
-                # 执行指令
-                result = self.system.execute_command(processed_result)
-            else:
-                # 闲谈回复
-                result = processed_result
-            
-            # 显示结果
-            self.signals.show_result.emit(f"🤖 {result}")
-            
-            # 语音播报（在后台）
-            self.system.text_to_speech(result)
-            
-        except Exception as e:
-            self.signals.show_result.emit(f"处理出错: {str(e)}")
-        finally:
-            self.is_processing = False
+        # 交给对话引擎处理
+        self.engine.submit_text(text)
 
     # ========== 语音输入处理 ==========
     def start_voice(self):
@@ -274,43 +275,8 @@ class AssistantWindow(QMainWindow):
         
         self._start_breath()
         
-        # 在后台线程录音
-        threading.Thread(target=self._voice_process, daemon=True).start()
-
-    def _voice_process(self):
-        """后台处理语音"""
-        try:
-            # 录音
-            audio_file = self.system.record_audio(duration=5)
-            
-            self.signals.update_status.emit("正在识别...")
-            
-            # 语音识别
-            text = self.system.speech_to_text(audio_file)
-            
-            if text:
-                self.signals.update_status.emit(f"识别结果: {text}")
-                
-                # 处理指令
-                is_instruction, processed_result = process_query(text)
-                
-                if is_instruction:
-                    result = self.system.execute_command(processed_result)
-                else:
-                    result = processed_result
-                
-                # 显示结果
-                self.signals.show_result.emit(f"🤖 {result}")
-                
-                # 语音播报
-                self.system.text_to_speech(result)
-            else:
-                self.signals.show_result.emit("未能识别到语音，请重试")
-                
-        except Exception as e:
-            self.signals.show_result.emit(f"处理出错: {str(e)}")
-        finally:
-            self.signals.voice_finished.emit()
+        # 交给对话引擎录音并处理
+        self.engine.submit_voice()
 
     def _start_breath(self):
         """启动呼吸动画"""
@@ -322,6 +288,7 @@ class AssistantWindow(QMainWindow):
 
     def closeEvent(self, event):
         """窗口关闭时清理资源"""
+        self.engine.stop()
         self.system.cleanup()
         event.accept()
 
@@ -0,0 +1,276 @@
+# coding=utf-8
+"""
+语音端点检测模块（VAD）
+功能：基于短时能量 + 过零率判断语音起止，说完话后自动结束录音
+支持：尾部静音判停、最短/最长录音限制、前置缓冲（避免丢失开头音节）
+"""
+
+import os
+import sys
+import math
+import wave
+import subprocess
+from array import array
+from collections import deque
+
+# 默认参数（单位：秒）
+DEFAULT_TRAILING_SILENCE = 0.8   # 说话结束后持续静音多久判定为结束
+DEFAULT_MIN_DURATION = 0.5       # 最短语音时长，避免咳嗽等短噪声触发结束
+DEFAULT_MAX_DURATION = 10        # 最长录音时长，兜底
+DEFAULT_PREROLL = 0.3            # 语音起点之前保留的音频
+DEFAULT_NO_SPEECH_TIMEOUT = 5    # 一直没人说话时的超时时间
+
+# 能量/过零率阈值
+DEFAULT_ENERGY_THRESHOLD = 500   # 16bit PCM 的 RMS 绝对阈值
+NOISE_FLOOR_RATIO = 3.0          # 相对背景噪声的倍数
+ZCR_FRICATIVE = 0.25             # 清辅音（如 s、x）过零率较高，能量偏低时用于补判
+
+
+def pcm_to_samples(pcm):
+    """将16bit小端PCM字节转换为采样数组"""
+    samples = array('h')
+    samples.frombytes(pcm[:len(pcm) - len(pcm) % 2])
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples
+
+
+def frame_energy(samples):
+    """计算一帧的RMS能量"""
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+def zero_crossing_rate(samples):
+    """计算一帧的过零率（0.0-1.0）"""
+    if len(samples) < 2:
+        return 0.0
+    crossings = 0
+    prev = samples[0]
+    for s in samples:
+        if (s >= 0) != (prev >= 0):
+            crossings += 1
+        prev = s
+    return crossings / (len(samples) - 1)
+
+
+class VADEndpointer:
+    """语音端点检测器：逐帧输入PCM，判断何时可以结束录音"""
+
+    # 状态
+    WAITING = "waiting"    # 等待开始说话
+    SPEAKING = "speaking"  # 正在说话
+    DONE = "done"          # 已结束
+
+    def __init__(self,
+                 sample_rate=16000,
+                 trailing_silence=DEFAULT_TRAILING_SILENCE,
+                 min_duration=DEFAULT_MIN_DURATION,
+                 max_duration=DEFAULT_MAX_DURATION,
+                 preroll=DEFAULT_PREROLL,
+                 no_speech_timeout=DEFAULT_NO_SPEECH_TIMEOUT,
+                 energy_threshold=DEFAULT_ENERGY_THRESHOLD):
+        """
+        :param sample_rate: 采样率
+        :param trailing_silence: 尾部静音时长（秒）
+        :param min_duration: 最短语音时长（秒）
+        :param max_duration: 最长录音时长（秒）
+        :param preroll: 前置缓冲时长（秒）
+        :param no_speech_timeout: 未检测到说话的超时时间（秒）
+        :param energy_threshold: RMS能量阈值
+        """
+        self.sample_rate = sample_rate
+        self.trailing_silence = trailing_silence
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.preroll = preroll
+        self.no_speech_timeout = no_speech_timeout
+        self.energy_threshold = energy_threshold
+        self.reset()
+
+    def reset(self):
+        """重置状态，准备下一次录音"""
+        self.state = self.WAITING
+        self.noise_floor = None
+        self.elapsed = 0.0          # 总输入时长
+        self.speech_duration = 0.0  # 语音起点至今的时长
+        self.silence_duration = 0.0 # 当前连续静音时长
+        self.speech_start = None    # 语音起点（相对录音开始，秒）
+        self.speech_end = None      # 语音终点
+        self.end_reason = None
+        self.hold_until = 0.0       # 在此时间点之前不允许触发语音起点（用于屏蔽提示音回声）
+        self._preroll = deque()
+        self._preroll_duration = 0.0
+        self._frames = []
+        self._taken = 0
+
+    def is_speech(self, samples):
+        """判断一帧是否为语音"""
+        energy = frame_energy(samples)
+        threshold = self.energy_threshold
+        if self.noise_floor is not None:
+            threshold = max(threshold, self.noise_floor * NOISE_FLOOR_RATIO)
+
+        if energy >= threshold:
+            return True
+        # 清辅音：能量偏低但过零率高
+        if energy >= threshold * 0.5 and zero_crossing_rate(samples) >= ZCR_FRICATIVE:
+            return True
+
+        # 非语音帧更新背景噪声估计
+        if self.state == self.WAITING:
+            if self.noise_floor is None:
+                self.noise_floor = energy
+            else:
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+        return False
+
+    def process(self, pcm):
+        """
+        输入一帧PCM数据
+        :param pcm: 16bit单声道PCM字节
+        :return: True表示录音应当结束
+        """
+        if self.state == self.DONE:
+            return True
+
+        samples = pcm_to_samples(pcm)
+        duration = len(samples) / self.sample_rate
+        self.elapsed += duration
+        speech = self.is_speech(samples)
+
+        if self.state == self.WAITING:
+            if speech and self.elapsed > self.hold_until:
+                # 检测到语音起点，带上前置缓冲
+                self.state = self.SPEAKING
+                self.speech_start = self.elapsed - duration
+                self._frames.extend(self._preroll)
+                self._preroll.clear()
+                self._preroll_duration = 0.0
+                self._frames.append(pcm)
+                self.speech_duration = duration
+            else:
+                self._preroll.append(pcm)
+                self._preroll_duration += duration
+                # 屏蔽期间同样只保留 preroll 时长，应答音的回声不会随前置缓冲进入识别
+                self._trim_preroll()
+                if self.elapsed >= self.no_speech_timeout:
+                    self._finish("no_speech")
+        else:
+            self._frames.append(pcm)
+            self.speech_duration += duration
+            if speech:
+                self.silence_duration = 0.0
+            else:
+                self.silence_duration += duration
+
+            if self.silence_duration >= self.trailing_silence:
+                if self.speech_duration - self.silence_duration >= self.min_duration:
+                    self._finish("silence")
+                else:
+                    self._discard_speech()
+
+        if self.state != self.DONE and self.elapsed >= self.max_duration:
+            self._finish("max_duration")
+
+        return self.state == self.DONE
+
+    def _trim_preroll(self):
+        """前置缓冲裁剪到 preroll 时长"""
+        while self._preroll and self._preroll_duration > self.preroll:
+            dropped = self._preroll.popleft()
+            self._preroll_duration -= len(dropped) / 2 / self.sample_rate
+
+    def _discard_speech(self):
+        """语音段太短（咳嗽、碰撞声等）：丢弃已保留的帧，回到等待说话，尾部静音作为新的前置缓冲"""
+        self.state = self.WAITING
+        self.speech_start = None
+        self.speech_duration = 0.0
+        self.silence_duration = 0.0
+        for pcm in self._frames:
+            self._preroll.append(pcm)
+            self._preroll_duration += len(pcm) / 2 / self.sample_rate
+        self._trim_preroll()
+        self._frames = []
+        self._taken = 0
+
+    def _finish(self, reason):
+        self.state = self.DONE
+        self.end_reason = reason
+        if self.speech_start is not None:
+            self.speech_end = self.elapsed - self.silence_duration
+
+    @property
+    def has_speech(self):
+        """是否检测到了语音"""
+        return self.speech_start is not None
+
+    def take_new_frames(self):
+        """取出上次调用以来新保留的音频帧（用于边录边传）"""
+        frames = self._frames[self._taken:]
+        self._taken = len(self._frames)
+        return frames
+
+    def get_audio(self):
+        """获取截取后的音频（前置缓冲 + 语音段 + 尾部静音）"""
+        return b''.join(self._frames)
+
+
+# ==================== 离线测试工具 ====================
+
+def load_pcm_file(path, sample_rate=16000):
+    """
+    读取音频文件并转为16bit单声道PCM
+    WAV文件直接读取，其他格式（如mp3）通过ffmpeg解码
+    :return: PCM字节
+    """
+    if path.lower().endswith(".wav"):
+        with wave.open(path, 'rb') as wf:
+            if (wf.getnchannels() == 1 and wf.getsampwidth() == 2
+                    and wf.getframerate() == sample_rate):
+                return wf.readframes(wf.getnframes())
+
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-v", "quiet", "-i", path,
+             "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"],
+            capture_output=True
+        )
+    except FileNotFoundError:
+        raise RuntimeError(f"音频解码失败，请确认已安装ffmpeg: {path}") from None
+    if result.returncode != 0:
+        raise RuntimeError(f"音频解码失败，请确认已安装ffmpeg: {path}")
+    return result.stdout
+
+
+def simulate(pcm, chunk=1024, sample_rate=16000, **kwargs):
+    """
+    将PCM数据按帧喂给端点检测器，模拟麦克风录音
+    :return: (endpointer, 录音实际耗时秒数)
+    """
+    endpointer = VADEndpointer(sample_rate=sample_rate, **kwargs)
+    step = chunk * 2
+    for offset in range(0, len(pcm), step):
+        if endpointer.process(pcm[offset:offset + step]):
+            break
+    else:
+        endpointer._finish("eof")
+    return endpointer, endpointer.elapsed
+
+
+if __name__ == "__main__":
+    test_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "test_data", "纯净人声测试.mp3")
+
+    print(f"测试文件: {test_file}")
+    pcm = load_pcm_file(test_file)
+    total = len(pcm) / 2 / 16000
+    print(f"音频总时长: {total:.2f}秒")
+
+    endpointer, elapsed = simulate(pcm)
+    print(f"结束原因: {endpointer.end_reason}")
+    if endpointer.has_speech:
+        print(f"语音起点: {endpointer.speech_start:.2f}秒，终点: {endpointer.speech_end:.2f}秒")
+    print(f"录音耗时: {elapsed:.2f}秒（固定录音需要 5.00 秒）")
+    print(f"截取音频: {len(endpointer.get_audio()) / 2 / 16000:.2f}秒")
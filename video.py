@@ -1,5 +1,6 @@
 import webbrowser
 import requests
+import http_pool
 import random
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, quote
@@ -25,7 +26,7 @@ def search_bilibili_videos(keyword):
 
     try:
         print(f"正在搜索关键词：{keyword}")
-        response = requests.get(search_url, headers=headers, timeout=15)
+        response = http_pool.get(search_url, headers=headers, timeout=15)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, "html.parser")
 
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+唤醒词监听循环的PCM帧处理基准测试
+1. 每帧CPU耗时：比较几种把 512 采样的 16bit PCM 字节转换为采样序列的方法
+2. 监听空闲CPU占用：按实时速率（每帧 32ms）模拟监听循环，统计进程CPU时间占比
+不需要麦克风和 Porcupine（检测器用一个遍历全部采样的简单函数代替）
+
+用法：python benchmark.py [--frames 20000] [--seconds 10]
+"""
+
+import sys
+import time
+import struct
+import random
+import argparse
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512
+
+
+def make_frames(count, frame_length=FRAME_LENGTH):
+    """生成随机PCM帧（bytes，与 PyAudio 读到的数据格式相同）"""
+    rng = random.Random(0)
+    return [struct.pack("<%dh" % frame_length, *(rng.randint(-2000, 2000) for _ in range(frame_length)))
+            for _ in range(count)]
+
+
+def build_decoders(frame_length=FRAME_LENGTH):
+    """各种帧转换方法：名称 -> 函数(pcm) -> 采样序列"""
+    cached = struct.Struct("<%dh" % frame_length)
+    buffer = array('h', bytes(frame_length * 2))
+
+    def unpack_format_string(pcm):
+        # 原来的写法：每帧重新拼格式串并生成整数元组
+        return struct.unpack_from("h" * frame_length, pcm)
+
+    def unpack_cached_struct(pcm):
+        return cached.unpack_from(pcm)
+
+    def array_preallocated(pcm):
+        # 复用同一个 array，只复制字节
+        buffer[:] = array('h', pcm)
+        return buffer
+
+    def memoryview_cast(pcm):
+        return memoryview(pcm).cast('h')
+
+    decoders = {
+        "struct.unpack_from(格式串)": unpack_format_string,
+        "struct.Struct(预编译)": unpack_cached_struct,
+        "array('h')(复用)": array_preallocated,
+        "memoryview.cast('h')": memoryview_cast,
+    }
+    if sys.byteorder != "little":
+        # 大端主机上直接解释字节结果不对，只比较 struct
+        decoders = {k: v for k, v in decoders.items() if k.startswith("struct")}
+    elif np is not None:
+        decoders["numpy.frombuffer"] = lambda pcm: np.frombuffer(pcm, dtype=np.int16)
+    return decoders
+
+
+def fake_process(samples):
+    """代替 porcupine.process：读取全部采样（Porcupine 内部同样需要逐个读取）"""
+    return -1 if max(samples) < 32767 else 0
+
+
+def bench_decode(decoders, frames, with_process=False):
+    """
+    测量每帧CPU耗时
+    :return: 名称 -> 每帧微秒
+    """
+    results = {}
+    for name, decode in decoders.items():
+        start = time.process_time()
+        for pcm in frames:
+            samples = decode(pcm)
+            if with_process:
+                fake_process(samples)
+        results[name] = (time.process_time() - start) / len(frames) * 1e6
+    return results
+
+
+def bench_idle(decode, seconds, frame_length=FRAME_LENGTH):
+    """
+    按实时速率模拟监听循环（等待下一帧 -> 转换 -> 检测）
+    :return: 监听期间进程CPU占用百分比（相对一个核心）
+    """
+    frames = make_frames(32, frame_length)
+    interval = frame_length / SAMPLE_RATE
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    next_frame = wall_start
+    index = 0
+    while time.perf_counter() - wall_start < seconds:
+        next_frame += interval
+        delay = next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)  # 相当于 audio_stream.read() 阻塞等待
+        fake_process(decode(frames[index % len(frames)]))
+        index += 1
+    wall = time.perf_counter() - wall_start
+    return (time.process_time() - cpu_start) / wall * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description="唤醒词监听循环PCM帧处理基准测试")
+    parser.add_argument("--frames", type=int, default=20000, help="每种方法处理的帧数")
+    parser.add_argument("--seconds", type=float, default=10.0, help="每种方法模拟监听的时长（秒）")
+    args = parser.parse_args()
+
+    frames = make_frames(256)
+    frames = (frames * (args.frames // len(frames) + 1))[:args.frames]
+    decoders = build_decoders()
+    baseline = "struct.unpack_from(格式串)"
+
+    print(f"帧长度 {FRAME_LENGTH} 采样，{args.frames} 帧" + ("" if np else "（未安装numpy，跳过numpy）"))
+    only = bench_decode(decoders, frames)
+    full = bench_decode(decoders, frames, with_process=True)
+    print(f"\n{'方法':<28}{'仅转换(us/帧)':>14}{'转换+检测(us/帧)':>18}{'加速':>8}")
+    for name in decoders:
+        print(f"{name:<28}{only[name]:>14.2f}{full[name]:>18.2f}{only[baseline] / only[name]:>7.1f}x")
+
+    print(f"\n监听空闲CPU占用（实时速率 {SAMPLE_RATE / FRAME_LENGTH:.2f} 帧/秒，每种方法 {args.seconds:.0f} 秒）")
+    for name in (baseline, "memoryview.cast('h')", "numpy.frombuffer"):
+        if name in decoders:
+            print(f"  {name:<28}{bench_idle(decoders[name], args.seconds):.2f}%")
+
+
+if __name__ == "__main__":
+    main()
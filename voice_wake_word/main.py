@@ -20,10 +20,11 @@ try:
 except ImportError:
     pass
 
-import pvporcupine
 import pyaudio
 import numpy as np
 
+from wake_engine import WakeEngine, WakeKeyword, parse_keywords
+
 # 获取脚本文件所在目录的绝对路径
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -31,13 +32,9 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Picovoice Access Key（从 https://console.picovoice.ai/ 获取）
 ACCESS_KEY = os.getenv("PICOVOICE_ACCESS_KEY", "")
 
-# 唤醒词模型文件路径列表（相对于脚本文件目录）
-KEYWORD_PATHS = [
-    os.path.join(SCRIPT_DIR, "models", "小度_zh_windows_v3_0_0.ppn")
-]
-
-# 检测灵敏度 (0.0-1.0)，值越高越灵敏但误报率可能增加
-SENSITIVITIES = [0.1]
+# 唤醒词列表：名称:动作[:灵敏度]，模型文件为 models/ 下以“名称_”开头的 .ppn
+# 所有唤醒词由同一个 Porcupine 实例检测；灵敏度 (0.0-1.0) 越高越灵敏但误报率可能增加
+KEYWORDS = parse_keywords(os.getenv("WAKE_KEYWORDS", "小度:wake:0.1"))
 
 # Porcupine模型文件路径
 # 中文唤醒词必须使用中文模型文件（porcupine_params_zh.pv）
@@ -55,54 +52,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def pcm_frame_decoder(frame_length: int):
+    """
+    创建PCM帧解码函数：16bit小端字节 -> 采样序列
+    小端主机上用 numpy.frombuffer 直接引用原字节（零拷贝）；
+    否则退回到预编译的 struct.Struct（只解析一次格式串）
+    """
+    frame = struct.Struct("<%dh" % frame_length)
+    if sys.byteorder == "little":
+        def decode(pcm):
+            if len(pcm) == frame.size:
+                return np.frombuffer(pcm, dtype=np.int16)
+            return frame.unpack_from(pcm.ljust(frame.size, b'\x00'))
+    else:
+        def decode(pcm):
+            return frame.unpack_from(pcm.ljust(frame.size, b'\x00'))
+    return decode
+
 class VoiceWakeSystem:
     """语音唤醒系统类"""
     
     def __init__(self, 
                  access_key: str,
-                 keyword_paths: List[str] = None,
-                 sensitivities: List[float] = None,
+                 keywords: List[WakeKeyword] = None,
                  model_path: str = None):
         """
         初始化语音唤醒系统
         
         Args:
             access_key: Picovoice Access Key
-            keyword_paths: 唤醒词模型文件路径列表
-            sensitivities: 检测灵敏度列表 (0.0-1.0)
+            keywords: 唤醒词列表（模型文件、动作、灵敏度）
             model_path: Porcupine模型文件路径
         """
         self.access_key = access_key
-        self.keyword_paths = keyword_paths or []
-        self.sensitivities = sensitivities or [0.5]
+        self.keywords = keywords or []
         self.model_path = model_path
         
         # 初始化状态
-        self.porcupine = None
+        self.engine = None
         self.pa = None
         self.audio_stream = None
         self.is_running = False
         
         # 检查参数
-        if not self.keyword_paths:
-            self.keyword_paths = self._get_default_keyword_paths()
-        
-        # 确保灵敏度数量与唤醒词数量匹配
-        if len(self.sensitivities) != len(self.keyword_paths):
-            self.sensitivities = [0.5] * len(self.keyword_paths)
+        if not self.keywords:
+            self.keywords = self._get_default_keywords()
     
-    def _get_default_keyword_paths(self) -> List[str]:
-        """获取默认唤醒词模型路径"""
+    def _get_default_keywords(self) -> List[WakeKeyword]:
+        """获取默认唤醒词"""
         # 尝试查找系统中安装的Porcupine模型
         try:
             from pvporcupine import KEYWORDS
-            return [KEYWORDS["hey pico"]]
+            return [WakeKeyword("hey pico", KEYWORDS["hey pico"])]
         except:
             # 如果没有找到，使用基于脚本目录的路径
             script_dir = os.path.dirname(os.path.abspath(__file__))
             default_model = os.path.join(script_dir, "models", "hey-pico_tiny.ppn")
             if os.path.exists(default_model):
-                return [default_model]
+                return [WakeKeyword("hey pico", default_model)]
             else:
                 logger.warning("未找到默认唤醒词模型，请确保模型文件存在")
                 return []
@@ -110,36 +117,27 @@ class VoiceWakeSystem:
     def initialize(self) -> bool:
         """初始化唤醒系统"""
         try:
-            # 验证模型文件是否存在
-            for keyword_path in self.keyword_paths:
-                if not os.path.exists(keyword_path):
-                    logger.error(f"模型文件不存在: {keyword_path}")
-                    logger.error(f"请确保文件路径正确，当前工作目录: {os.getcwd()}")
-                    return False
-            
-            # 初始化Porcupine
-            self.porcupine = pvporcupine.create(
-                access_key=self.access_key,
-                keyword_paths=self.keyword_paths,
-                sensitivities=self.sensitivities,
-                model_path=self.model_path
-            )
+            # 初始化唤醒词引擎（所有唤醒词共用一个Porcupine实例，缺少模型文件的唤醒词跳过）
+            self.engine = WakeEngine(self.keywords, self.access_key, self.model_path)
+            if not self.engine.start():
+                logger.error(f"唤醒词引擎初始化失败，请确保模型文件存在，当前工作目录: {os.getcwd()}")
+                return False
             
             # 初始化音频设备
             self.pa = pyaudio.PyAudio()
             self.audio_stream = self.pa.open(
-                rate=self.porcupine.sample_rate,
+                rate=self.engine.sample_rate,
                 channels=1,
                 format=pyaudio.paInt16,
                 input=True,
-                frames_per_buffer=self.porcupine.frame_length,
+                frames_per_buffer=self.engine.frame_length,
                 input_device_index=None  # 使用默认麦克风
             )
             
             logger.info(f"成功初始化语音唤醒系统")
-            logger.info(f"采样率: {self.porcupine.sample_rate} Hz")
-            logger.info(f"帧长度: {self.porcupine.frame_length} 样本")
-            logger.info(f"检测唤醒词数量: {len(self.keyword_paths)}")
+            logger.info(f"采样率: {self.engine.sample_rate} Hz")
+            logger.info(f"帧长度: {self.engine.frame_length} 样本")
+            logger.info(f"检测唤醒词数量: {len(self.engine.keywords)}")
             
             return True
             
@@ -149,31 +147,36 @@ class VoiceWakeSystem:
             return False
     
     def start_listening(self, callback=None):
-        """开始监听唤醒词"""
-        if not self.porcupine or not self.audio_stream:
+        """
+        开始监听唤醒词
+        
+        Args:
+            callback: 检测到唤醒词时的回调 callback(WakeKeyword)，可按 keyword.action 区分动作
+        """
+        if not self.engine or not self.audio_stream:
             logger.error("系统未正确初始化")
             return
             
         self.is_running = True
         logger.info("开始监听唤醒词...")
+        to_samples = pcm_frame_decoder(self.engine.frame_length)
         
         try:
             while self.is_running:
-                # 读取音频帧
-                pcm = self.audio_stream.read(self.porcupine.frame_length)
-                pcm = struct.unpack_from("h" * self.porcupine.frame_length, pcm)
+                # 读取音频帧（直接在读到的字节上建立采样视图，不逐个解包）
+                pcm = self.audio_stream.read(self.engine.frame_length)
+                captured_at = time.monotonic()
                 
                 # 检测唤醒词
-                keyword_index = self.porcupine.process(pcm)
+                keyword = self.engine.process(to_samples(pcm), captured_at)
                 
-                if keyword_index >= 0:
-                    wake_word = os.path.basename(self.keyword_paths[keyword_index])
-                    logger.info(f"检测到唤醒词: {wake_word}")
+                if keyword is not None:
+                    logger.info(f"检测到唤醒词: {keyword.name}（动作: {keyword.action}）")
                     
                     # 执行回调函数
                     if callback:
                         try:
-                            callback(keyword_index)
+                            callback(keyword)
                         except Exception as e:
                             logger.error(f"回调函数执行失败: {str(e)}")
         
@@ -205,11 +208,11 @@ class VoiceWakeSystem:
             except Exception as e:
                 logger.error(f"终止PyAudio失败: {str(e)}")
         
-        if self.porcupine:
-            try:
-                self.porcupine.delete()
-            except Exception as e:
-                logger.error(f"删除Porcupine实例失败: {str(e)}")
+        if self.engine:
+            stats = self.engine.format_stats()
+            if stats:
+                logger.info(f"检测统计: {stats}")
+            self.engine.delete()
     
     def get_memory_usage(self) -> Optional[dict]:
         """获取内存使用情况"""
@@ -222,15 +225,15 @@ class VoiceWakeSystem:
             return {
                 'rss': mem_info.rss / 1024 / 1024,  # MB
                 'vms': mem_info.vms / 1024 / 1024,  # MB
-                'porcupine_model_size': self.porcupine.model_size / 1024  # KB
+                'keywords': len(self.engine.keywords) if self.engine else 0
             }
         except Exception as e:
             logger.warning(f"获取内存使用情况失败: {str(e)}")
             return None
 
-def default_callback(keyword_index: int):
+def default_callback(keyword: WakeKeyword):
     """默认回调函数"""
-    print(f"\n唤醒词索引: {keyword_index}")
+    print(f"\n唤醒词: {keyword.name}（索引: {keyword.index}，动作: {keyword.action}）")
     print("可以在这里添加自定义的唤醒后处理逻辑")
     print("例如：启动语音识别、执行命令等\n")
 
@@ -239,16 +242,14 @@ def main():
     print("="*60)
     print("轻量级语音唤醒系统")
     print("="*60)
-    print(f"唤醒词模型: {KEYWORD_PATHS}")
-    print(f"灵敏度: {SENSITIVITIES}")
+    print(f"唤醒词: {', '.join(f'{k.name}({k.action}, 灵敏度{k.sensitivity})' for k in KEYWORDS)}")
     print("按 Ctrl+C 停止程序")
     print("="*60 + "\n")
     
     # 创建唤醒系统实例
     wake_system = VoiceWakeSystem(
         access_key=ACCESS_KEY,
-        keyword_paths=KEYWORD_PATHS,
-        sensitivities=SENSITIVITIES,
+        keywords=KEYWORDS,
         model_path=MODEL_PATH
     )
     
@@ -0,0 +1,287 @@
+# coding=utf-8
+"""
+唤醒词检测后端模块
+功能：唤醒词引擎（WakeEngine）使用的检测器，接口统一为 frame_length / sample_rate / process(采样) / delete()
+支持：
+  porcupine  Picovoice Porcupine（.ppn 模型，需要 Access Key）
+  template   本地模板匹配（.wav 录音作模板，纯Python实现，不依赖网络和第三方库，可在Linux测试机上运行）
+  replay     按给定时间点回放检测结果（配合音频文件测试唤醒之后的录音/响应流程）
+"""
+
+import sys
+import math
+import wave
+import struct
+import subprocess
+
+try:
+    import pvporcupine
+except ImportError:
+    pvporcupine = None
+
+BACKENDS = ("porcupine", "template", "replay")
+
+# 各后端的唤醒词模型文件扩展名
+MODEL_EXTENSIONS = {"porcupine": ".ppn", "template": ".wav"}
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512
+
+# 模板匹配参数
+SUB_FRAMES = 4              # 每帧分成几段计算特征
+TEMPLATE_THRESHOLD = 0.14   # 平均每帧特征距离低于该值判定为检测到
+MIN_ENERGY = 300            # 16bit PCM 的 RMS，低于该能量的帧不会触发检测
+REFRACTORY_SECONDS = 1.0    # 检测到之后这段时间内不再触发
+TRIM_ENERGY_RATIO = 0.1     # 提取模板时，能量低于峰值该比例的首尾帧被裁掉
+
+
+class PorcupineDetector:
+    """Porcupine 检测器：所有唤醒词共用一个实例"""
+
+    def __init__(self, keyword_paths, sensitivities, access_key, model_path=None):
+        if pvporcupine is None:
+            raise RuntimeError("pvporcupine未安装")
+        self._porcupine = pvporcupine.create(
+            access_key=access_key,
+            keyword_paths=keyword_paths,
+            sensitivities=sensitivities,
+            model_path=model_path
+        )
+        self.frame_length = self._porcupine.frame_length
+        self.sample_rate = self._porcupine.sample_rate
+
+    def process(self, samples):
+        return self._porcupine.process(samples)
+
+    def delete(self):
+        self._porcupine.delete()
+
+
+# ==================== 模板匹配 ====================
+
+def load_pcm(path, sample_rate=SAMPLE_RATE):
+    """
+    读取音频文件为16bit单声道PCM（WAV直接读取，其他格式通过ffmpeg解码）
+    :return: PCM字节
+    """
+    if path.lower().endswith(".wav"):
+        with wave.open(path, 'rb') as wf:
+            if wf.getnchannels() == 1 and wf.getsampwidth() == 2 and wf.getframerate() == sample_rate:
+                return wf.readframes(wf.getnframes())
+    result = subprocess.run(
+        ["ffmpeg", "-v", "quiet", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"],
+        capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"音频解码失败，请确认已安装ffmpeg: {path}")
+    return result.stdout
+
+
+def _frames(pcm, frame_length=FRAME_LENGTH):
+    """PCM字节 -> 每帧的采样元组（不足一帧的尾部丢弃）"""
+    frame = struct.Struct("<%dh" % frame_length)
+    return [frame.unpack_from(pcm, offset) for offset in range(0, len(pcm) - frame.size + 1, frame.size)]
+
+
+def frame_features(samples, prev_log_energy=None):
+    """
+    一帧的特征（与音量无关）：每段的一阶/二阶差分能量与原信号能量之比（反映频谱重心，频率越高比值越大）
+    + 相邻段的对数能量差
+    :return: (特征列表, 本帧RMS能量, 最后一段的对数能量)
+    """
+    step = len(samples) // SUB_FRAMES
+    features = []
+    total = 0.0
+    log_energy = prev_log_energy
+    for k in range(SUB_FRAMES):
+        block = samples[k * step:(k + 1) * step]
+        diff = [b - a for a, b in zip(block, block[1:])]
+        power = sum(s * s for s in block) / step + 1.0
+        power_d1 = sum(d * d for d in diff) / step + 1.0
+        power_d2 = sum((b - a) * (b - a) for a, b in zip(diff, diff[1:])) / step + 1.0
+        total += power
+        current = math.log10(power)
+        features.append(math.log10(power_d1 / power) * 0.5)
+        features.append(math.log10(power_d2 / power) * 0.25)
+        features.append(0.0 if log_energy is None else max(-2.0, min(2.0, current - log_energy)))
+        log_energy = current
+    return features, math.sqrt(total / SUB_FRAMES), log_energy
+
+
+def extract_template(pcm, frame_length=FRAME_LENGTH):
+    """
+    从一段只包含唤醒词的录音中提取模板（裁掉首尾的静音帧）
+    :return: 每帧特征的列表
+    """
+    features, energies = [], []
+    log_energy = None
+    for samples in _frames(pcm, frame_length):
+        feature, energy, log_energy = frame_features(samples, log_energy)
+        features.append(feature)
+        energies.append(energy)
+    if not energies:
+        return []
+    threshold = max(energies) * TRIM_ENERGY_RATIO
+    voiced = [i for i, e in enumerate(energies) if e >= threshold]
+    return features[voiced[0]:voiced[-1] + 1]
+
+
+class _TemplateMatcher:
+    """
+    单个模板的流式子序列DTW：每输入一帧只更新一列（O(模板长度)），
+    得到“以当前帧结尾、与模板最相似的一段输入”的平均帧距离
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.reset()
+
+    def reset(self):
+        size = len(self.template)
+        self.cost = [math.inf] * size
+        self.length = [0] * size
+
+    def update(self, feature):
+        """
+        :return: 当前匹配的平均帧距离
+        """
+        template = self.template
+        prev_cost, prev_len = self.cost, self.length
+        cost, length = [0.0] * len(template), [0] * len(template)
+        for j, ref in enumerate(template):
+            dist = math.sqrt(sum((a - b) * (a - b) for a, b in zip(feature, ref)) / len(ref))
+            if j == 0:
+                # 子序列可以从任意一帧开始
+                best, best_len = 0.0, 0
+            else:
+                # 输入停留在模板同一帧 / 同步前进 / 跳过模板一帧（语速 0.5~2 倍）
+                best, best_len = prev_cost[j - 1], prev_len[j - 1]
+                if prev_cost[j] < best and prev_len[j] < 2 * (j + 1):
+                    best, best_len = prev_cost[j], prev_len[j]
+                if j >= 2 and prev_cost[j - 2] < best:
+                    best, best_len = prev_cost[j - 2], prev_len[j - 2]
+            cost[j] = best + dist
+            length[j] = best_len + 1
+        self.cost, self.length = cost, length
+        return cost[-1] / length[-1]
+
+
+class TemplateDetector:
+    """
+    本地模板匹配检测器（每个唤醒词一个或多个模板录音）
+    精度远不如 Porcupine，用于没有 Porcupine 授权的环境中跑通、测试和基准测试整个唤醒流程
+    """
+
+    def __init__(self, templates, threshold=TEMPLATE_THRESHOLD, frame_length=FRAME_LENGTH,
+                 sample_rate=SAMPLE_RATE):
+        """
+        :param templates: 每个唤醒词的模板列表，templates[唤醒词序号] = [模板特征, ...]
+        :param threshold: 检测阈值（平均帧距离），一个数对所有唤醒词生效，或每个唤醒词一个阈值的列表
+        """
+        self.frame_length = frame_length
+        self.sample_rate = sample_rate
+        if isinstance(threshold, (int, float)):
+            threshold = [threshold] * len(templates)
+        if len(threshold) != len(templates):
+            raise ValueError(f"阈值数量({len(threshold)})与唤醒词数量({len(templates)})不一致")
+        self.thresholds = list(threshold)
+        self._matchers = [[_TemplateMatcher(t) for t in group if t] for group in templates]
+        self._log_energy = None
+        self._refractory = 0
+        self._refractory_frames = int(REFRACTORY_SECONDS * sample_rate / frame_length)
+        self.last_score = None  # 最近一帧的最佳匹配距离（用于调阈值）
+
+    @classmethod
+    def from_files(cls, paths, threshold=TEMPLATE_THRESHOLD, frame_length=FRAME_LENGTH,
+                   sample_rate=SAMPLE_RATE):
+        """
+        :param paths: 每个唤醒词的模板录音路径（一个路径或路径列表）
+        """
+        templates = []
+        for group in paths:
+            group = [group] if isinstance(group, str) else group
+            templates.append([extract_template(load_pcm(p, sample_rate), frame_length) for p in group])
+        return cls(templates, threshold, frame_length, sample_rate)
+
+    def process(self, samples):
+        feature, energy, self._log_energy = frame_features(samples, self._log_energy)
+        best_score = math.inf
+        detected, detected_score = -1, math.inf  # 低于各自阈值的唤醒词中距离最小的
+        for index, matchers in enumerate(self._matchers):
+            for matcher in matchers:
+                score = matcher.update(feature)
+                best_score = min(best_score, score)
+                if score <= self.thresholds[index] and score < detected_score:
+                    detected, detected_score = index, score
+        self.last_score = best_score
+
+        if self._refractory > 0:
+            self._refractory -= 1
+            return -1
+        if detected < 0 or energy < MIN_ENERGY:
+            return -1
+        # 检测到后清空匹配状态，避免同一次发音重复触发
+        for matchers in self._matchers:
+            for matcher in matchers:
+                matcher.reset()
+        self._refractory = self._refractory_frames
+        return detected
+
+    def delete(self):
+        pass
+
+
+# ==================== 回放 ====================
+
+class ReplayDetector:
+    """按给定的时间点返回检测结果（时间按输入的帧数计算，不看音频内容）"""
+
+    def __init__(self, events, frame_length=FRAME_LENGTH, sample_rate=SAMPLE_RATE):
+        """
+        :param events: [(时间秒数, 唤醒词序号), ...]，在包含该时间点的帧返回对应序号
+        """
+        self.frame_length = frame_length
+        self.sample_rate = sample_rate
+        self._events = sorted(events)
+        self._frames = 0
+
+    def process(self, samples):
+        self._frames += 1
+        now = self._frames * self.frame_length / self.sample_rate
+        if self._events and self._events[0][0] <= now:
+            return self._events.pop(0)[1]
+        return -1
+
+    def delete(self):
+        pass
+
+
+def create_detector(backend, keywords, access_key=None, model_path=None):
+    """
+    创建检测器
+    :param backend: "porcupine" 或 "template"（"replay" 需要检测时间点，直接构造 ReplayDetector）
+    :param keywords: WakeKeyword 列表（path 为对应后端的模型文件）
+    """
+    if backend == "porcupine":
+        return PorcupineDetector([k.path for k in keywords], [k.sensitivity for k in keywords],
+                                 access_key, model_path)
+    if backend == "template":
+        # 灵敏度 0.5 对应默认阈值，越高阈值越宽松（每个唤醒词按自己的灵敏度）
+        thresholds = [TEMPLATE_THRESHOLD * (0.5 + k.sensitivity) for k in keywords]
+        return TemplateDetector.from_files([k.path for k in keywords], threshold=thresholds)
+    raise ValueError(f"未知的唤醒检测后端: {backend}（可选: {', '.join(BACKENDS)}）")
+
+
+if __name__ == "__main__":
+    # 用法：python wake_detectors.py 模板.wav 待测音频 —— 打印检测时间点和最佳匹配距离
+    if len(sys.argv) < 3:
+        print("用法: python wake_detectors.py 模板录音 待测音频")
+        sys.exit(1)
+    detector = TemplateDetector.from_files([sys.argv[1]])
+    pcm = load_pcm(sys.argv[2])
+    best = math.inf
+    for i, samples in enumerate(_frames(pcm)):
+        if detector.process(samples) >= 0:
+            print(f"检测到：{(i + 1) * FRAME_LENGTH / SAMPLE_RATE:.2f}秒")
+        best = min(best, detector.last_score)
+    print(f"最佳匹配距离 {best:.3f}（阈值 {detector.thresholds[0]:.3f}）")
@@ -0,0 +1,230 @@
+# coding=utf-8
+"""
+唤醒词引擎模块
+功能：一个检测器同时检测多个唤醒词（如一个 Porcupine 实例加载多个 .ppn 文件），每个唤醒词对应不同的动作
+支持：wake 唤醒（播放应答后录音）、quick 快捷指令（跳过应答直接录音）、stop 停止播报；
+      按唤醒词统计检测次数和检测延迟（音频帧采集完成到得出检测结果的时间）；
+      可切换检测后端（见 wake_detectors：porcupine / template 本地模板匹配 / replay 回放）
+"""
+
+import os
+import sys
+import glob
+import time
+import threading
+from collections import deque
+
+try:
+    from .wake_detectors import create_detector, MODEL_EXTENSIONS
+except ImportError:  # 在 voice_wake_word 目录下直接运行
+    from wake_detectors import create_detector, MODEL_EXTENSIONS
+
+ACTION_WAKE = "wake"
+ACTION_QUICK = "quick"
+ACTION_STOP = "stop"
+ACTIONS = (ACTION_WAKE, ACTION_QUICK, ACTION_STOP)
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+# 中文唤醒词必须使用中文模型文件
+DEFAULT_MODEL_PATH = os.path.join(MODELS_DIR, "porcupine_params_zh.pv")
+DEFAULT_SENSITIVITY = 0.5
+
+# 检测后端："porcupine"（默认）或 "template"（本地模板匹配，模板为 models 下的 名称_*.wav 录音）
+WAKE_BACKEND = os.getenv("WAKE_BACKEND", "porcupine")
+
+# 每个唤醒词保留最近多少次检测的延迟
+LATENCY_HISTORY = 100
+
+# .ppn 文件名中的平台标识
+_PLATFORMS = {"win32": "windows", "darwin": "mac", "linux": "linux"}
+
+
+class WakeKeyword:
+    """一个唤醒词：模型文件 + 触发的动作"""
+
+    def __init__(self, name, path, action=ACTION_WAKE, sensitivity=DEFAULT_SENSITIVITY):
+        """
+        :param name: 显示名称（如“小蓝”）
+        :param path: 模型文件路径（porcupine 为 .ppn，template 为模板录音 .wav）
+        :param action: 检测到后的动作：wake / quick / stop
+        :param sensitivity: 检测灵敏度 (0.0-1.0)，值越高越灵敏但误报率可能增加
+        """
+        if action not in ACTIONS:
+            raise ValueError(f"未知的唤醒词动作: {action}（可选: {', '.join(ACTIONS)}）")
+        self.name = name
+        self.path = path
+        self.action = action
+        self.sensitivity = sensitivity
+        self.index = None  # 在引擎中的序号（与 Porcupine 返回的 keyword_index 一致）
+
+    def __repr__(self):
+        return f"WakeKeyword({self.name!r}, action={self.action!r})"
+
+
+def find_keyword_file(name, models_dir=MODELS_DIR, ext=".ppn"):
+    """
+    按名称查找唤醒词模型文件（models_dir 下以“名称_”开头、扩展名为 ext 的文件），有多个平台的文件时优先当前平台
+    :return: 文件路径，找不到返回None
+    """
+    files = sorted(glob.glob(os.path.join(glob.escape(models_dir), f"{glob.escape(name)}_*{ext}")))
+    platform = _PLATFORMS.get(sys.platform)
+    for path in files:
+        if platform and f"_{platform}_" in os.path.basename(path):
+            return path
+    return files[0] if files else None
+
+
+def parse_keywords(spec, models_dir=MODELS_DIR, backend=WAKE_BACKEND):
+    """
+    解析唤醒词配置（用于环境变量）
+    格式："名称:动作[:灵敏度],..."，如 "小蓝:wake,小度:quick:0.6,停下:stop"
+    :param backend: 检测后端，决定查找的模型文件扩展名
+    :return: WakeKeyword 列表（模型文件路径按名称查找，找不到时为“名称_zh.扩展名”，由引擎启动时报告）
+    :raises ValueError: 动作未知或灵敏度不是0-1之间的数字（错误信息包含出错的那一项）
+    """
+    ext = MODEL_EXTENSIONS.get(backend, ".ppn")
+    keywords = []
+    for item in spec.split(","):
+        parts = [p.strip() for p in item.split(":")]
+        if not parts[0]:
+            continue
+        name = parts[0]
+        action = parts[1] if len(parts) > 1 and parts[1] else ACTION_WAKE
+        try:
+            sensitivity = float(parts[2]) if len(parts) > 2 and parts[2] else DEFAULT_SENSITIVITY
+        except ValueError:
+            raise ValueError(f"“{item.strip()}”的灵敏度不是数字")
+        if not 0.0 <= sensitivity <= 1.0:
+            raise ValueError(f"“{item.strip()}”的灵敏度应在0-1之间")
+        path = find_keyword_file(name, models_dir, ext) or os.path.join(models_dir, f"{name}_zh{ext}")
+        try:
+            keywords.append(WakeKeyword(name, path, action, sensitivity))
+        except ValueError as e:
+            raise ValueError(f"“{item.strip()}”: {str(e)}")
+    return keywords
+
+
+class WakeEngine:
+    """多唤醒词检测引擎（同一时间只能在一个线程中调用 process）"""
+
+    def __init__(self, keywords, access_key=None, model_path=DEFAULT_MODEL_PATH, backend=WAKE_BACKEND,
+                 detector=None):
+        """
+        :param keywords: WakeKeyword 列表
+        :param access_key: Picovoice Access Key（porcupine 后端）
+        :param model_path: Porcupine 模型文件路径（porcupine 后端）
+        :param backend: 检测后端
+        :param detector: 直接指定检测器（如 ReplayDetector），此时不检查模型文件
+        """
+        self.keywords = list(keywords)
+        self.access_key = access_key
+        self.model_path = model_path
+        self.backend = backend
+        self._detector = detector
+        self._lock = threading.Lock()
+        self._stats = []  # 按唤醒词序号
+        if detector is not None:
+            self._init_keywords()
+
+    @property
+    def ready(self):
+        return self._detector is not None
+
+    @property
+    def frame_length(self):
+        return self._detector.frame_length
+
+    @property
+    def sample_rate(self):
+        return self._detector.sample_rate
+
+    def _init_keywords(self):
+        for index, keyword in enumerate(self.keywords):
+            keyword.index = index
+        self._stats = [{"detections": 0, "latency_ms": deque(maxlen=LATENCY_HISTORY)} for _ in self.keywords]
+
+    def start(self):
+        """
+        创建检测器（模型文件不存在的唤醒词跳过）
+        :return: 是否成功
+        """
+        if self._detector is not None:
+            return True
+        if self.backend == "porcupine" and self.model_path and not os.path.exists(self.model_path):
+            print(f"[唤醒] 中文模型文件不存在: {self.model_path}")
+            return False
+
+        available = []
+        for keyword in self.keywords:
+            if os.path.exists(keyword.path):
+                available.append(keyword)
+            else:
+                print(f"[唤醒] 唤醒词模型文件不存在，跳过“{keyword.name}”: {keyword.path}")
+        if not available:
+            return False
+
+        try:
+            self._detector = create_detector(self.backend, available, self.access_key, self.model_path)
+        except Exception as e:
+            print(f"[唤醒] 初始化失败: {str(e)}")
+            return False
+
+        self.keywords = available
+        self._init_keywords()
+        print(f"[唤醒] 检测后端: {self.backend}，唤醒词：" + "，".join(f"{k.name}({k.action})" for k in self.keywords))
+        return True
+
+    def process(self, samples, captured_at=None):
+        """
+        检测一帧音频
+        :param samples: frame_length 个16bit采样
+        :param captured_at: 该帧采集完成的时间（time.monotonic），用于统计检测延迟
+        :return: 检测到的 WakeKeyword，没有检测到返回None
+        """
+        index = self._detector.process(samples)
+        if index < 0:
+            return None
+        keyword = self.keywords[index]
+        with self._lock:
+            stats = self._stats[index]
+            stats["detections"] += 1
+            if captured_at is not None:
+                stats["latency_ms"].append((time.monotonic() - captured_at) * 1000)
+        return keyword
+
+    def get_stats(self):
+        """
+        每个唤醒词的检测统计
+        :return: [{"name", "action", "detections", "avg_latency_ms", "max_latency_ms"}]，按唤醒词序号
+        """
+        result = []
+        with self._lock:
+            for keyword, stats in zip(self.keywords, self._stats):
+                latencies = list(stats["latency_ms"])
+                result.append({
+                    "name": keyword.name,
+                    "action": keyword.action,
+                    "detections": stats["detections"],
+                    "avg_latency_ms": sum(latencies) / len(latencies) if latencies else None,
+                    "max_latency_ms": max(latencies) if latencies else None,
+                })
+        return result
+
+    def format_stats(self):
+        """统计信息的日志文本"""
+        parts = []
+        for stats in self.get_stats():
+            text = f"{stats['name']}({stats['action']}) {stats['detections']}次"
+            if stats["avg_latency_ms"] is not None:
+                text += f"，平均延迟 {stats['avg_latency_ms']:.1f}ms，最大 {stats['max_latency_ms']:.1f}ms"
+            parts.append(text)
+        return "；".join(parts)
+
+    def delete(self):
+        """释放检测器"""
+        if self._detector:
+            try:
+                self._detector.delete()
+            except Exception:
+                pass
+            self._detector = None
@@ -0,0 +1,271 @@
+# coding=utf-8
+"""
+唤醒流程离线基准测试
+功能：不用麦克风，用录好的音频文件跑 唤醒 -> 录音（VAD判停） -> 响应 的完整流程，
+      统计唤醒词的误唤醒（false accept）、漏唤醒（false reject）、检测延迟和每帧CPU耗时
+说明：音频逐帧同步送入检测器和端点检测器，时间按音频时长计算，结果可复现，比实时快得多
+
+标注文件（JSON列表），每项对应一个音频文件：
+  {"file": "a.wav", "keyword": "小蓝", "end": 1.20, "command_end": 3.10}
+  keyword 为空表示不含唤醒词的负样本；end 为唤醒词结束时间（秒）；command_end 为指令说完的时间（可选）
+
+用法：
+  python wake_benchmark.py 标注.json [--backend template] [--keywords 小蓝:wake]
+  --backend replay 按标注时间回放唤醒（只测唤醒之后的录音判停）
+  python wake_benchmark.py --synthetic 40      # 用合成音频自测（不需要任何文件）
+  --threshold 0.12,0.14,0.16 可比较模板匹配的多个阈值（误唤醒与漏唤醒的取舍）
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import struct
+import argparse
+
+from vad import VADEndpointer, load_pcm_file
+from voice_wake_word.wake_engine import WakeEngine, WakeKeyword, parse_keywords, WAKE_BACKEND
+from voice_wake_word.wake_detectors import TemplateDetector, ReplayDetector, extract_template, TEMPLATE_THRESHOLD
+
+SAMPLE_RATE = 16000
+
+# 检测时间落在 [唤醒词结束 - EARLY_TOLERANCE, 唤醒词结束 + MAX_LATENCY] 内算作正确检测
+EARLY_TOLERANCE = 0.3
+MAX_LATENCY = 1.0
+
+# 唤醒后录音的端点检测参数（与 main.py 一致）
+VAD_PARAMS = dict(trailing_silence=0.8, min_duration=0.5, max_duration=10, preroll=0.3, no_speech_timeout=5)
+
+
+def run_loop(engine, pcm, respond=None, sample_rate=SAMPLE_RATE):
+    """
+    在一段音频上运行 唤醒 -> 录音 -> 响应 循环
+    :param engine: 已启动的 WakeEngine（检测器状态不重置，每个文件应使用新的引擎）
+    :param respond: 响应函数 respond(录音PCM)，None表示只统计到录音结束
+    :return: 事件列表 [{"keyword", "time", "record_end", "end_reason", "respond_ms"}]，时间为音频中的秒数
+    """
+    frame_length = engine.frame_length
+    frame = struct.Struct("<%dh" % frame_length)
+    interval = frame_length / sample_rate
+    events = []
+    endpointer = None
+    current = None
+    for count, offset in enumerate(range(0, len(pcm) - frame.size + 1, frame.size), 1):
+        now = count * interval
+        data = pcm[offset:offset + frame.size]
+        if endpointer is not None:
+            if not endpointer.process(data):
+                continue
+            current["record_end"] = now
+            current["end_reason"] = endpointer.end_reason
+            if respond and endpointer.has_speech:
+                start = time.perf_counter()
+                respond(endpointer.get_audio())
+                current["respond_ms"] = (time.perf_counter() - start) * 1000
+            endpointer = None
+            continue
+        keyword = engine.process(frame.unpack_from(data))
+        if keyword is None:
+            continue
+        current = {"keyword": keyword.name, "action": keyword.action, "time": now,
+                   "record_end": None, "end_reason": None, "respond_ms": None}
+        events.append(current)
+        if keyword.action != "stop":
+            endpointer = VADEndpointer(sample_rate=sample_rate, **VAD_PARAMS)
+    if endpointer is not None:
+        current["end_reason"] = "eof"
+    return events
+
+
+def evaluate(samples, make_engine, respond=None):
+    """
+    :param samples: [{"pcm", "keyword", "end", "command_end"}]
+    :param make_engine: 为每个样本创建已启动的 WakeEngine，make_engine(样本)
+    :return: 统计结果
+    """
+    stats = {"positives": 0, "negatives": 0, "detected": 0, "false_accepts": 0, "audio_seconds": 0.0,
+             "latencies_ms": [], "endpoint_delays_ms": [], "respond_ms": [], "cpu_seconds": 0.0, "frames": 0}
+    for sample in samples:
+        engine = make_engine(sample)
+        cpu_start = time.process_time()
+        events = run_loop(engine, sample["pcm"], respond)
+        stats["cpu_seconds"] += time.process_time() - cpu_start
+        duration = len(sample["pcm"]) / 2 / SAMPLE_RATE
+        stats["audio_seconds"] += duration
+        stats["frames"] += int(duration * SAMPLE_RATE / engine.frame_length)
+        engine.delete()
+
+        matched = None
+        if sample.get("keyword"):
+            stats["positives"] += 1
+            for event in events:
+                delay = event["time"] - sample["end"]
+                if event["keyword"] == sample["keyword"] and -EARLY_TOLERANCE <= delay <= MAX_LATENCY:
+                    matched = event
+                    break
+        else:
+            stats["negatives"] += 1
+        stats["false_accepts"] += len(events) - (matched is not None)
+        if matched is None:
+            continue
+
+        stats["detected"] += 1
+        stats["latencies_ms"].append((matched["time"] - sample["end"]) * 1000)
+        if sample.get("command_end") is not None and matched["record_end"] is not None:
+            stats["endpoint_delays_ms"].append((matched["record_end"] - sample["command_end"]) * 1000)
+        if matched["respond_ms"] is not None:
+            stats["respond_ms"].append(matched["respond_ms"])
+    return stats
+
+
+def _describe(values):
+    if not values:
+        return "无"
+    values = sorted(values)
+    return (f"平均 {sum(values) / len(values):.0f}ms，中位 {values[len(values) // 2]:.0f}ms，"
+            f"最大 {values[-1]:.0f}ms")
+
+
+def print_report(stats):
+    positives, hours = stats["positives"], stats["audio_seconds"] / 3600
+    print(f"样本：正样本 {positives}，负样本 {stats['negatives']}，音频共 {stats['audio_seconds']:.1f}秒")
+    if positives:
+        missed = positives - stats["detected"]
+        print(f"漏唤醒率（FRR）：{missed / positives * 100:.1f}%（{missed}/{positives}）")
+    if hours:
+        print(f"误唤醒（FA）：{stats['false_accepts']}次，每小时 {stats['false_accepts'] / hours:.1f}次")
+    print(f"检测延迟（唤醒词结束 -> 检测到）：{_describe(stats['latencies_ms'])}")
+    print(f"录音判停延迟（指令说完 -> 录音结束）：{_describe(stats['endpoint_delays_ms'])}")
+    if stats["respond_ms"]:
+        print(f"响应耗时：{_describe(stats['respond_ms'])}")
+    if stats["frames"]:
+        per_frame = stats["cpu_seconds"] / stats["frames"] * 1e6
+        print(f"CPU：每帧 {per_frame:.0f}us，实时率 {stats['cpu_seconds'] / stats['audio_seconds']:.3f}")
+
+
+def load_manifest(path):
+    """读取标注文件，音频路径相对标注文件所在目录"""
+    with open(path, mode='r', encoding='utf-8') as f:
+        items = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    samples = []
+    for item in items:
+        sample = dict(item)
+        sample["pcm"] = load_pcm_file(os.path.join(base, item["file"]), SAMPLE_RATE)
+        samples.append(sample)
+    return samples
+
+
+# ==================== 合成音频自测 ====================
+
+def _tone(freq, seconds, amplitude, rng):
+    count = int(seconds * SAMPLE_RATE)
+    return [amplitude * (math.sin(2 * math.pi * freq * i / SAMPLE_RATE)
+                         + 0.5 * math.sin(4 * math.pi * freq * i / SAMPLE_RATE)) for i in range(count)]
+
+
+def _noise(seconds, amplitude, rng):
+    return [rng.uniform(-amplitude, amplitude) for _ in range(int(seconds * SAMPLE_RATE))]
+
+
+def _segments(parts, gain, rng):
+    """parts: [(频率或None表示噪声, 时长), ...]"""
+    out = []
+    for freq, seconds in parts:
+        out.extend(_noise(seconds, 6000 * gain, rng) if freq is None else _tone(freq, seconds, 5000 * gain, rng))
+    return out
+
+
+# 合成的“唤醒词”和干扰音（用不同的音高/噪声序列模拟不同的发音）
+SYNTH_KEYWORD = [(220, 0.15), (None, 0.08), (440, 0.12), (330, 0.15)]
+
+
+def _random_phrase(rng, seconds):
+    parts, total = [], 0.0
+    while total < seconds:
+        part = (rng.choice([None, 150, 600, 750, 900, 1200]), rng.uniform(0.06, 0.2))
+        parts.append(part)
+        total += part[1]
+    return parts
+
+
+def make_synthetic(count, seed=0):
+    """
+    生成合成样本：正样本为 噪声 + 唤醒词 + 停顿 + 指令，负样本为 噪声 + 其他声音
+    :return: (模板PCM, 样本列表)
+    """
+    rng = random.Random(seed)
+
+    def to_pcm(values):
+        return struct.pack("<%dh" % len(values), *(max(-32768, min(32767, int(v))) for v in values))
+
+    template = to_pcm(_segments(SYNTH_KEYWORD, 1.0, rng))
+    samples = []
+    for i in range(count):
+        background = 150
+        lead = rng.uniform(0.5, 1.5)
+        audio = _noise(lead, background, rng)
+        if i % 2 == 0:
+            stretch = rng.uniform(0.85, 1.15)
+            audio += _segments([(f, s * stretch) for f, s in SYNTH_KEYWORD], rng.uniform(0.5, 1.5), rng)
+            end = len(audio) / SAMPLE_RATE
+            audio += _noise(0.3, background, rng)
+            audio += _segments(_random_phrase(rng, rng.uniform(0.8, 1.5)), 1.0, rng)
+            command_end = len(audio) / SAMPLE_RATE
+            sample = {"keyword": "合成", "end": end, "command_end": command_end}
+        else:
+            audio += _segments(_random_phrase(rng, rng.uniform(1.0, 2.0)), rng.uniform(0.5, 1.5), rng)
+            sample = {"keyword": None}
+        audio += _noise(1.5, background, rng)
+        for j in range(len(audio)):
+            audio[j] += rng.uniform(-background, background)
+        sample["pcm"] = to_pcm(audio)
+        samples.append(sample)
+    return template, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="唤醒流程离线基准测试")
+    parser.add_argument("manifest", nargs="?", help="标注文件（JSON）")
+    parser.add_argument("--backend", default=WAKE_BACKEND, help="检测后端：porcupine / template")
+    parser.add_argument("--keywords", default=os.getenv("WAKE_KEYWORDS", "小蓝:wake:0.5"),
+                        help="唤醒词配置，格式同 WAKE_KEYWORDS")
+    parser.add_argument("--synthetic", type=int, default=0, help="用合成音频自测的样本数")
+    parser.add_argument("--threshold", default=None, help="模板匹配阈值，多个用逗号分隔（合成自测时有效）")
+    args = parser.parse_args()
+
+    thresholds = [float(t) for t in args.threshold.split(",")] if args.threshold else [TEMPLATE_THRESHOLD]
+    if args.synthetic:
+        template, samples = make_synthetic(args.synthetic)
+        keyword = WakeKeyword("合成", "<合成模板>")
+        features = extract_template(template)
+        print(f"合成音频自测（本地模板匹配，模板 {len(features)} 帧）")
+        for threshold in thresholds:
+            print(f"\n阈值 {threshold}")
+            print_report(evaluate(samples, lambda sample: WakeEngine(
+                [keyword], detector=TemplateDetector([[features]], threshold=threshold))))
+    elif args.manifest:
+        samples = load_manifest(args.manifest)
+        keywords = parse_keywords(args.keywords, backend=args.backend)
+        access_key = os.getenv("PICOVOICE_ACCESS_KEY", "")
+
+        def make_engine(sample):
+            if args.backend == "replay":
+                names = [k.name for k in keywords]
+                events = [(sample["end"], names.index(sample["keyword"]))] if sample.get("keyword") in names else []
+                return WakeEngine(keywords, detector=ReplayDetector(events))
+            engine = WakeEngine(keywords, access_key, backend=args.backend)
+            if not engine.start():
+                sys.exit(1)
+            return engine
+
+        print(f"标注文件: {args.manifest}，检测后端: {args.backend}")
+        print_report(evaluate(samples, make_engine))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
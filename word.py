@@ -6,7 +6,7 @@ Word文档模块
 
 import os
 import datetime
-from openai import OpenAI
+from llm_client import get_client
 
 # 尝试加载 .env
 try:
@@ -64,10 +64,7 @@ def generate_article(topic, article_type="文章"):
 """
     
     try:
-        client = OpenAI(
-            api_key=API_KEY,
-            base_url=BASE_URL
-        )
+        client = get_client(API_KEY, BASE_URL)
         
         print(f"[Word] 正在生成关于「{topic}」的{article_type}...")
         